@@ -1,8 +1,14 @@
 # backtesting/backtest_engine.py
 
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
 import pandas as pd
 
+from performance import compute_metrics, drawdown_stats, sharpe_ratio
+
 def backtest_strategies(price_df, signal_dfs, log_return_column='log_return'):
     """
     Backtest multiple strategies based on log-returns and signal DataFrames.
@@ -43,3 +49,212 @@ def backtest_strategies(price_df, signal_dfs, log_return_column='log_return'):
     df['avg_strategy_cum'] = df[cumulative_returns].mean(axis=1)
 
     return df
+
+
+def summarize_backtest(results_df, signal_dfs=None, log_return_column='log_return', periods_per_year=365):
+    """
+    Performance metrics of every strategy in a backtest_strategies result.
+
+    Args:
+        results_df (pd.DataFrame): DataFrame returned by backtest_strategies.
+        signal_dfs (dict): Optional signals passed to backtest_strategies, used for turnover.
+        log_return_column (str): Name of the log return column.
+        periods_per_year (int): Bars per year (365 for daily crypto).
+
+    Returns:
+        pd.DataFrame: One row per strategy plus 'BuyHold', see performance.compute_metrics.
+    """
+    ret_columns = [col for col in results_df.columns if col.endswith('_ret')]
+    log_returns = results_df[ret_columns].rename(columns=lambda col: col[:-len('_ret')])
+    log_returns['BuyHold'] = results_df[log_return_column]
+
+    positions = None
+    if signal_dfs is not None:
+        positions = pd.DataFrame({
+            name: signal_df.iloc[:, 0].reindex(results_df.index).fillna(0).shift(1).fillna(0)
+            for name, signal_df in signal_dfs.items()
+        })
+        positions['BuyHold'] = 1.0
+        positions = positions[log_returns.columns]
+
+    return compute_metrics(np.expm1(log_returns.fillna(0)), positions=positions, periods_per_year=periods_per_year)
+
+
+def parameter_grid(grid):
+    """
+    Expand a parameter grid into the list of all parameter combinations.
+
+    Args:
+        grid (dict): {param_name: list of values}
+
+    Returns:
+        list: One {param_name: value} dict per combination (cartesian product).
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def signal_matrix(price_df, strategy_fn, combos):
+    """
+    Compute the signals of one strategy for many parameter combinations.
+
+    Args:
+        price_df (pd.DataFrame): OHLCV DataFrame passed to the strategy.
+        strategy_fn (callable): Strategy function, e.g. apply_trend_following.
+        combos (list): List of keyword-argument dicts for strategy_fn.
+
+    Returns:
+        np.ndarray: (time x combo) signal matrix aligned on price_df.index.
+    """
+    signals = np.zeros((len(price_df), len(combos)))
+    for j, params in enumerate(combos):
+        signal_df = strategy_fn(price_df, **params)
+        signals[:, j] = signal_df.iloc[:, 0].reindex(price_df.index).fillna(0).to_numpy()
+    return signals
+
+
+def _performance(strat_log_returns, periods_per_year):
+    # Final multiple, Sharpe and max drawdown along the time axis (axis 0).
+    cumulative = np.exp(np.cumsum(strat_log_returns, axis=0))
+    max_drawdown, _ = drawdown_stats(cumulative)
+
+    return cumulative, {
+        'final_multiple': cumulative[-1],
+        'sharpe': sharpe_ratio(np.expm1(strat_log_returns), periods_per_year),
+        'max_drawdown': max_drawdown,
+    }
+
+
+def evaluate_signal_matrix(log_returns, signals, periods_per_year=365):
+    """
+    Backtest a (time x combo) signal matrix in one vectorized pass.
+
+    Uses the same convention as backtest_strategies: the signal is shifted by
+    one bar to avoid lookahead bias and applied to the log-returns.
+
+    Args:
+        log_returns (np.ndarray): 1D array of log-returns.
+        signals (np.ndarray): (time x combo) signal matrix.
+        periods_per_year (int): Bars per year used to annualize the Sharpe ratio.
+
+    Returns:
+        dict: {'final_multiple', 'sharpe', 'max_drawdown'}, one array of length n_combos each.
+    """
+    log_returns = np.nan_to_num(np.asarray(log_returns, dtype=float))
+    shifted = np.zeros_like(signals, dtype=float)
+    shifted[1:] = signals[:-1]
+
+    _, metrics = _performance(shifted * log_returns[:, None], periods_per_year)
+    return metrics
+
+
+def _sweep_chunk(price_df, strategy_fn, combos, log_return_column, periods_per_year):
+    signals = signal_matrix(price_df, strategy_fn, combos)
+    return evaluate_signal_matrix(price_df[log_return_column].to_numpy(), signals, periods_per_year)
+
+
+def sweep_strategies(price_df, strategy_grids, log_return_column='log_return', n_jobs=None,
+                     periods_per_year=365):
+    """
+    Backtest every parameter combination of several strategies.
+
+    Combinations are split into chunks that run in a process pool. Each chunk builds
+    its (time x combo) signal matrix and reduces it to a few metrics, so only a
+    compact results table comes back instead of two columns per combination.
+
+    Args:
+        price_df (pd.DataFrame): OHLCV DataFrame with a log-return column.
+        strategy_grids (dict): {strategy_name: (strategy_fn, {param: [values]})}
+        log_return_column (str): Name of the log return column in price_df.
+        n_jobs (int): Number of worker processes. None uses all cores, 1 runs in-process.
+        periods_per_year (int): Bars per year used to annualize the Sharpe ratio.
+
+    Returns:
+        pd.DataFrame: One row per (strategy, combination) with its parameters,
+                      final multiple, Sharpe ratio and max drawdown.
+    """
+    if log_return_column not in price_df.columns:
+        raise ValueError(f"'{log_return_column}' column is required in price_df.")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    tasks = []
+    for strat_name, (strategy_fn, grid) in strategy_grids.items():
+        combos = parameter_grid(grid)
+        chunk_size = max(1, -(-len(combos) // n_jobs))
+        for start in range(0, len(combos), chunk_size):
+            tasks.append((strat_name, strategy_fn, combos[start:start + chunk_size]))
+
+    if n_jobs == 1:
+        results = [_sweep_chunk(price_df, fn, combos, log_return_column, periods_per_year)
+                   for _, fn, combos in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(_sweep_chunk, price_df, fn, combos, log_return_column, periods_per_year)
+                       for _, fn, combos in tasks]
+            results = [f.result() for f in futures]
+
+    frames = []
+    for (strat_name, _, combos), metrics in zip(tasks, results):
+        chunk = pd.DataFrame(combos)
+        chunk.insert(0, 'strategy', strat_name)
+        for name, values in metrics.items():
+            chunk[name] = values
+        frames.append(chunk)
+
+    results_df = pd.concat(frames, ignore_index=True)
+    metric_columns = ['final_multiple', 'sharpe', 'max_drawdown']
+    return results_df[[c for c in results_df.columns if c not in metric_columns] + metric_columns]
+
+
+def backtest_batch(log_returns, signals, assets=None, strategies=None, periods_per_year=365):
+    """
+    Backtest many strategies on many assets in single vectorized passes.
+
+    Same convention as backtest_strategies: signals are shifted by one bar and
+    applied to log-returns. Missing bars (NaN log-returns) count as a flat day.
+
+    Args:
+        log_returns (np.ndarray): (time x assets) log-return matrix on a common time index.
+        signals (np.ndarray): (time x assets x strategies) signal tensor on the same index.
+        assets (list): Asset names, used to label the summary.
+        strategies (list): Strategy names, used to label the summary.
+        periods_per_year (int): Bars per year used to annualize the Sharpe ratio.
+
+    Returns:
+        dict: {
+            'strategy_returns': (time x assets x strategies) daily log-returns,
+            'strategy_cum': (time x assets x strategies) cumulative returns,
+            'buy_hold_cum': (time x assets) cumulative buy & hold returns,
+            'avg_strategy_cum': (time x assets) average of the strategy curves,
+            'summary': pd.DataFrame indexed by (asset, strategy),
+        }
+    """
+    log_returns = np.nan_to_num(np.asarray(log_returns, dtype=float))
+    signals = np.nan_to_num(np.asarray(signals, dtype=float))
+    n_bars, n_assets, n_strategies = signals.shape
+    if log_returns.shape != (n_bars, n_assets):
+        raise ValueError(f"log_returns has shape {log_returns.shape}, expected {(n_bars, n_assets)}.")
+
+    shifted = np.zeros_like(signals)
+    shifted[1:] = signals[:-1]
+    strategy_returns = shifted * log_returns[:, :, None]
+
+    strategy_cum, metrics = _performance(strategy_returns, periods_per_year)
+    buy_hold_cum = np.exp(np.cumsum(log_returns, axis=0))
+
+    assets = list(assets) if assets is not None else list(range(n_assets))
+    strategies = list(strategies) if strategies is not None else list(range(n_strategies))
+    summary = pd.DataFrame(
+        {name: values.ravel() for name, values in metrics.items()},
+        index=pd.MultiIndex.from_product([assets, strategies], names=['asset', 'strategy'])
+    )
+    summary['buy_hold_multiple'] = np.repeat(buy_hold_cum[-1], n_strategies)
+
+    return {
+        'strategy_returns': strategy_returns,
+        'strategy_cum': strategy_cum,
+        'buy_hold_cum': buy_hold_cum,
+        'avg_strategy_cum': strategy_cum.mean(axis=2),
+        'summary': summary,
+    }
@@ -0,0 +1,237 @@
+# backtesting/benchmark.py
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from strategies import registry
+
+# Timings below this many seconds are too noisy to be flagged as regressions
+NOISE_FLOOR = 0.005
+
+
+def synthetic_ohlcv(n_bars, freq='D', seed=0, start='1700-01-01'):
+    """
+    Seeded synthetic OHLCV data with the columns produced by data_loader.load_crypto_data.
+
+    Close follows a geometric random walk; Open/High/Low and volumes are drawn around it.
+
+    Args:
+        n_bars (int): Number of bars.
+        freq (str): Bar frequency, 'D' (daily) or 'min' (minute).
+        seed (int): Random seed, the same seed always gives the same data.
+        start (str): Timestamp of the first bar (early enough for ~200k daily bars).
+
+    Returns:
+        pd.DataFrame: Open, High, Low, Close, VolumeCrypto, VolumeFiat, Volume and log_return.
+    """
+    rng = np.random.default_rng(seed)
+    sigma = 0.03 if freq == 'D' else 0.001
+    n_bars += 1  # the first bar has no log return and is dropped
+
+    log_return = rng.normal(0, sigma, n_bars)
+    log_return[0] = 0.0
+    close = 100 * np.exp(np.cumsum(log_return))
+    open_ = close * np.exp(-log_return)
+    spread = np.abs(rng.normal(0, sigma / 2, n_bars))
+    high = np.maximum(open_, close) * (1 + spread)
+    low = np.minimum(open_, close) * (1 - spread)
+    volume = rng.lognormal(10, 0.5, n_bars)
+
+    df = pd.DataFrame({
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'VolumeCrypto': volume,
+        'VolumeFiat': volume * close,
+        'Volume': volume,
+        'log_return': log_return,
+    }, index=pd.date_range(start, periods=n_bars, freq=freq, name='date'))
+
+    return df.iloc[1:]
+
+
+def _measure(fn, repeat):
+    # Best wall time over `repeat` runs, then one traced run for the peak allocation.
+    # Indicator memoization is cleared before each run so every run is cold.
+    best = float('inf')
+    for _ in range(repeat):
+        indicators.default_cache.clear()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    indicators.default_cache.clear()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, best, peak
+
+
+def run_benchmarks(sizes, freq='D', seed=0, repeat=3, only=None):
+    """
+    Time each strategy, backtest_strategies and plot_cumulative_returns on synthetic data.
+
+    Args:
+        sizes (list): Number of bars for each run, e.g. [1_000, 100_000].
+        freq (str): Bar frequency of the synthetic data, 'D' or 'min'.
+        seed (int): Random seed of the synthetic data.
+        repeat (int): Timed runs per case; the best one is kept.
+        only (list): Optional case names to run (strategy names, 'backtest_strategies', 'plot_cumulative_returns').
+
+    Returns:
+        list: One dict per case with name, bars, wall_s, peak_mb and bars_per_s.
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    from backtest_engine import backtest_strategies
+    from plot_performance import plot_cumulative_returns
+
+    def selected(name):
+        return only is None or name in only
+
+    results = []
+
+    def record(name, n_bars, wall, peak):
+        results.append({
+            'name': name,
+            'bars': n_bars,
+            'wall_s': wall,
+            'peak_mb': peak / 2**20,
+            'bars_per_s': n_bars / wall if wall > 0 else float('inf'),
+        })
+        print(f"{name:<26} {n_bars:>10,} bars  {wall:9.4f}s  {peak / 2**20:9.1f} MB  {n_bars / wall:>14,.0f} bars/s")
+
+    for n_bars in sizes:
+        df = synthetic_ohlcv(n_bars, freq=freq, seed=seed)
+
+        signals = {}
+        for name in registry.available():
+            # Signals are always computed because the backtest and plot cases need them
+            strategy_fn = registry.get(name).load()
+            if selected(name):
+                signals[name], wall, peak = _measure(lambda: strategy_fn(df), repeat)
+                record(name, len(df), wall, peak)
+            else:
+                signals[name] = strategy_fn(df)
+
+        results_df = None
+        if selected('backtest_strategies') or selected('plot_cumulative_returns'):
+            results_df, wall, peak = _measure(lambda: backtest_strategies(df, signals), repeat)
+            if selected('backtest_strategies'):
+                record('backtest_strategies', len(df), wall, peak)
+
+        if selected('plot_cumulative_returns'):
+            def plot():
+                plot_cumulative_returns(results_df)
+                plt.close('all')
+            _, wall, peak = _measure(plot, repeat)
+            record('plot_cumulative_returns', len(df), wall, peak)
+
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare benchmark results with a stored baseline.
+
+    A case regresses when its wall time exceeds the baseline by more than `tolerance`
+    (relative) and by more than NOISE_FLOOR seconds. Cases found on one side only are
+    listed after the table.
+
+    Args:
+        results (list): Output of run_benchmarks.
+        baseline (list): Results of a previous run (the 'results' entry of its JSON file).
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for +20%.
+
+    Returns:
+        list: (name, bars, baseline wall_s, wall_s, ratio) of every regressed case.
+    """
+    reference = {(case['name'], case['bars']): case for case in baseline}
+    regressions = []
+    unmatched = []
+
+    print(f"\n{'case':<26} {'bars':>10}  {'baseline':>9}  {'current':>9}  {'ratio':>6}")
+    for case in results:
+        base = reference.pop((case['name'], case['bars']), None)
+        if base is None:
+            unmatched.append((case['name'], case['bars'], 'results'))
+            continue
+
+        ratio = case['wall_s'] / base['wall_s'] if base['wall_s'] > 0 else float('inf')
+        regressed = ratio > 1 + tolerance and case['wall_s'] - base['wall_s'] > NOISE_FLOOR
+        flag = "  <-- REGRESSION" if regressed else ""
+        print(f"{case['name']:<26} {case['bars']:>10,}  {base['wall_s']:9.4f}  {case['wall_s']:9.4f}  {ratio:6.2f}{flag}")
+
+        if regressed:
+            regressions.append((case['name'], case['bars'], base['wall_s'], case['wall_s'], ratio))
+
+    unmatched += [(name, bars, 'baseline') for name, bars in reference]
+    for name, bars, side in unmatched:
+        print(f"⚠️ {name} ({bars:,} bars) is only in the {side}, not compared")
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark strategies, backtest and plotting on synthetic data.")
+    parser.add_argument('--bars', type=int, nargs='+', default=[1_000, 100_000],
+                        help="Number of bars of each run (default: 1000 100000).")
+    parser.add_argument('--freq', choices=['D', 'min'], default='D',
+                        help="Bar frequency of the synthetic data (use 'min' beyond ~200k bars).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per case, the best one is kept.")
+    parser.add_argument('--only', nargs='+', help="Only run these cases.")
+    parser.add_argument('--output', default='benchmark.json', help="Where to write the results (JSON).")
+    parser.add_argument('--baseline', help="Baseline JSON file to compare against.")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed relative slowdown (default: 0.2).")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.bars, freq=args.freq, seed=args.seed, repeat=args.repeat, only=args.only)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'freq': args.freq,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) above {args.tolerance:.0%}.")
+            return 1
+        print("\nNo regression.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
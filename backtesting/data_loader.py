@@ -1,9 +1,9 @@
 import pandas as pd
 import numpy as np
-import cryptocompare
+from ohlcv_cache import load_ohlcv
 
-def load_crypto_data(symbol="BTC", currency="USD", limit=2000):
-    data = cryptocompare.get_historical_price_day(symbol, currency, limit=limit)
+def load_crypto_data(symbol="BTC", currency="USD", limit=2000, offline=False, cache_dir=None, provider=None):
+    data = load_ohlcv(symbol, currency, limit=limit, cache_dir=cache_dir, offline=offline, provider=provider)
     df = pd.DataFrame(data)
     df["date"] = pd.to_datetime(df["time"], unit='s')
     df.set_index("date", inplace=True)
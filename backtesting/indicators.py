@@ -0,0 +1,166 @@
+# backtesting/indicators.py
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def fingerprint(values):
+    """Content hash of a Series or array, used to recognise the same input across calls."""
+    values = np.ascontiguousarray(np.asarray(values))
+    digest = hashlib.blake2b(values.view(np.uint8), digest_size=16).hexdigest()
+    return f"{values.dtype.str}:{values.shape}:{digest}"
+
+
+class IndicatorCache:
+    """
+    Memoizes indicator arrays keyed by (indicator, parameters, input fingerprints).
+
+    Cached arrays are read-only and shared by every caller. Least recently used
+    entries are evicted once the cached arrays exceed max_bytes.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, name, inputs, params, compute):
+        """
+        Return the cached result of compute(*inputs, **params), computing it on a miss.
+
+        Args:
+            name (str): Indicator name.
+            inputs (tuple): Input Series/arrays, fingerprinted by content.
+            params (dict): Indicator parameters.
+            compute (callable): Returns one array or a tuple of arrays.
+
+        Returns:
+            np.ndarray or tuple: Read-only indicator array(s).
+        """
+        key = (name, tuple(sorted(params.items())), tuple(fingerprint(x) for x in inputs))
+        if key in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        self.misses += 1
+        result = compute(*inputs, **params)
+        arrays = result if isinstance(result, tuple) else (result,)
+        arrays = tuple(np.asarray(a, dtype=float) for a in arrays)
+        for a in arrays:
+            a.setflags(write=False)
+        result = arrays if isinstance(result, tuple) else arrays[0]
+
+        size = sum(a.nbytes for a in arrays)
+        if size <= self.max_bytes:
+            self._entries[key] = result
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                evicted = evicted if isinstance(evicted, tuple) else (evicted,)
+                self.nbytes -= sum(a.nbytes for a in evicted)
+
+        return result
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+default_cache = IndicatorCache()
+
+
+def _resolve(cache):
+    return default_cache if cache is None else cache
+
+
+# --- Indicators (ta is imported lazily, on the first cache miss) ---
+
+def _series(values):
+    return values if isinstance(values, pd.Series) else pd.Series(np.asarray(values, dtype=float))
+
+
+def _sma(series, window):
+    import ta
+    return ta.trend.sma_indicator(_series(series), window=window).to_numpy()
+
+
+def _bollinger(close, window, window_dev):
+    import ta
+    bb = ta.volatility.BollingerBands(_series(close), window=window, window_dev=window_dev)
+    return (bb.bollinger_mavg().to_numpy(), bb.bollinger_hband().to_numpy(), bb.bollinger_lband().to_numpy())
+
+
+def _rsi(close, window):
+    import ta
+    return ta.momentum.RSIIndicator(_series(close), window=window).rsi().to_numpy()
+
+
+def _macd(close, window_slow, window_fast, window_sign):
+    import ta
+    macd = ta.trend.MACD(_series(close), window_slow=window_slow, window_fast=window_fast, window_sign=window_sign)
+    return (macd.macd().to_numpy(), macd.macd_signal().to_numpy(), macd.macd_diff().to_numpy())
+
+
+def _stoch(high, low, close, window, smooth_window):
+    import ta
+    stoch = ta.momentum.StochasticOscillator(_series(high), _series(low), _series(close),
+                                             window=window, smooth_window=smooth_window)
+    return stoch.stoch().to_numpy()
+
+
+def _atr(high, low, close, window):
+    import ta
+    atr = ta.volatility.AverageTrueRange(_series(high), _series(low), _series(close), window=window)
+    return atr.average_true_range().to_numpy()
+
+
+def _ichimoku(high, low, window1, window2):
+    import ta
+    ichimoku = ta.trend.IchimokuIndicator(high=_series(high), low=_series(low), window1=window1, window2=window2)
+    return (ichimoku.ichimoku_conversion_line().to_numpy(), ichimoku.ichimoku_base_line().to_numpy())
+
+
+def sma(series, window, cache=None):
+    """Simple moving average."""
+    return _resolve(cache).get("sma", (series,), {"window": window}, _sma)
+
+
+def bollinger(close, window=20, window_dev=2, cache=None):
+    """Bollinger Bands as (middle band, upper band, lower band)."""
+    return _resolve(cache).get("bollinger", (close,), {"window": window, "window_dev": window_dev}, _bollinger)
+
+
+def rsi(close, window=14, cache=None):
+    """Relative Strength Index."""
+    return _resolve(cache).get("rsi", (close,), {"window": window}, _rsi)
+
+
+def macd(close, window_slow=26, window_fast=12, window_sign=9, cache=None):
+    """MACD as (macd line, signal line, histogram)."""
+    params = {"window_slow": window_slow, "window_fast": window_fast, "window_sign": window_sign}
+    return _resolve(cache).get("macd", (close,), params, _macd)
+
+
+def stoch(high, low, close, window=14, smooth_window=3, cache=None):
+    """Stochastic oscillator %K."""
+    params = {"window": window, "smooth_window": smooth_window}
+    return _resolve(cache).get("stoch", (high, low, close), params, _stoch)
+
+
+def atr(high, low, close, window=14, cache=None):
+    """Average True Range."""
+    return _resolve(cache).get("atr", (high, low, close), {"window": window}, _atr)
+
+
+def ichimoku(high, low, window1=9, window2=26, cache=None):
+    """Ichimoku as (conversion line, base line)."""
+    return _resolve(cache).get("ichimoku", (high, low), {"window1": window1, "window2": window2}, _ichimoku)
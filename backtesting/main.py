@@ -1,18 +1,16 @@
-import numpy as np
+import time
+
+_START = time.perf_counter()
+
+import argparse
+import os
 import warnings
 
-from data_loader import load_crypto_data
+import numpy as np
 
-from strategies import (
-    trend_following,
-    mean_reversion,
-    momentum,
-    breakout_volatility,
-    market_making,
-    derivative_signal
-)
-from backtest_engine import backtest_strategies
-from plot_performance import plot_cumulative_returns
+from data_loader import load_crypto_data
+from backtest_engine import backtest_strategies, summarize_backtest
+from strategies import registry
 
 warnings.filterwarnings("ignore")
 
@@ -22,32 +20,61 @@ def compute_log_returns(df, price_column='Close'):
     return df.dropna()
 
 
-def main():
-    print("Fetching Bitcoin price data...")
-    df = load_crypto_data(limit=2000)
-    df = compute_log_returns(df)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest classical strategies on daily crypto data.")
+    parser.add_argument('--strategies', nargs='+', default=None, metavar='NAME', choices=registry.available(),
+                        help=f"Strategies to run (default: all). Available: {', '.join(registry.available())}")
+    parser.add_argument('--symbols', nargs='+', default=['BTC'], help="Crypto symbols (default: BTC).")
+    parser.add_argument('--currency', default='USD')
+    parser.add_argument('--limit', type=int, default=2000, help="Number of days of history.")
+    parser.add_argument('--output', choices=['plot', 'png', 'svg', 'none'], default='plot',
+                        help="Interactive plot, image files, or summary only.")
+    parser.add_argument('--out-dir', default='charts', help="Directory of the png/svg charts.")
+    parser.add_argument('--offline', action='store_true', help="Only use the local OHLCV cache.")
+    parser.add_argument('--list', action='store_true', help="List the registered strategies and exit.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.list:
+        for spec in registry.REGISTRY.values():
+            print(f"{spec.name:<20} indicators: {', '.join(spec.indicators) or '-':<26} params: {spec.params}")
+        return
+
+    strategies = registry.load_strategies(args.strategies)
+    print(f"Cold start: {time.perf_counter() - _START:.2f}s")
+
+    for symbol in args.symbols:
+        print(f"Fetching {symbol} price data...")
+        df = load_crypto_data(symbol, args.currency, limit=args.limit, offline=args.offline)
+        df = compute_log_returns(df)
 
-    print("Applying strategies...")
-    signals = {
-        'TrendFollowing': trend_following.apply_trend_following(df),
-        'MeanReversion': mean_reversion.apply_mean_reversion(df),
-        'Momentum': momentum.apply_momentum(df),
-        'BreakoutVolatility': breakout_volatility.apply_breakout_volatility(df),
-        'MarketMaking': market_making.apply_market_making(df),
-        'DerivativeSignal': derivative_signal.apply_derivative_signal(df)
-    }
+        print("Applying strategies...")
+        signals = {name: strategy_fn(df) for name, strategy_fn in strategies.items()}
 
-    print("Running backtest...")
-    results_df = backtest_strategies(df, signals)
+        print("Running backtest...")
+        results_df = backtest_strategies(df, signals)
 
-    print("Plotting results...")
-    plot_cumulative_returns(results_df)
+        if args.output == 'plot':
+            print("Plotting results...")
+            from plot_performance import plot_cumulative_returns
+            plot_cumulative_returns(results_df)
+        elif args.output in ('png', 'svg'):
+            from plot_performance import render_cumulative_returns
+            os.makedirs(args.out_dir, exist_ok=True)
+            path = os.path.join(args.out_dir, f"{symbol}_{args.currency}.{args.output}")
+            seconds = render_cumulative_returns(results_df, path)
+            print(f"Chart saved to {path} ({seconds:.2f}s)")
 
+        buy_hold = results_df["buy_hold_cum"].iloc[-1]
+        avg = results_df["avg_strategy_cum"].iloc[-1]
+        print(f"Buy & Hold: {buy_hold:.2f}x")
+        print(f"Average Strategy: {avg:.2f}x")
 
-    buy_hold = results_df["buy_hold_cum"].iloc[-1]
-    avg = results_df["avg_strategy_cum"].iloc[-1]
-    print(f"Buy & Hold: {buy_hold:.2f}x")
-    print(f"Average Strategy: {avg:.2f}x")
+        print("\nPerformance summary:")
+        print(summarize_backtest(results_df, signals).round(3).to_string())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,109 @@
+# backtesting/multi_asset.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from data_loader import load_crypto_data
+from backtest_engine import backtest_batch
+
+
+def load_universe(symbols, currency="USD", limit=2000, n_jobs=8, **loader_kwargs):
+    """
+    Load several symbols concurrently.
+
+    Loading is I/O bound (cache reads and HTTP), so a thread pool is used.
+
+    Args:
+        symbols (list): Crypto symbols, e.g. ["BTC", "ETH"].
+        currency (str): Quote currency.
+        limit (int): Number of days of history.
+        n_jobs (int): Number of loader threads.
+        **loader_kwargs: Forwarded to load_crypto_data (offline, cache_dir, provider).
+
+    Returns:
+        dict: {symbol: pd.DataFrame} in the order of symbols.
+    """
+    with ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        frames = pool.map(
+            lambda symbol: load_crypto_data(symbol, currency, limit=limit, **loader_kwargs), symbols
+        )
+        return dict(zip(symbols, frames))
+
+
+def asset_signals(df, strategies):
+    """
+    Run every strategy on one asset.
+
+    Args:
+        df (pd.DataFrame): OHLCV DataFrame of one asset.
+        strategies (dict): {strategy_name: strategy_fn}
+
+    Returns:
+        np.ndarray: (time x strategies) signal matrix aligned on df.index.
+    """
+    signals = np.zeros((len(df), len(strategies)))
+    for j, strategy_fn in enumerate(strategies.values()):
+        signals[:, j] = strategy_fn(df).iloc[:, 0].reindex(df.index).fillna(0).to_numpy()
+    return signals
+
+
+def build_signal_tensor(data, strategies, log_return_column='log_return', n_jobs=None):
+    """
+    Generate signals for every asset in parallel and align them on a common time index.
+
+    Args:
+        data (dict): {symbol: OHLCV DataFrame with a log-return column}
+        strategies (dict): {strategy_name: strategy_fn}
+        log_return_column (str): Name of the log return column.
+        n_jobs (int): Number of worker processes. None uses all cores, 1 runs in-process.
+
+    Returns:
+        tuple: (index, log_returns (time x assets), signals (time x assets x strategies))
+    """
+    n_jobs = n_jobs or os.cpu_count() or 1
+    frames = list(data.values())
+
+    if n_jobs == 1:
+        per_asset = [asset_signals(df, strategies) for df in frames]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            per_asset = list(pool.map(asset_signals, frames, [strategies] * len(frames)))
+
+    index = frames[0].index
+    for df in frames[1:]:
+        index = index.union(df.index)
+
+    log_returns = np.full((len(index), len(frames)), np.nan)
+    signals = np.zeros((len(index), len(frames), len(strategies)))
+    for a, (df, asset_signal) in enumerate(zip(frames, per_asset)):
+        rows = index.get_indexer(df.index)
+        log_returns[rows, a] = df[log_return_column].to_numpy()
+        signals[rows, a, :] = asset_signal
+
+    return index, log_returns, signals
+
+
+def run_batch(symbols, strategies, currency="USD", limit=2000, n_jobs=None, **loader_kwargs):
+    """
+    Load, generate signals and backtest a symbols x strategies matrix.
+
+    Args:
+        symbols (list): Crypto symbols.
+        strategies (dict): {strategy_name: strategy_fn}
+        currency (str): Quote currency.
+        limit (int): Number of days of history.
+        n_jobs (int): Number of signal worker processes.
+        **loader_kwargs: Forwarded to load_crypto_data (offline, cache_dir, provider).
+
+    Returns:
+        dict: Output of backtest_batch plus the common 'index'.
+    """
+    data = load_universe(symbols, currency, limit=limit, **loader_kwargs)
+    index, log_returns, signals = build_signal_tensor(data, strategies, n_jobs=n_jobs)
+
+    results = backtest_batch(log_returns, signals, assets=list(data), strategies=list(strategies))
+    results['index'] = index
+    return results
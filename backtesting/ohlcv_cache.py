@@ -0,0 +1,212 @@
+# backtesting/ohlcv_cache.py
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = {
+    "time": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volumefrom": np.float64,
+    "volumeto": np.float64,
+}
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "TRADING_LAB_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "trading-lab", "ohlcv")
+)
+
+SECONDS_PER_DAY = 86400
+
+
+class LocalPriceProvider:
+    """
+    Offline stand-in for the cryptocompare module.
+
+    Serves daily bars from memory with the same call signature and the same
+    "limit + 1 most recent bars" behaviour as cryptocompare.get_historical_price_day.
+    """
+
+    def __init__(self, bars):
+        """
+        Args:
+            bars (dict or list): {(symbol, currency): [bar dicts]}, or a single list of
+                                 bar dicts served for every symbol.
+        """
+        self.bars = bars
+        self.calls = []
+
+    def get_historical_price_day(self, coin, currency, limit=2000, **kwargs):
+        self.calls.append((coin, currency, limit))
+        bars = self.bars if isinstance(self.bars, list) else self.bars.get((coin, currency), [])
+        bars = sorted(bars or [], key=lambda bar: bar["time"])
+        return [dict(bar) for bar in bars[-(limit + 1):]]
+
+
+def _series_dir(cache_dir, symbol, currency):
+    return os.path.join(cache_dir or DEFAULT_CACHE_DIR, f"{symbol}_{currency}")
+
+
+def _read_meta(path):
+    meta_path = os.path.join(path, "meta.json")
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r") as f:
+        return json.load(f)
+
+
+def _write_meta(path, meta):
+    tmp_path = os.path.join(path, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, "meta.json"))
+
+
+def read_cache(symbol="BTC", currency="USD", cache_dir=None):
+    """
+    Memory-map the cached columns of one symbol/currency pair.
+
+    Returns:
+        dict or None: {column: read-only np.memmap}, or None if nothing is cached.
+    """
+    path = _series_dir(cache_dir, symbol, currency)
+    meta = _read_meta(path)
+    if meta is None or meta["rows"] == 0:
+        return None
+
+    return {
+        col: np.memmap(os.path.join(path, f"{col}.bin"), dtype=dtype, mode="r", shape=(meta["rows"],))
+        for col, dtype in COLUMNS.items()
+    }
+
+
+def append_bars(symbol, currency, bars, cache_dir=None, history_limit=None, rewrite=False):
+    """
+    Append daily bars to the on-disk store, one binary file per column.
+
+    Bars older than the last cached timestamp are ignored. A bar with the same
+    timestamp as the last cached one replaces it (the current day is still forming).
+
+    Args:
+        symbol (str): Crypto symbol, e.g. "BTC".
+        currency (str): Quote currency, e.g. "USD".
+        bars (list): Bar dicts as returned by cryptocompare (None on provider errors, treated as no bars).
+        cache_dir (str): Root directory of the store.
+        history_limit (int): Longest history requested so far, recorded in the metadata.
+        rewrite (bool): Drop the existing store before writing.
+
+    Returns:
+        int: Number of rows in the store after the append.
+    """
+    path = _series_dir(cache_dir, symbol, currency)
+    os.makedirs(path, exist_ok=True)
+    meta = None if rewrite else _read_meta(path)
+    if meta is None:
+        meta = {"rows": 0, "last_time": None, "history_limit": 0}
+        for col in COLUMNS:
+            open(os.path.join(path, f"{col}.bin"), "wb").close()
+
+    bars = sorted(bars or [], key=lambda bar: bar["time"])
+    if meta["last_time"] is not None:
+        bars = [bar for bar in bars if bar["time"] >= meta["last_time"]]
+        if bars and bars[0]["time"] == meta["last_time"]:
+            meta["rows"] -= 1
+
+    if bars:
+        # meta.json is only updated after the column writes: cut any tail left by an interrupted
+        # append (or the bar being replaced) so every column restarts at meta["rows"]
+        for col, dtype in COLUMNS.items():
+            os.truncate(os.path.join(path, f"{col}.bin"), meta["rows"] * np.dtype(dtype).itemsize)
+        for col, dtype in COLUMNS.items():
+            values = np.array([bar[col] for bar in bars], dtype=dtype)
+            with open(os.path.join(path, f"{col}.bin"), "ab") as f:
+                f.write(values.tobytes())
+        meta["rows"] += len(bars)
+        meta["last_time"] = int(bars[-1]["time"])
+
+    meta["history_limit"] = max(meta["history_limit"], history_limit or 0)
+    _write_meta(path, meta)
+    return meta["rows"]
+
+
+def load_ohlcv(symbol="BTC", currency="USD", limit=2000, cache_dir=None, offline=False, provider=None):
+    """
+    Load daily OHLCV bars through the local cache.
+
+    Only the bars newer than the last cached timestamp are fetched from the provider.
+    The full history is fetched once, or again when a longer history is requested.
+
+    Args:
+        symbol (str): Crypto symbol, e.g. "BTC".
+        currency (str): Quote currency, e.g. "USD".
+        limit (int): Number of days of history (limit + 1 bars, like cryptocompare).
+        cache_dir (str): Root directory of the store. Defaults to $TRADING_LAB_CACHE.
+        offline (bool): Serve from the cache only, never call the provider.
+        provider: Object with a get_historical_price_day(coin, currency, limit) method.
+                  Defaults to the cryptocompare module.
+
+    Returns:
+        pd.DataFrame: Columns ['time', 'open', 'high', 'low', 'close', 'volumefrom', 'volumeto'].
+    """
+    path = _series_dir(cache_dir, symbol, currency)
+    meta = _read_meta(path)
+
+    if offline:
+        if meta is None or meta["rows"] == 0:
+            raise FileNotFoundError(f"No cached data for {symbol}/{currency} in {path}.")
+    else:
+        if provider is None:
+            import cryptocompare as provider
+
+        cached = meta is not None and meta["rows"] > 0
+        if not cached or meta["history_limit"] < limit:
+            bars = provider.get_historical_price_day(symbol, currency, limit=limit)
+            # cryptocompare returns None (or nothing) on errors: keep the existing cache then
+            if bars:
+                append_bars(symbol, currency, bars, cache_dir, history_limit=limit, rewrite=True)
+        else:
+            missing_days = int((time.time() - meta["last_time"]) // SECONDS_PER_DAY)
+            bars = provider.get_historical_price_day(symbol, currency, limit=max(missing_days, 1))
+            if bars:
+                append_bars(symbol, currency, bars, cache_dir)
+
+    columns = read_cache(symbol, currency, cache_dir)
+    if columns is None:
+        raise RuntimeError(f"The provider returned no bars for {symbol}/{currency} and nothing is cached in {path}.")
+    return pd.DataFrame({col: values[-(limit + 1):] for col, values in columns.items()})
+
+
+if __name__ == "__main__":
+    # An append interrupted before meta.json is written must not shadow the next bars
+    import tempfile
+
+    def bar(day, price):
+        return {"time": day * SECONDS_PER_DAY, "open": price, "high": price, "low": price,
+                "close": price, "volumefrom": 1.0, "volumeto": price}
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        append_bars("BTC", "USD", [bar(day, 100.0 + day) for day in range(5)], cache_dir)
+        path = _series_dir(cache_dir, "BTC", "USD")
+
+        # Simulated crash: two stale bars reached "close.bin", one reached "open.bin", meta.json untouched
+        with open(os.path.join(path, "close.bin"), "ab") as f:
+            f.write(np.array([-1.0, -2.0]).tobytes())
+        with open(os.path.join(path, "open.bin"), "ab") as f:
+            f.write(np.array([-1.0]).tobytes())
+
+        rows = append_bars("BTC", "USD", [bar(5, 105.0), bar(6, 106.0)], cache_dir)
+        columns = read_cache("BTC", "USD", cache_dir)
+        assert rows == 7
+        np.testing.assert_array_equal(columns["close"], [100, 101, 102, 103, 104, 105, 106])
+        np.testing.assert_array_equal(columns["open"], columns["close"])
+        np.testing.assert_array_equal(columns["time"], np.arange(7) * SECONDS_PER_DAY)
+        for col, dtype in COLUMNS.items():
+            assert os.path.getsize(os.path.join(path, f"{col}.bin")) == rows * np.dtype(dtype).itemsize, col
+
+    print("OK: interrupted append recovered, columns aligned")
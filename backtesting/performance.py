@@ -0,0 +1,86 @@
+# backtesting/performance.py
+
+import numpy as np
+import pandas as pd
+
+# All functions reduce along axis 0 (time): a (time x strategies) matrix gives one value
+# per strategy, and extra trailing axes (e.g. time x assets x strategies) are kept.
+
+
+def _safe_divide(numerator, denominator):
+    numerator, denominator = np.broadcast_arrays(np.asarray(numerator, dtype=float),
+                                                 np.asarray(denominator, dtype=float))
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+
+def sharpe_ratio(returns, periods_per_year=252):
+    """Annualized Sharpe ratio (zero risk-free rate, population std, 0 when std is 0)."""
+    returns = np.asarray(returns, dtype=float)
+    return _safe_divide(np.nanmean(returns, axis=0), np.nanstd(returns, axis=0)) * np.sqrt(periods_per_year)
+
+
+def drawdown_stats(equity):
+    """
+    Maximum drawdown depth and duration of equity curves.
+
+    Returns:
+        tuple: (max_drawdown as a negative fraction, longest time under water in bars)
+    """
+    equity = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(equity, axis=0)
+    at_peak = equity >= peak
+    max_drawdown = np.min(np.divide(equity, peak, out=peak), axis=0) - 1
+
+    bars = np.arange(len(equity)).reshape((-1,) + (1,) * (equity.ndim - 1))
+    last_peak = np.maximum.accumulate(np.where(at_peak, bars, 0), axis=0)
+    max_duration = (bars - last_peak).max(axis=0)
+
+    return max_drawdown, max_duration
+
+
+def turnover(positions):
+    """Average absolute change in position per bar."""
+    positions = np.nan_to_num(np.asarray(positions, dtype=float))
+    return np.abs(np.diff(positions, axis=0)).mean(axis=0)
+
+
+def compute_metrics(returns, positions=None, periods_per_year=252):
+    """
+    Compute all performance metrics for many strategies in single vectorized passes.
+
+    Args:
+        returns (pd.DataFrame or np.ndarray): (time x strategies) matrix of simple returns.
+        positions (pd.DataFrame or np.ndarray): Optional (time x strategies) positions, for turnover.
+        periods_per_year (int): Bars per year (252 for equities, 365 for daily crypto).
+
+    Returns:
+        pd.DataFrame: One row per strategy with annual_return, annual_volatility, sharpe,
+                      sortino, max_drawdown, max_drawdown_duration, calmar, hit_rate, turnover.
+    """
+    names = returns.columns if isinstance(returns, pd.DataFrame) else None
+    values = np.nan_to_num(np.asarray(returns, dtype=float))  # working copy, reused in place below
+    if values.ndim == 1:
+        values = values[:, None]
+    n_bars = len(values)
+
+    mean = values.mean(axis=0)
+    std = values.std(axis=0)
+    wins = (values > 0).sum(axis=0)
+    active = (values != 0).sum(axis=0)
+    downside = np.sqrt(np.square(np.minimum(values, 0)).mean(axis=0))
+
+    equity = np.cumprod(np.add(values, 1, out=values), axis=0, out=values)
+    max_drawdown, max_duration = drawdown_stats(equity)
+    annual_return = equity[-1] ** (periods_per_year / n_bars) - 1
+
+    return pd.DataFrame({
+        'annual_return': annual_return,
+        'annual_volatility': std * np.sqrt(periods_per_year),
+        'sharpe': _safe_divide(mean, std) * np.sqrt(periods_per_year),
+        'sortino': _safe_divide(mean, downside) * np.sqrt(periods_per_year),
+        'max_drawdown': max_drawdown,
+        'max_drawdown_duration': max_duration,
+        'calmar': _safe_divide(annual_return, -max_drawdown),
+        'hit_rate': _safe_divide(wins, active),
+        'turnover': turnover(positions) if positions is not None else np.nan,
+    }, index=names)
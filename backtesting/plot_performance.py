@@ -1,38 +1,208 @@
-import matplotlib.pyplot as plt
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def plot_cumulative_returns(df, strategies=None, figsize=(14, 8)):
+import numpy as np
+import pandas as pd
+
+
+def lttb_indices(x, y, n_out):
     """
-    Plot cumulative returns for each strategy and buy & hold.
+    Largest-Triangle-Three-Buckets downsampling.
+
+    Keeps the first and last points and, in each bucket, the point forming the largest
+    triangle with the previously kept point and the average of the next bucket.
 
     Args:
-        df (pd.DataFrame): DataFrame returned by backtest_strategies.
-        strategies (list): List of strategy names as in the signal dict keys. If None, inferred from columns.
-        figsize (tuple): Size of the plot.
+        x (np.ndarray): Numeric x values (increasing).
+        y (np.ndarray): y values, without NaN.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Indices of the kept points.
     """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+
+def minmax_indices(y, n_out):
+    """
+    Min/max bucketing: keep the lowest and highest point of each of n_out // 2 buckets.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points (first and last point included).
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    bucket = (np.arange(n) * (n_out // 2)) // n
+    order = np.lexsort((y, bucket))
+    bounds = np.flatnonzero(np.diff(bucket[order])) + 1
+    lowest = order[np.concatenate(([0], bounds))]
+    highest = order[np.concatenate((bounds - 1, [n - 1]))]
+
+    return np.unique(np.concatenate(([0, n - 1], lowest, highest)))
+
+
+def downsample(index, values, n_out, method='lttb'):
+    """
+    Downsample one series for display, preserving its visual shape.
+
+    Args:
+        index (pd.Index): x values (dates or numbers).
+        values (np.ndarray): y values; NaN points are dropped.
+        n_out (int): Target number of points, typically the plot width in pixels.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        tuple: (x, y) arrays of the kept points.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    index = pd.Index(index)[finite]
+    x = np.asarray(index)
+    y = values[finite]
+
+    if method == 'lttb':
+        # asi8 also covers tz-aware indexes, whose numpy form is an object array of Timestamps
+        x_numeric = index.as_unit('ns').asi8.astype(float) \
+            if isinstance(index, pd.DatetimeIndex) else x.astype(float)
+        keep = lttb_indices(x_numeric, y, n_out)
+    elif method == 'minmax':
+        keep = minmax_indices(y, n_out)
+    else:
+        raise ValueError("Unknown downsampling method.")
+
+    return x[keep], y[keep]
+
+
+def _draw(ax, df, strategies, max_points=None, method='lttb'):
     if strategies is None:
         # Infer strategies by detecting *_cum columns except buy & hold and avg
         strategies = [col.replace('_cum', '') for col in df.columns if col.endswith('_cum') and not col.startswith(('buy_hold', 'avg_strategy'))]
 
-    plt.figure(figsize=figsize)
+    def series(col):
+        if max_points is None:
+            return df.index, df[col]
+        return downsample(df.index, df[col].to_numpy(), max_points, method)
 
     # Plot Buy & Hold baseline
     if 'buy_hold_cum' in df.columns:
-        plt.plot(df.index, df['buy_hold_cum'], label='Buy & Hold', color='black', linewidth=2)
+        ax.plot(*series('buy_hold_cum'), label='Buy & Hold', color='black', linewidth=2)
 
     # Plot each strategy
     for strat in strategies:
         cum_col = f'{strat}_cum'
         if cum_col in df.columns:
-            plt.plot(df.index, df[cum_col], label=strat)
+            ax.plot(*series(cum_col), label=strat)
 
     # Plot average if available
     if 'avg_strategy_cum' in df.columns:
-        plt.plot(df.index, df['avg_strategy_cum'], label='Average Strategy', linestyle='--', color='brown', linewidth=2)
-
-    plt.title("Cumulative Strategy Performance vs Buy & Hold")
-    plt.xlabel("Date")
-    plt.ylabel("Cumulative Return")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
+        ax.plot(*series('avg_strategy_cum'), label='Average Strategy', linestyle='--', color='brown', linewidth=2)
+
+    ax.set_title("Cumulative Strategy Performance vs Buy & Hold")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Cumulative Return")
+    ax.legend()
+    ax.grid(True)
+
+
+def plot_cumulative_returns(df, strategies=None, figsize=(14, 8), max_points=None, method='lttb'):
+    """
+    Plot cumulative returns for each strategy and buy & hold.
+
+    Args:
+        df (pd.DataFrame): DataFrame returned by backtest_strategies.
+        strategies (list): List of strategy names as in the signal dict keys. If None, inferred from columns.
+        figsize (tuple): Size of the plot.
+        max_points (int): Downsample each series to about this many points. None plots every point.
+        method (str): Downsampling method, 'lttb' or 'minmax'.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    _draw(ax, df, strategies, max_points, method)
+    fig.tight_layout()
     plt.show()
+
+
+def render_cumulative_returns(df, path, strategies=None, width_px=1400, height_px=800, dpi=100, method='lttb'):
+    """
+    Render the cumulative returns chart headlessly to a PNG or SVG file.
+
+    Each series is downsampled to the pixel width of the figure and drawn on an Agg
+    canvas, without pyplot or a GUI backend.
+
+    Args:
+        df (pd.DataFrame): DataFrame returned by backtest_strategies.
+        path (str): Output file; the format is taken from the extension (.png, .svg).
+        strategies (list): Strategy names. If None, inferred from columns.
+        width_px (int): Image width in pixels, also the downsampling target.
+        height_px (int): Image height in pixels.
+        dpi (int): Resolution.
+        method (str): Downsampling method, 'lttb' or 'minmax'.
+
+    Returns:
+        float: Render time in seconds.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    start = time.perf_counter()
+    fig = Figure(figsize=(width_px / dpi, height_px / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    _draw(fig.add_subplot(), df, strategies, max_points=width_px, method=method)
+    fig.tight_layout()
+    fig.savefig(path)
+    return time.perf_counter() - start
+
+
+def render_many(frames, out_dir, fmt='png', n_jobs=None, **render_kwargs):
+    """
+    Render the charts of many symbols, in parallel worker processes.
+
+    Args:
+        frames (dict): {name: DataFrame returned by backtest_strategies}
+        out_dir (str): Output directory.
+        fmt (str): 'png' or 'svg'.
+        n_jobs (int): Number of worker processes. None uses all cores, 1 renders in-process.
+        **render_kwargs: Forwarded to render_cumulative_returns.
+
+    Returns:
+        dict: {name: (path, render time in seconds)}
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, f"{name}.{fmt}") for name in frames}
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if n_jobs == 1:
+        times = [render_cumulative_returns(df, paths[name], **render_kwargs) for name, df in frames.items()]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [pool.submit(render_cumulative_returns, df, paths[name], **render_kwargs)
+                       for name, df in frames.items()]
+            times = [f.result() for f in futures]
+
+    print(f"Rendered {len(frames)} charts in {time.perf_counter() - start:.2f}s "
+          f"(sum of per-chart render times: {sum(times):.2f}s)")
+    return {name: (paths[name], t) for name, t in zip(frames, times)}
@@ -1,24 +1,18 @@
 import numpy as np
-import ta
+import pandas as pd
+import indicators
 
-def apply_breakout_volatility(df):
-    df = df.copy()
+def apply_breakout_volatility(df, bb_window=20, bb_dev=2, width_multiplier=1.5,
+                              atr_window=14, atr_sma_window=14, atr_multiplier=1.5, cache=None):
+    sma20, bb_upper, bb_lower = indicators.bollinger(df["Close"], window=bb_window, window_dev=bb_dev, cache=cache)
+    bb_width = (bb_upper - bb_lower) / sma20
+    bb_width_shift = np.concatenate(([np.nan], bb_width[:-1]))
+    breakout_signal = bb_width > width_multiplier * bb_width_shift
 
-    df['SMA20'] = ta.trend.sma_indicator(df["Close"], window=20)
-    bollinger = ta.volatility.BollingerBands(df["Close"])
-    df['bb_lower'] = bollinger.bollinger_lband()
-    df['bb_upper'] = bollinger.bollinger_hband()
-    df['bb_width'] = (df["bb_upper"] - df["bb_lower"]) / df['SMA20']
-    df['bb_width_shift'] = df['bb_width'].shift(1)
-    df['breakout_signal'] = np.where(df['bb_width'] > 1.5 * df['bb_width_shift'], 1, 0)
+    atr = indicators.atr(df["High"], df["Low"], df["Close"], window=atr_window, cache=cache)
+    atr_sma = indicators.sma(atr, atr_sma_window, cache=cache)
+    atr_expansion_signal = atr > atr_multiplier * atr_sma
 
-    atr = ta.volatility.AverageTrueRange(df["High"], df["Low"], df["Close"])
-    df['ATR'] = atr.average_true_range()
-    df['ATR_SMA'] = ta.trend.sma_indicator(df['ATR'], window=14)
-    df['atr_expansion_signal'] = np.where(df['ATR'] > 1.5 * df['ATR_SMA'], 1, 0)
+    breakout_volatility_signal = np.where(breakout_signal | atr_expansion_signal, 1, 0)
 
-    df['breakout_volatility_signal'] = np.where(
-        (df['breakout_signal'] == 1) | (df['atr_expansion_signal'] == 1), 1, 0
-    )
-
-    return df[['breakout_volatility_signal']]
+    return pd.DataFrame({'breakout_volatility_signal': breakout_volatility_signal}, index=df.index)
@@ -2,14 +2,102 @@ import numpy as np
 import pandas as pd
 from scipy.signal import savgol_filter
 
+def _derivatives(close, window_size, poly_order):
+    """Dérivées première et seconde (le long de l'axe 0) du prix lissé par Savitzky-Golay."""
+    smoothed = savgol_filter(close, window_size, poly_order, mode='nearest', axis=0)
+    first_derivative = np.gradient(smoothed, axis=0)
+    second_derivative = np.gradient(first_derivative, axis=0)
+    return first_derivative, second_derivative
+
+
+def _hysteresis_signal(first_derivative, second_derivative, threshold):
+    """
+    Machine à états achat/vente évaluée sous forme de tableaux le long de l'axe 0.
+
+    On entre en position si d1 > threshold et d2 > threshold, on en sort si d1 < -threshold.
+    Avec threshold >= 0 les deux événements sont exclusifs : l'état "holding" après
+    chaque barre est donc le dernier événement rencontré, propagé vers l'avant.
+    """
+    threshold = np.asarray(threshold)
+    enter = (first_derivative > threshold) & (second_derivative > threshold)
+    exit_ = first_derivative < -threshold
+
+    if np.any(threshold < 0):
+        return _hysteresis_loop(enter, exit_)
+
+    events = np.where(enter, 1, np.where(exit_, -1, 0))
+    positions = np.arange(len(events)).reshape((-1,) + (1,) * (events.ndim - 1))
+    last_event = np.maximum.accumulate(np.where(events != 0, positions, -1), axis=0)
+    holding = (np.take_along_axis(events, np.maximum(last_event, 0), axis=0) == 1) & (last_event >= 0)
+
+    was_holding = np.zeros_like(holding)
+    was_holding[1:] = holding[:-1]
+
+    return np.where(enter & ~was_holding, 1, np.where(exit_ & was_holding, -1, 0))
+
+
+def _hysteresis_loop(enter, exit_):
+    # Seuil négatif : entrée et sortie peuvent coïncider, on déroule la machine à états.
+    signal = np.zeros(enter.shape, dtype=int)
+    holding = np.zeros(enter.shape[1:], dtype=bool)
+    for i in range(len(enter)):
+        buy = ~holding & enter[i]
+        sell = holding & ~buy & exit_[i]
+        signal[i] = np.where(buy, 1, np.where(sell, -1, 0))
+        holding = (holding | buy) & ~sell
+    return signal
+
+
 def apply_derivative_signal(df, window_size=11, poly_order=3, threshold=1e-5):
     """
     Génère des signaux d'achat/vente basés sur les dérivées premières et secondes
     d'une courbe de prix lissée avec un filtre Savitzky-Golay.
-    
+
     Retourne :
         pd.Series avec les signaux (-1, 0, +1)
     """
+    first_derivative, second_derivative = _derivatives(df['Close'].to_numpy(dtype=float), window_size, poly_order)
+    signal = _hysteresis_signal(first_derivative, second_derivative, threshold)
+    return pd.DataFrame({'Signal': signal.astype(np.int64)}, index=df.index)
+
+
+def apply_derivative_signal_batch(closes, settings):
+    """
+    Évalue plusieurs réglages (window_size, poly_order, threshold) sur plusieurs séries en un appel.
+
+    Le lissage et les dérivées sont calculés une seule fois par couple (window_size, poly_order),
+    pour toutes les séries à la fois ; les seuils sont ensuite évalués par broadcasting.
+
+    Args:
+        closes (pd.DataFrame or np.ndarray): Prix de clôture (temps x séries), sans NaN.
+        settings (list): Liste de tuples (window_size, poly_order, threshold).
+
+    Retourne :
+        np.ndarray (temps x séries x réglages) avec les signaux (-1, 0, +1)
+    """
+    closes = np.asarray(closes, dtype=float)
+    if closes.ndim == 1:
+        closes = closes[:, None]
+
+    signals = np.zeros(closes.shape + (len(settings),), dtype=np.int64)
+
+    by_filter = {}
+    for k, (window_size, poly_order, threshold) in enumerate(settings):
+        by_filter.setdefault((window_size, poly_order), []).append((k, threshold))
+
+    for (window_size, poly_order), group in by_filter.items():
+        first_derivative, second_derivative = _derivatives(closes, window_size, poly_order)
+        columns = [k for k, _ in group]
+        thresholds = np.array([threshold for _, threshold in group])
+        signals[..., columns] = _hysteresis_signal(
+            first_derivative[..., None], second_derivative[..., None], thresholds
+        )
+
+    return signals
+
+
+def _apply_derivative_signal_loop(df, window_size=11, poly_order=3, threshold=1e-5):
+    # Implémentation de référence (boucle barre par barre), conservée pour la vérification ci-dessous.
     df = df.copy()
     df['Smoothed'] = savgol_filter(df['Close'], window_size, poly_order, mode='nearest')
     df['First_Derivative'] = np.gradient(df['Smoothed'])
@@ -26,3 +114,22 @@ def apply_derivative_signal(df, window_size=11, poly_order=3, threshold=1e-5):
             holding = False
 
     return df[['Signal']]
+
+
+if __name__ == "__main__":
+    # Vérification d'équivalence entre la version vectorisée et la boucle de référence
+    rng = np.random.default_rng(0)
+    n_bars, n_series = 3000, 4
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n_bars, n_series)), axis=0))
+    settings = [(11, 3, 1e-5), (11, 3, 0.5), (21, 2, 1e-5), (7, 2, -0.01)]
+
+    batch = apply_derivative_signal_batch(closes, settings)
+    for j in range(n_series):
+        df = pd.DataFrame({'Close': closes[:, j]}, index=pd.date_range("2018-01-01", periods=n_bars))
+        for k, (window_size, poly_order, threshold) in enumerate(settings):
+            expected = _apply_derivative_signal_loop(df, window_size, poly_order, threshold)
+            actual = apply_derivative_signal(df, window_size, poly_order, threshold)
+            pd.testing.assert_frame_equal(actual, expected)
+            np.testing.assert_array_equal(batch[:, j, k], expected['Signal'].to_numpy())
+
+    print(f"OK: {n_series} séries x {len(settings)} réglages identiques à la boucle de référence")
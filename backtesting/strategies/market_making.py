@@ -1,9 +1,8 @@
 import numpy as np
+import pandas as pd
 
-def apply_market_making(df):
-    df = df.copy()
+def apply_market_making(df, range_threshold=0.02):
+    daily_range = (df['High'].to_numpy() - df['Low'].to_numpy()) / df['Close'].to_numpy()
+    market_making_signal = np.where(daily_range < range_threshold, 1, -1)
 
-    df['daily_range'] = (df['High'] - df['Low']) / df['Close']
-    df['market_making_signal'] = np.where(df['daily_range'] < 0.02, 1, -1)
-
-    return df[['market_making_signal']]
+    return pd.DataFrame({'market_making_signal': market_making_signal}, index=df.index)
@@ -1,21 +1,21 @@
 import numpy as np
-import ta
+import pandas as pd
+import indicators
 
-def apply_mean_reversion(df):
-    df = df.copy()
+def apply_mean_reversion(df, rsi_window=14, rsi_lower=30, rsi_upper=70, bb_window=20, bb_dev=2,
+                         stoch_window=14, stoch_smooth=3, stoch_lower=20, stoch_upper=80, cache=None):
+    close = df["Close"].to_numpy()
 
-    df['RSI'] = ta.momentum.RSIIndicator(df["Close"], window=14).rsi()
-    df['mr_rsi_signal'] = np.where(df['RSI'] < 30, 1, np.where(df['RSI'] > 70, -1, 0))
+    rsi = indicators.rsi(df["Close"], window=rsi_window, cache=cache)
+    mr_rsi_signal = np.where(rsi < rsi_lower, 1, np.where(rsi > rsi_upper, -1, 0))
 
-    bollinger = ta.volatility.BollingerBands(df["Close"])
-    df['bb_lower'] = bollinger.bollinger_lband()
-    df['bb_upper'] = bollinger.bollinger_hband()
-    df['mr_bb_signal'] = np.where(df["Close"] < df["bb_lower"], 1, np.where(df["Close"] > df["bb_upper"], -1, 0))
+    _, bb_upper, bb_lower = indicators.bollinger(df["Close"], window=bb_window, window_dev=bb_dev, cache=cache)
+    mr_bb_signal = np.where(close < bb_lower, 1, np.where(close > bb_upper, -1, 0))
 
-    stoch = ta.momentum.StochasticOscillator(df["High"], df["Low"], df["Close"])
-    df['stoch'] = stoch.stoch()
-    df['mr_stoch_signal'] = np.where(df['stoch'] < 20, 1, np.where(df['stoch'] > 80, -1, 0))
+    stoch = indicators.stoch(df["High"], df["Low"], df["Close"], window=stoch_window,
+                             smooth_window=stoch_smooth, cache=cache)
+    mr_stoch_signal = np.where(stoch < stoch_lower, 1, np.where(stoch > stoch_upper, -1, 0))
 
-    df['mean_reversion_signal'] = np.sign(df['mr_rsi_signal'] + df['mr_bb_signal'] + df['mr_stoch_signal'])
+    mean_reversion_signal = np.sign(mr_rsi_signal + mr_bb_signal + mr_stoch_signal)
 
-    return df[['mean_reversion_signal']]
+    return pd.DataFrame({'mean_reversion_signal': mean_reversion_signal}, index=df.index)
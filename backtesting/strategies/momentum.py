@@ -1,14 +1,17 @@
 import numpy as np
-import ta
+import pandas as pd
+import indicators
 
-def apply_momentum(df):
-    df = df.copy()
+def apply_momentum(df, volume_window=20, volume_multiplier=1.2, cache=None):
+    close = df['Close'].to_numpy()
+    volume = df['Volume'].to_numpy()
 
-    df['momentum_simple'] = np.where(df['Close'] > df['Close'].shift(1), 1, -1)
+    previous_close = np.concatenate(([np.nan], close[:-1]))
+    momentum_simple = np.where(close > previous_close, 1, -1)
 
-    df['volume_SMA20'] = ta.trend.sma_indicator(df['Volume'], window=20)
-    df['abnormal_volume'] = np.where(df['Volume'] > 1.2 * df['volume_SMA20'], 1, 0)
+    volume_sma20 = indicators.sma(df['Volume'], volume_window, cache=cache)
+    abnormal_volume = volume > volume_multiplier * volume_sma20
 
-    df['momentum_signal'] = np.where(df['abnormal_volume'] == 1, df['momentum_simple'], 0)
+    momentum_signal = np.where(abnormal_volume, momentum_simple, 0)
 
-    return df[['momentum_signal']]
+    return pd.DataFrame({'momentum_signal': momentum_signal}, index=df.index)
@@ -0,0 +1,114 @@
+import importlib
+
+
+class StrategySpec:
+    """
+    Static description of a strategy. The strategy module is only imported by load().
+
+    Attributes:
+        name (str): Registry name, also used as the strategy name in backtests.
+        module (str): Module path of the strategy, e.g. 'strategies.momentum'.
+        function (str): Name of the apply_* function in that module.
+        params (dict): Default parameters of the function.
+        indicators (tuple): Indicators the strategy needs (see indicators.py).
+    """
+
+    def __init__(self, name, module, function, params=None, indicators=()):
+        self.name = name
+        self.module = module
+        self.function = function
+        self.params = dict(params or {})
+        self.indicators = tuple(indicators)
+
+    def load(self):
+        """Import the strategy module and return its apply_* function."""
+        return getattr(importlib.import_module(self.module), self.function)
+
+    def __repr__(self):
+        return f"StrategySpec({self.name!r}, {self.module}.{self.function})"
+
+
+REGISTRY = {}
+
+
+def register(name, module, function, params=None, indicators=()):
+    """
+    Register a strategy without importing it.
+
+    Args:
+        name (str): Registry name.
+        module (str): Module path of the strategy.
+        function (str): Name of the strategy function in that module.
+        params (dict): Default parameters.
+        indicators (tuple): Required indicators.
+
+    Returns:
+        StrategySpec: The registered spec.
+    """
+    REGISTRY[name] = StrategySpec(name, module, function, params, indicators)
+    return REGISTRY[name]
+
+
+def available():
+    """Names of all registered strategies, in registration order."""
+    return list(REGISTRY)
+
+
+def get(name):
+    """Spec of one registered strategy."""
+    if name not in REGISTRY:
+        raise KeyError(f"Unknown strategy '{name}'. Available: {', '.join(REGISTRY)}")
+    return REGISTRY[name]
+
+
+def load_strategies(names=None):
+    """
+    Import the selected strategies.
+
+    Args:
+        names (list): Registry names. None loads every registered strategy.
+
+    Returns:
+        dict: {name: strategy_fn}
+    """
+    names = available() if names is None else names
+    return {name: get(name).load() for name in names}
+
+
+register('TrendFollowing', 'strategies.trend_following', 'apply_trend_following',
+         params={'sma_window': 200, 'macd_fast': 12, 'macd_slow': 26, 'macd_sign': 9,
+                 'ichimoku_conversion': 9, 'ichimoku_base': 26},
+         indicators=('sma', 'macd', 'ichimoku'))
+
+register('MeanReversion', 'strategies.mean_reversion', 'apply_mean_reversion',
+         params={'rsi_window': 14, 'rsi_lower': 30, 'rsi_upper': 70, 'bb_window': 20, 'bb_dev': 2,
+                 'stoch_window': 14, 'stoch_smooth': 3, 'stoch_lower': 20, 'stoch_upper': 80},
+         indicators=('rsi', 'bollinger', 'stoch'))
+
+register('Momentum', 'strategies.momentum', 'apply_momentum',
+         params={'volume_window': 20, 'volume_multiplier': 1.2},
+         indicators=('sma',))
+
+register('BreakoutVolatility', 'strategies.breakout_volatility', 'apply_breakout_volatility',
+         params={'bb_window': 20, 'bb_dev': 2, 'width_multiplier': 1.5,
+                 'atr_window': 14, 'atr_sma_window': 14, 'atr_multiplier': 1.5},
+         indicators=('bollinger', 'atr', 'sma'))
+
+register('MarketMaking', 'strategies.market_making', 'apply_market_making',
+         params={'range_threshold': 0.02})
+
+register('DerivativeSignal', 'strategies.derivative_signal', 'apply_derivative_signal',
+         params={'window_size': 11, 'poly_order': 3, 'threshold': 1e-5},
+         indicators=('savgol_filter',))
+
+
+if __name__ == "__main__":
+    # Registered defaults must match the strategy signatures
+    import inspect
+
+    for spec in REGISTRY.values():
+        signature = inspect.signature(spec.load())
+        defaults = {k: p.default for k, p in signature.parameters.items()
+                    if p.default is not inspect.Parameter.empty and k != 'cache'}
+        assert defaults == spec.params, (spec.name, defaults, spec.params)
+    print(f"{len(REGISTRY)} strategies OK")
@@ -0,0 +1,412 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+NAN = float('nan')
+
+
+# --- Running indicator state, O(1) per bar ---
+
+class RollingMean:
+    """Rolling mean over a fixed window (compensated running sum)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self._sum = 0.0
+        self._compensation = 0.0
+
+    def _add(self, x):
+        y = x - self._compensation
+        t = self._sum + y
+        self._compensation = (t - self._sum) - y
+        self._sum = t
+
+    def update(self, x):
+        self.values.append(x)
+        self._add(x)
+        if len(self.values) > self.window:
+            self._add(-self.values.popleft())
+        return self._sum / self.window if len(self.values) == self.window else NAN
+
+
+class RollingMeanStd:
+    """Rolling mean and population standard deviation (Welford add/remove updates)."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.mean = RollingMean(window)
+        self._avg = 0.0
+        self._m2 = 0.0
+
+    def update(self, x):
+        self.values.append(x)
+        n = len(self.values)
+        delta = x - self._avg
+        self._avg += delta / n
+        self._m2 += delta * (x - self._avg)
+        if n > self.window:
+            old = self.values.popleft()
+            n -= 1
+            delta = old - self._avg
+            self._avg -= delta / n
+            self._m2 -= delta * (old - self._avg)
+
+        mean = self.mean.update(x)
+        if n < self.window:
+            return NAN, NAN
+        return mean, math.sqrt(max(self._m2 / n, 0.0))
+
+
+class RollingExtreme:
+    """Rolling max (or min) over a fixed window using a monotonic deque."""
+
+    def __init__(self, window, mode='max'):
+        self.window = window
+        self.sign = 1.0 if mode == 'max' else -1.0
+        self.candidates = deque()
+        self.count = 0
+
+    def update(self, x):
+        key = self.sign * x
+        while self.candidates and self.candidates[-1][1] <= key:
+            self.candidates.pop()
+        self.candidates.append((self.count, key))
+        if self.candidates[0][0] <= self.count - self.window:
+            self.candidates.popleft()
+        self.count += 1
+        return self.sign * self.candidates[0][1] if self.count >= self.window else NAN
+
+
+class Ema:
+    """Exponential moving average matching pandas ewm(adjust=False, min_periods=...).mean()."""
+
+    def __init__(self, span=None, alpha=None, min_periods=0):
+        com = (span - 1) / 2.0 if span is not None else 1.0 / alpha - 1.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.min_periods = min_periods
+        self.weighted = NAN
+        self.nobs = 0
+
+    def update(self, x):
+        if x == x:
+            self.nobs += 1
+            if self.weighted != self.weighted:
+                self.weighted = x
+            elif self.weighted != x:
+                old_wt = 1.0 - self.alpha
+                self.weighted = (old_wt * self.weighted + self.alpha * x) / (old_wt + self.alpha)
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class WilderRsi:
+    """RSI with Wilder smoothing, as computed by ta.momentum.RSIIndicator."""
+
+    def __init__(self, window=14):
+        self.up = Ema(alpha=1 / window, min_periods=window)
+        self.down = Ema(alpha=1 / window, min_periods=window)
+        self.prev_close = NAN
+
+    def update(self, close):
+        diff = close - self.prev_close
+        self.prev_close = close
+        ema_up = self.up.update(diff if diff > 0 else 0.0)
+        ema_down = self.down.update(-diff if diff < 0 else 0.0)
+        if ema_down == 0:
+            return 100.0
+        return 100 - (100 / (1 + ema_up / ema_down))
+
+
+class AverageTrueRange:
+    """ATR as computed by ta.volatility.AverageTrueRange (zeros until the first full window)."""
+
+    def __init__(self, window=14):
+        self.window = window
+        self.prev_close = NAN
+        self.first_ranges = []
+        self.atr = 0.0
+
+    def update(self, high, low, close):
+        true_range = high - low
+        if self.prev_close == self.prev_close:
+            true_range = max(true_range, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+
+        if len(self.first_ranges) < self.window:
+            self.first_ranges.append(true_range)
+            if len(self.first_ranges) == self.window:
+                self.atr = np.array(self.first_ranges).sum() / self.window
+            return self.atr
+
+        self.atr = (self.atr * (self.window - 1) + true_range) / float(self.window)
+        return self.atr
+
+
+def _ratio(numerator, denominator):
+    # Division with numpy semantics (inf / nan) instead of ZeroDivisionError
+    if denominator == 0:
+        return NAN if numerator == 0 or numerator != numerator else math.copysign(math.inf, numerator)
+    return numerator / denominator
+
+
+# --- Streaming strategies ---
+
+class StreamingTrendFollowing:
+    """Incremental counterpart of apply_trend_following."""
+
+    column = 'trend_following_signal'
+    lag = 0
+
+    def __init__(self, sma_window=200, macd_fast=12, macd_slow=26, macd_sign=9,
+                 ichimoku_conversion=9, ichimoku_base=26):
+        self.sma = RollingMean(sma_window)
+        self.ema_fast = Ema(span=macd_fast, min_periods=macd_fast)
+        self.ema_slow = Ema(span=macd_slow, min_periods=macd_slow)
+        self.macd_signal = Ema(span=macd_sign, min_periods=macd_sign)
+        self.conversion_high = RollingExtreme(ichimoku_conversion, 'max')
+        self.conversion_low = RollingExtreme(ichimoku_conversion, 'min')
+        self.base_high = RollingExtreme(ichimoku_base, 'max')
+        self.base_low = RollingExtreme(ichimoku_base, 'min')
+
+    def update(self, bar):
+        close, high, low = bar['Close'], bar['High'], bar['Low']
+
+        tf_mm200_signal = 1 if close > self.sma.update(close) else -1
+
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        tf_macd_signal = 1 if macd > self.macd_signal.update(macd) else -1
+
+        conversion = 0.5 * (self.conversion_high.update(high) + self.conversion_low.update(low))
+        base = 0.5 * (self.base_high.update(high) + self.base_low.update(low))
+        tf_ichimoku_signal = 1 if close > np.maximum(conversion, base) else -1
+
+        return int(np.sign(tf_mm200_signal + tf_macd_signal + tf_ichimoku_signal))
+
+    def flush(self):
+        return []
+
+
+class StreamingMeanReversion:
+    """Incremental counterpart of apply_mean_reversion."""
+
+    column = 'mean_reversion_signal'
+    lag = 0
+
+    def __init__(self, rsi_window=14, rsi_lower=30, rsi_upper=70, bb_window=20, bb_dev=2,
+                 stoch_window=14, stoch_smooth=3, stoch_lower=20, stoch_upper=80):
+        self.rsi = WilderRsi(rsi_window)
+        self.rsi_lower, self.rsi_upper = rsi_lower, rsi_upper
+        self.bollinger = RollingMeanStd(bb_window)
+        self.bb_dev = bb_dev
+        self.stoch_low = RollingExtreme(stoch_window, 'min')
+        self.stoch_high = RollingExtreme(stoch_window, 'max')
+        self.stoch_lower, self.stoch_upper = stoch_lower, stoch_upper
+
+    def update(self, bar):
+        close, high, low = bar['Close'], bar['High'], bar['Low']
+
+        rsi = self.rsi.update(close)
+        mr_rsi_signal = 1 if rsi < self.rsi_lower else (-1 if rsi > self.rsi_upper else 0)
+
+        mavg, mstd = self.bollinger.update(close)
+        bb_lower, bb_upper = mavg - self.bb_dev * mstd, mavg + self.bb_dev * mstd
+        mr_bb_signal = 1 if close < bb_lower else (-1 if close > bb_upper else 0)
+
+        smin, smax = self.stoch_low.update(low), self.stoch_high.update(high)
+        stoch = 100 * _ratio(close - smin, smax - smin)
+        mr_stoch_signal = 1 if stoch < self.stoch_lower else (-1 if stoch > self.stoch_upper else 0)
+
+        return int(np.sign(mr_rsi_signal + mr_bb_signal + mr_stoch_signal))
+
+    def flush(self):
+        return []
+
+
+class StreamingMomentum:
+    """Incremental counterpart of apply_momentum."""
+
+    column = 'momentum_signal'
+    lag = 0
+
+    def __init__(self, volume_window=20, volume_multiplier=1.2):
+        self.volume_sma = RollingMean(volume_window)
+        self.volume_multiplier = volume_multiplier
+        self.prev_close = NAN
+
+    def update(self, bar):
+        close, volume = bar['Close'], bar['Volume']
+
+        momentum_simple = 1 if close > self.prev_close else -1
+        self.prev_close = close
+
+        abnormal_volume = volume > self.volume_multiplier * self.volume_sma.update(volume)
+        return momentum_simple if abnormal_volume else 0
+
+    def flush(self):
+        return []
+
+
+class StreamingBreakoutVolatility:
+    """Incremental counterpart of apply_breakout_volatility."""
+
+    column = 'breakout_volatility_signal'
+    lag = 0
+
+    def __init__(self, bb_window=20, bb_dev=2, width_multiplier=1.5,
+                 atr_window=14, atr_sma_window=14, atr_multiplier=1.5):
+        self.bollinger = RollingMeanStd(bb_window)
+        self.bb_dev = bb_dev
+        self.width_multiplier = width_multiplier
+        self.prev_width = NAN
+        self.atr = AverageTrueRange(atr_window)
+        self.atr_sma = RollingMean(atr_sma_window)
+        self.atr_multiplier = atr_multiplier
+
+    def update(self, bar):
+        mavg, mstd = self.bollinger.update(bar['Close'])
+        bb_width = _ratio((mavg + self.bb_dev * mstd) - (mavg - self.bb_dev * mstd), mavg)
+        breakout_signal = bb_width > self.width_multiplier * self.prev_width
+        self.prev_width = bb_width
+
+        atr = self.atr.update(bar['High'], bar['Low'], bar['Close'])
+        atr_expansion_signal = atr > self.atr_multiplier * self.atr_sma.update(atr)
+
+        return 1 if breakout_signal or atr_expansion_signal else 0
+
+    def flush(self):
+        return []
+
+
+class StreamingMarketMaking:
+    """Incremental counterpart of apply_market_making."""
+
+    column = 'market_making_signal'
+    lag = 0
+
+    def __init__(self, range_threshold=0.02):
+        self.range_threshold = range_threshold
+
+    def update(self, bar):
+        daily_range = (bar['High'] - bar['Low']) / bar['Close']
+        return 1 if daily_range < self.range_threshold else -1
+
+    def flush(self):
+        return []
+
+
+class StreamingDerivativeSignal:
+    """
+    Incremental counterpart of apply_derivative_signal.
+
+    The batch version smooths with a centered Savitzky-Golay window and central
+    differences, so the signal of a bar depends on the next window_size // 2 + 2
+    bars. update() therefore returns the signal of the bar `lag` bars back (None
+    while warming up), which is exactly the batch value. flush() returns the
+    pending bars as the batch version would compute them if the series ended now.
+    """
+
+    column = 'Signal'
+
+    def __init__(self, window_size=11, poly_order=3, threshold=1e-5):
+        from scipy.signal import savgol_coeffs
+
+        self.window_size, self.poly_order, self.threshold = window_size, poly_order, threshold
+        self.coeffs = savgol_coeffs(window_size, poly_order, use='dot')
+        self.half = window_size // 2
+        self.lag = self.half + 2
+        self.closes = deque(maxlen=window_size)
+        self.tail = deque(maxlen=window_size + 3)
+        self.smoothed = deque(maxlen=3)
+        self.first = deque(maxlen=3)
+        self.count = 0
+        self.emitted = 0
+        self.holding = False
+
+    def _step(self, first_derivative, second_derivative, holding):
+        if not holding and first_derivative > self.threshold and second_derivative > self.threshold:
+            return 1, True
+        if holding and first_derivative < -self.threshold:
+            return -1, False
+        return 0, holding
+
+    def update(self, bar):
+        close = bar['Close']
+        if self.count == 0:
+            self.closes.extend([close] * self.half)  # mode='nearest' padding on the left
+        self.closes.append(close)
+        self.tail.append(close)
+        self.count += 1
+
+        k = self.count - 1 - self.half  # index of the newest fully determined smoothed value
+        if k < 0:
+            return None
+        self.smoothed.append(float(np.dot(self.coeffs, self.closes)))
+
+        if k == 0:
+            return None
+        i = k - 1  # index of the newest first derivative
+        if k == 1:
+            self.first.append(self.smoothed[-1] - self.smoothed[-2])  # np.gradient, one-sided edge
+        else:
+            self.first.append((self.smoothed[-1] - self.smoothed[-3]) / 2.0)
+
+        if i == 0:
+            return None
+        j = i - 1  # index of the newest second derivative
+        if i == 1:
+            second = self.first[-1] - self.first[-2]
+        else:
+            second = (self.first[-1] - self.first[-3]) / 2.0
+
+        signal, self.holding = self._step(self.first[-2], second, self.holding)
+        self.emitted = j + 1
+        return signal
+
+    def flush(self):
+        from strategies.derivative_signal import _derivatives
+
+        if self.count < 2:
+            return [0] * (self.count - self.emitted)
+        tail = np.array(self.tail)
+        first, second = _derivatives(tail, self.window_size, self.poly_order)
+        offset = self.count - len(tail)
+
+        signals, holding = [], self.holding
+        for bar in range(self.emitted, self.count):
+            signal, holding = self._step(first[bar - offset], second[bar - offset], holding)
+            signals.append(signal)
+        return signals
+
+
+STREAMING_STRATEGIES = {
+    'TrendFollowing': StreamingTrendFollowing,
+    'MeanReversion': StreamingMeanReversion,
+    'Momentum': StreamingMomentum,
+    'BreakoutVolatility': StreamingBreakoutVolatility,
+    'MarketMaking': StreamingMarketMaking,
+    'DerivativeSignal': StreamingDerivativeSignal,
+}
+
+
+def replay(stream, df):
+    """
+    Feed a history bar by bar through a streaming strategy.
+
+    Args:
+        stream: Streaming strategy instance.
+        df (pd.DataFrame): OHLCV DataFrame.
+
+    Returns:
+        pd.DataFrame: Signals in the same format as the batch strategy.
+    """
+    columns = [c for c in ('Open', 'High', 'Low', 'Close', 'Volume') if c in df.columns]
+    signals = []
+    for values in zip(*(df[c].to_numpy(dtype=float) for c in columns)):
+        signal = stream.update(dict(zip(columns, values)))
+        if signal is not None:
+            signals.append(signal)
+    signals.extend(stream.flush())
+    return pd.DataFrame({stream.column: np.array(signals, dtype=np.int64)}, index=df.index)
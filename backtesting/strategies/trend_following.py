@@ -1,27 +1,22 @@
 import numpy as np
-import ta
+import pandas as pd
+import indicators
 
-def apply_trend_following(df):
-    df = df.copy()
+def apply_trend_following(df, sma_window=200, macd_fast=12, macd_slow=26, macd_sign=9,
+                          ichimoku_conversion=9, ichimoku_base=26, cache=None):
+    close = df["Close"].to_numpy()
 
-    df['SMA200'] = ta.trend.sma_indicator(df["Close"], window=200)
-    df['tf_mm200_signal'] = np.where(df["Close"] > df["SMA200"], 1, -1)
+    sma200 = indicators.sma(df["Close"], sma_window, cache=cache)
+    tf_mm200_signal = np.where(close > sma200, 1, -1)
 
-    macd = ta.trend.MACD(df["Close"])
-    df['macd'] = macd.macd()
-    df['macd_signal'] = macd.macd_signal()
-    df['tf_macd_signal'] = np.where(df['macd'] > df['macd_signal'], 1, -1)
+    macd, macd_signal, _ = indicators.macd(df["Close"], window_slow=macd_slow, window_fast=macd_fast,
+                                           window_sign=macd_sign, cache=cache)
+    tf_macd_signal = np.where(macd > macd_signal, 1, -1)
 
-    ichimoku = ta.trend.IchimokuIndicator(high=df["High"], low=df["Low"])
-    df['ichimoku_conversion'] = ichimoku.ichimoku_conversion_line()
-    df['ichimoku_base'] = ichimoku.ichimoku_base_line()
-    df['tf_ichimoku_signal'] = np.where(
-        df["Close"] > np.maximum(df["ichimoku_conversion"], df["ichimoku_base"]),
-        1, -1
-    )
+    conversion, base = indicators.ichimoku(df["High"], df["Low"], window1=ichimoku_conversion,
+                                           window2=ichimoku_base, cache=cache)
+    tf_ichimoku_signal = np.where(close > np.maximum(conversion, base), 1, -1)
 
-    df['trend_following_signal'] = np.sign(
-        df['tf_mm200_signal'] + df['tf_macd_signal'] + df['tf_ichimoku_signal']
-    )
+    trend_following_signal = np.sign(tf_mm200_signal + tf_macd_signal + tf_ichimoku_signal)
 
-    return df[['trend_following_signal']]
+    return pd.DataFrame({'trend_following_signal': trend_following_signal}, index=df.index)
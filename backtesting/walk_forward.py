@@ -0,0 +1,183 @@
+# backtesting/walk_forward.py
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest_engine import parameter_grid, signal_matrix, evaluate_signal_matrix
+
+# Price data of the current worker process, attached once by _attach_prices
+_PRICES = {}
+
+
+def walk_forward_folds(n_bars, train_size, test_size, step=None, expanding=False):
+    """
+    Build walk-forward train/test windows.
+
+    Args:
+        n_bars (int): Length of the series.
+        train_size (int): Number of bars in the (first) training window.
+        test_size (int): Number of bars in each test window.
+        step (int): Offset between consecutive folds. Defaults to test_size (non-overlapping tests).
+        expanding (bool): Keep the training window anchored at bar 0 instead of rolling it.
+
+    Returns:
+        list: (train_start, train_end, test_end) tuples; the test window is [train_end, test_end).
+    """
+    step = step or test_size
+    folds = []
+    train_end = train_size
+    while train_end + test_size <= n_bars:
+        train_start = 0 if expanding else train_end - train_size
+        folds.append((train_start, train_end, train_end + test_size))
+        train_end += step
+    return folds
+
+
+def _share_prices(price_df):
+    # Copy the numeric columns and the index into shared memory blocks, once.
+    values = price_df.select_dtypes(include=np.number).to_numpy(dtype=np.float64)
+    if isinstance(price_df.index, pd.DatetimeIndex):
+        index = price_df.index.as_unit('ns').asi8
+    else:
+        index = price_df.index.to_numpy(dtype=np.int64)
+
+    blocks = []
+    for array in (values, index):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        blocks.append(block)
+
+    layout = {
+        'values': (blocks[0].name, values.shape),
+        'index': (blocks[1].name, index.shape),
+        'columns': list(price_df.select_dtypes(include=np.number).columns),
+        'datetime_index': isinstance(price_df.index, pd.DatetimeIndex),
+        # asi8 holds UTC instants for a tz-aware index; the tz is reapplied in the workers
+        'tz': getattr(price_df.index, 'tz', None),
+    }
+    return blocks, layout
+
+
+def _attach_prices(layout):
+    # Worker initializer: map the shared blocks as a read-only DataFrame (no copy).
+    blocks = [shared_memory.SharedMemory(name=layout[key][0]) for key in ('values', 'index')]
+    values = np.ndarray(layout['values'][1], dtype=np.float64, buffer=blocks[0].buf)
+    index = np.ndarray(layout['index'][1], dtype=np.int64, buffer=blocks[1].buf)
+    values.flags.writeable = False
+
+    if layout['datetime_index']:
+        index = pd.DatetimeIndex(index.view('datetime64[ns]'))
+        if layout['tz'] is not None:
+            index = index.tz_localize('UTC').tz_convert(layout['tz'])
+    else:
+        index = pd.Index(index)
+    _PRICES['blocks'] = blocks
+    _PRICES['df'] = pd.DataFrame(values, index=index, columns=layout['columns'], copy=False)
+
+
+def _run_fold(fold, strategy_fn, combos, selection_metric, log_return_column, periods_per_year):
+    df = _PRICES['df']
+    train_start, train_end, test_end = fold
+
+    # In-sample: score every combination and keep the best one
+    train = df.iloc[train_start:train_end]
+    train_signals = signal_matrix(train, strategy_fn, combos)
+    train_metrics = evaluate_signal_matrix(train[log_return_column].to_numpy(), train_signals, periods_per_year)
+    best = int(np.argmax(train_metrics[selection_metric]))
+
+    # Out-of-sample: the signal only sees bars up to the end of the test window
+    history = df.iloc[train_start:test_end]
+    signal = signal_matrix(history, strategy_fn, [combos[best]])[:, 0]
+    shifted = np.concatenate(([0.0], signal[:-1]))
+    oos_returns = (shifted * np.nan_to_num(history[log_return_column].to_numpy()))[train_end - train_start:]
+
+    return {
+        'params': combos[best],
+        f'train_{selection_metric}': train_metrics[selection_metric][best],
+        'oos_returns': oos_returns,
+    }
+
+
+def walk_forward(price_df, strategy_fn, param_grid, train_size, test_size, step=None, expanding=False,
+                 selection_metric='sharpe', log_return_column='log_return', n_jobs=None, periods_per_year=365):
+    """
+    Walk-forward backtest: per-fold parameter selection and stitched out-of-sample equity.
+
+    Folds run concurrently in a process pool. The price data is copied once into
+    shared memory and mapped read-only by each worker instead of being pickled per fold.
+
+    Args:
+        price_df (pd.DataFrame): OHLCV DataFrame with a log-return column.
+        strategy_fn (callable): Strategy function, e.g. apply_trend_following.
+        param_grid (dict): {param: [values]} searched on each training window.
+        train_size (int): Number of bars in the (first) training window.
+        test_size (int): Number of bars in each test window.
+        step (int): Offset between consecutive folds. Defaults to test_size.
+        expanding (bool): Expanding instead of rolling training window.
+        selection_metric (str): 'final_multiple', 'sharpe' or 'max_drawdown' (higher is better).
+        log_return_column (str): Name of the log return column in price_df.
+        n_jobs (int): Number of worker processes. None uses all cores, 1 runs in-process.
+        periods_per_year (int): Bars per year used to annualize the Sharpe ratio.
+
+    Returns:
+        dict: {
+            'folds': pd.DataFrame with the window bounds, selected parameters and metrics per fold,
+            'oos_returns': pd.Series of stitched out-of-sample log-returns,
+            'oos_cum': pd.Series of the stitched out-of-sample cumulative return,
+        }
+    """
+    if log_return_column not in price_df.columns:
+        raise ValueError(f"'{log_return_column}' column is required in price_df.")
+
+    folds = walk_forward_folds(len(price_df), train_size, test_size, step, expanding)
+    if not folds:
+        raise ValueError("Not enough bars for a single train/test fold.")
+
+    combos = parameter_grid(param_grid)
+    args = (strategy_fn, combos, selection_metric, log_return_column, periods_per_year)
+    n_jobs = n_jobs or os.cpu_count() or 1
+
+    if n_jobs == 1:
+        _PRICES['df'] = price_df
+        results = [_run_fold(fold, *args) for fold in folds]
+        _PRICES.clear()
+    else:
+        blocks, layout = _share_prices(price_df)
+        try:
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(folds)), initializer=_attach_prices,
+                                     initargs=(layout,)) as pool:
+                futures = [pool.submit(_run_fold, fold, *args) for fold in folds]
+                results = [f.result() for f in futures]
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    rows = []
+    for (train_start, train_end, test_end), result in zip(folds, results):
+        oos = result['oos_returns']
+        rows.append({
+            'train_start': price_df.index[train_start],
+            'test_start': price_df.index[train_end],
+            'test_end': price_df.index[test_end - 1],
+            **result['params'],
+            f'train_{selection_metric}': result[f'train_{selection_metric}'],
+            'test_multiple': np.exp(oos.sum()),
+        })
+
+    # Overlapping test windows (step < test_size) keep the most recent fold's returns
+    oos_returns = pd.concat([
+        pd.Series(result['oos_returns'], index=price_df.index[train_end:test_end])
+        for (_, train_end, test_end), result in zip(folds, results)
+    ])
+    oos_returns = oos_returns[~oos_returns.index.duplicated(keep='last')].rename('oos_return')
+
+    return {
+        'folds': pd.DataFrame(rows),
+        'oos_returns': oos_returns,
+        'oos_cum': np.exp(oos_returns.cumsum()).rename('oos_cum'),
+    }
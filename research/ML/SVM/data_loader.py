@@ -1,11 +1,16 @@
-def load_crypto_data(symbol="BTC", fiat="USD", days=2000):
+def load_crypto_data(symbol="BTC", fiat="USD", days=2000, offline=False, cache_dir=None, provider=None):
+    import os
+    import sys
     import pandas as pd
     import numpy as np
-    import cryptocompare
-    import ta
 
-    print(f"Téléchargement des données {symbol}/{fiat} sur {days} jours...")
-    data = cryptocompare.get_historical_price_day(symbol, fiat, limit=days)
+    # Cache OHLCV et indicateurs partagés avec backtesting/
+    sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "..", "backtesting")))
+    from ohlcv_cache import load_ohlcv
+    import indicators
+
+    print(f"Chargement des données {symbol}/{fiat} sur {days} jours...")
+    data = load_ohlcv(symbol, fiat, limit=days, cache_dir=cache_dir, offline=offline, provider=provider)
     df = pd.DataFrame(data)
     df["date"] = pd.to_datetime(df["time"], unit="s")
     df.set_index("date", inplace=True)
@@ -32,13 +37,12 @@ def load_crypto_data(symbol="BTC", fiat="USD", days=2000):
 
     # === Calcul des indicateurs ===
     df["LogReturns"] = np.log(df["Close"] / df["Close"].shift(1))
-    df["RSI"] = ta.momentum.RSIIndicator(df["Close"], window=windows["RSI"]).rsi()
-    df["SMA_10"] = ta.trend.sma_indicator(df["Close"], window=windows["SMA_10"])
-    df["SMA_50"] = ta.trend.sma_indicator(df["Close"], window=windows["SMA_50"])
-    macd = ta.trend.MACD(df["Close"], window_slow=windows["MACD_diff"])
-    df["MACD_diff"] = macd.macd_diff()
-    bb = ta.volatility.BollingerBands(df["Close"], window=windows["BB_width"])
-    df["BB_width"] = (bb.bollinger_hband() - bb.bollinger_lband()) / df["Close"]
+    df["RSI"] = indicators.rsi(df["Close"], window=windows["RSI"])
+    df["SMA_10"] = indicators.sma(df["Close"], windows["SMA_10"])
+    df["SMA_50"] = indicators.sma(df["Close"], windows["SMA_50"])
+    _, _, df["MACD_diff"] = indicators.macd(df["Close"], window_slow=windows["MACD_diff"])
+    _, bb_upper, bb_lower = indicators.bollinger(df["Close"], window=windows["BB_width"])
+    df["BB_width"] = (bb_upper - bb_lower) / df["Close"]
 
     max_window = max(windows.values())
     df = df.iloc[max_window:].reset_index(drop=True)
@@ -0,0 +1,52 @@
+"""
+Score the saved MLP alpha model (written by alpha_train_optuna_mlp.py) on the test period.
+All test days are scored in one batch; the model can then stay warm behind a local socket,
+so a daily rebalance only sends its cross-section to the server (see src/mlp_scoring.py).
+"""
+
+import time
+
+# Local imports
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from src.data_loader import load_mini_features
+from src.preprocessing import split_data
+from src.mlp_scoring import AlphaScorer, LatencyStats, ScoringServer, DEFAULT_ADDRESS
+from src.simulate import simulate_portfolio
+
+# --- Config ---
+CSV_PATH = "mini_features.csv"
+COMPACT = True  # categorical tickers, int32 date codes, float32 features
+MODEL_PATH = "mlp_alpha_model.joblib"
+SCALER_PATH = "mlp_alpha_scaler.joblib"
+FEATURES_PATH = "mlp_alpha_features.json"
+SERVE = False             # keep the model loaded and answer ScoringClient requests
+ADDRESS = DEFAULT_ADDRESS  # (host, port), or a path for a Unix domain socket
+
+# --- Step 1: Load the model once ---
+scorer = AlphaScorer(MODEL_PATH, SCALER_PATH, FEATURES_PATH)
+print(f"📦 Model loaded in {scorer.load_seconds * 1e3:.0f} ms ({len(scorer.features)} features)")
+
+# --- Step 2: Load the test period ---
+df = load_mini_features(path=CSV_PATH, compact=COMPACT)
+_, _, test = split_data(df, copy=False)
+
+# --- Step 3: Score every test day in one batch and backtest ---
+start = time.time()
+alpha_list = scorer.score_days(test)
+print(f"🧮 Scored {len(test):,} rows over {len(alpha_list)} days in {(time.time() - start) * 1e3:.1f} ms")
+
+portfolio, sharpe = simulate_portfolio(test, alpha_list)
+print(f"📈 Sharpe Ratio on test (2017): {sharpe:.4f}")
+
+# --- Step 4: Latency of one cross-section, as scored by a daily rebalance ---
+scorer.latency = LatencyStats()
+for _, day in test.groupby("Date"):
+    scorer.score(day)
+latency = scorer.latency.summary()
+print(f"⏱️ Daily cross-section scoring: p50 {latency['p50_ms']:.3f} ms, p99 {latency['p99_ms']:.3f} ms")
+
+# --- Step 5: Optionally keep the model warm behind a local socket ---
+if SERVE:
+    ScoringServer(scorer, ADDRESS).serve_forever()
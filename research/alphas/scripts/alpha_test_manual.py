@@ -11,7 +11,8 @@ import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from src.data_loader import load_mini_features
-from src.utils_rank import rank
+from src.panel import Panel
+from src.operators import rank
 from src.simulate import simulate_portfolio_fast
 
 # --- Config ---
@@ -21,11 +22,19 @@ CSV_PATH = "mini_features.csv"
 df = load_mini_features(path=CSV_PATH)
 
 # --- Step 2: Define alpha manually ---
+# Operators work on (dates x tickers) matrices of the panel, then go back to the rows of df
+panel = Panel.from_frame(df, dtype=float)
+
 # Example: Reversal alpha = rank of 5-day return (lowest returns → highest rank)
-df["Alpha"] = rank(df, "Return_5d", ascending=True)
+alpha = rank(panel.feature("Return_5d"), ascending=True)
+
+# Optional: Try other alpha ideas here (import ts_corr, decay_linear, delta, ts_rank from src.operators,
+# with close, volume = panel.feature("Close"), panel.feature("Volume"))
+# alpha = rank(panel.feature("Volatility_5d"), ascending=False)
+# alpha = -ts_corr(rank(close), rank(volume), 10)                       # price/volume divergence
+# alpha = rank(decay_linear(-delta(close, 5), 10)) * ts_rank(volume, 20)
 
-# Optional: Try other alpha ideas here
-# df["Alpha"] = rank(df, "Volatility_5d", ascending=False)
+df["Alpha"] = panel.to_vector(alpha)
 
 # --- Step 3: Backtest alpha signal ---
 portfolio, sharpe = simulate_portfolio_fast(df)
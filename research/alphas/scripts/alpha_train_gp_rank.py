@@ -11,12 +11,24 @@ from gplearn.genetic import SymbolicRegressor
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.data_loader import load_mini_features
+from src.data_loader import load_mini_features, memory_footprint
 from src.preprocessing import split_data, scale_features
-from src.fitness import create_spearman_rank_fitness
+from src.operators import gp_function_set
+from src.expression import FormulaLibrary
+from src.alpha_library import AlphaLibrary
+from src.panel import Panel
+from src.simulate import SimulationPlan
+from src.fitness import create_spearman_rank_fitness, FitnessCache
 
 # --- Config ---
 CSV_PATH = "mini_features.csv"
+COMPACT = True  # categorical tickers, int32 date codes, float32 features
+FITNESS_CACHE_PATH = "gp_rank_fitness_cache.json"  # reused by later runs on the same data
+FORMULA_LIBRARY_PATH = "alpha_formulas.json"  # best programs of every run, see src/expression.py
+TOP_N_FORMULAS = 20
+ALPHA_LIBRARY_DIR = "alpha_library"  # validation PnL of every admitted alpha, see src/alpha_library.py
+MAX_ALPHA_CORR = 0.7  # new alphas more correlated than this with a stored one are rejected
+TS_WINDOWS = (5, 10)  # windows of the time-series operators in the function set
 FEATURES = [
     "Open", "High", "Low", "Close", "Volume",
     "Return_1d", "Return_5d", "Volatility_5d", "Volatility_20d",
@@ -25,19 +37,26 @@ FEATURES = [
 ]
 
 # --- Step 1: Load dataset and create Target column ---
-df = load_mini_features(path=CSV_PATH)
+df = load_mini_features(path=CSV_PATH, compact=COMPACT)
 df["Target"] = df.groupby("Ticker")["Return_1d"].shift(-1)
 df = df.dropna()
 
-train, val, test = split_data(df)
-X_val, _, _, _ = scale_features(val, val, val, FEATURES)  # use only val set for IC fitness
+train, val, test = split_data(df, copy=False)  # views of df
+memory_footprint({"df": df, "train": train, "val": val, "test": test})
+X_val, _, _, scaler = scale_features(val, val, val, FEATURES,  # use only val set for IC fitness
+                                     dtype=np.float32 if COMPACT else None)
 
 # --- Step 2: Create Spearman-based fitness function ---
-spearman_fitness = create_spearman_rank_fitness(val)
+fitness_cache = FitnessCache(path=FITNESS_CACHE_PATH)
+spearman_fitness = create_spearman_rank_fitness(val, cache=fitness_cache)
+
+# Cross-sectional / time-series operators, bound to the val rows the programs are evaluated on.
+# model.predict on other rows needs `with with_frame(model, test):` (src/operators.py)
+operator_functions = gp_function_set(val, windows=TS_WINDOWS)
 
 # --- Step 3: Train GP model ---
 model = SymbolicRegressor(
-    function_set=["add", "sub", "mul", "div", "log", "abs", "neg"],
+    function_set=["add", "sub", "mul", "div", "log", "abs", "neg"] + operator_functions,
     population_size=300,
     generations=15,
     parsimony_coefficient=0.0001,
@@ -53,8 +72,36 @@ model = SymbolicRegressor(
 print("🧠 Training GP model with Spearman rank correlation (IC) fitness...")
 start = time.time()
 model.fit(X_val, val["Target"].values)
-print(f"✅ Training completed in {time.time() - start:.2f} seconds\n")
+print(f"✅ Training completed in {time.time() - start:.2f} seconds")
+print(f"🗃️ Fitness cache: {fitness_cache.stats()}\n")
+fitness_cache.save()
 
 # --- Step 4: Output result ---
 print("📈 Best symbolic alpha discovered:\n")
-print(model._program)
\ No newline at end of file
+print(model._program)
+
+# --- Step 5: Save the best programs to the formula library ---
+library = FormulaLibrary(path=FORMULA_LIBRARY_PATH)
+added = library.add_programs(model, FEATURES, metric="neg_rank_ic", scaler=scaler,
+                             top_n=TOP_N_FORMULAS, source=os.path.basename(__file__))
+library.save()
+print(f"\n📚 {added} formulas added to {FORMULA_LIBRARY_PATH} ({len(library)} in the library)")
+
+# --- Step 6: Admit the new formulas to the alpha library (deduplicated on their 2016 PnL) ---
+if added:
+    formulas = library.formulas[-added:]
+    panel = Panel.from_frame(val, features=FEATURES, dtype=float)
+    alphas = library.graph.evaluate(panel, library.roots[-added:])
+    plan = SimulationPlan(val)
+    pnl = plan.daily_returns(np.stack([panel.to_vector(alpha) for alpha in alphas], axis=1))
+
+    alpha_library = AlphaLibrary(ALPHA_LIBRARY_DIR, max_corr=MAX_ALPHA_CORR)
+    results = alpha_library.add_many(
+        pnl, kind="formula", dates=plan.dates,
+        references=[{key: formula[key] for key in ("program", "features", "scaling")} for formula in formulas],
+        metrics=[{"neg_rank_ic": formula["fitness"]} for formula in formulas],
+        source=os.path.basename(__file__),
+    )
+    admitted = sum(result[0] for result in results)
+    print(f"🧬 {admitted}/{added} new formulas admitted to {ALPHA_LIBRARY_DIR} "
+          f"({len(alpha_library)} alphas, max |corr| {MAX_ALPHA_CORR})")
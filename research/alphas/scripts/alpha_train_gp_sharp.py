@@ -10,12 +10,31 @@ from gplearn.genetic import SymbolicRegressor
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.data_loader import load_mini_features
+from src.data_loader import load_mini_features, memory_footprint
 from src.preprocessing import split_data, scale_features
-from src.fitness import create_neg_sharpe_fitness
+from src.operators import gp_function_set
+from src.expression import FormulaLibrary
+from src.alpha_library import AlphaLibrary
+from src.panel import Panel
+from src.simulate import SimulationPlan
+from src.fitness import create_neg_sharpe_fitness, FitnessCache
 
 # --- Config ---
 CSV_PATH = "mini_features.csv"
+COMPACT = True  # categorical tickers, int32 date codes, float32 features
+FITNESS_CACHE_PATH = "gp_sharpe_fitness_cache.json"  # reused by later runs on the same data
+POPULATION_SIZE = 300
+# Successive halving, e.g. ((0.25, 0.3),): score on 25% of the dates, only the best 30% get the full
+# evaluation. It keeps its promotion thresholds in one process, so it trades all cores for ~30% fewer
+# simulations: only worth it on a single core (None: always full)
+FIDELITY_SCHEDULE = None
+# Evaluate each generation's programs on all cores
+N_JOBS = 1 if FIDELITY_SCHEDULE else -1
+FORMULA_LIBRARY_PATH = "alpha_formulas.json"  # best programs of every run, see src/expression.py
+TOP_N_FORMULAS = 20
+ALPHA_LIBRARY_DIR = "alpha_library"  # validation PnL of every admitted alpha, see src/alpha_library.py
+MAX_ALPHA_CORR = 0.7  # new alphas more correlated than this with a stored one are rejected
+TS_WINDOWS = (5, 10)  # windows of the time-series operators in the function set
 FEATURES = [
     "Open", "High", "Low", "Close", "Volume",
     "Return_1d", "Return_5d", "Volatility_5d", "Volatility_20d",
@@ -24,24 +43,33 @@ FEATURES = [
 ]
 
 # --- Step 1: Load and prepare dataset ---
-df = load_mini_features(path=CSV_PATH)
+df = load_mini_features(path=CSV_PATH, compact=COMPACT)
 df["Target"] = df.groupby("Ticker")["Return_1d"].shift(-1)
 df = df.dropna()
 
-# Use the full train DataFrame as template (features + Date, Ticker, Return_1d)
-train, val, test = split_data(df)
-template_df = train.copy()
+# The train DataFrame is the simulation template (features + Date, Ticker, Return_1d)
+train, val, test = split_data(df, copy=False)  # views of df
+memory_footprint({"df": df, "train": train, "val": val, "test": test})
 
 # Scale features
-X_train, _, _, _ = scale_features(train, val, test, FEATURES)
+X_train, _, _, scaler = scale_features(train, val, test, FEATURES, dtype=np.float32 if COMPACT else None)
 
 # --- Step 2: Create fitness function ---
-neg_sharpe_fitness = create_neg_sharpe_fitness(template_df)
+# Worker copies of a cache would be pickled with every batch of programs and then discarded,
+# so the cache is only used in-process (N_JOBS == 1)
+fitness_cache = FitnessCache(path=FITNESS_CACHE_PATH) if N_JOBS == 1 else None
+# With N_JOBS != 1 the metric is picklable and backed by memory-mapped arrays, so workers do not receive the DataFrame
+neg_sharpe_fitness = create_neg_sharpe_fitness(train, cache=fitness_cache, shared=N_JOBS != 1,
+                                               fidelity=FIDELITY_SCHEDULE, population_size=POPULATION_SIZE)
+
+# Cross-sectional / time-series operators, bound to the train rows the programs are evaluated on.
+# model.predict on other rows needs `with with_frame(model, val):` (src/operators.py)
+operator_functions = gp_function_set(train, windows=TS_WINDOWS)
 
 # --- Step 3: Train Symbolic Regressor ---
 model = SymbolicRegressor(
-    function_set=["add", "sub", "mul", "div", "log", "abs", "neg"],
-    population_size=300,
+    function_set=["add", "sub", "mul", "div", "log", "abs", "neg"] + operator_functions,
+    population_size=POPULATION_SIZE,
     generations=15,
     parsimony_coefficient=0.0001,
     max_samples=0.9,
@@ -50,14 +78,46 @@ model = SymbolicRegressor(
     verbose=1,
     metric=neg_sharpe_fitness,
     random_state=42,
-    stopping_criteria=-np.inf
+    stopping_criteria=-np.inf,
+    n_jobs=N_JOBS
 )
 
 print("🧠 Training GP model with Sharpe fitness...")
 start = time.time()
 model.fit(X_train, train["Target"].values)
-print(f"✅ Training completed in {time.time() - start:.2f} seconds\n")
+print(f"✅ Training completed in {time.time() - start:.2f} seconds")
+if fitness_cache is not None:
+    print(f"🗃️ Fitness cache: {fitness_cache.stats()}\n")
+    fitness_cache.save()
+else:
+    print("🗃️ Fitness cache: disabled with parallel workers\n")
 
 # --- Step 4: Output discovered formula ---
 print("📈 Best symbolic alpha discovered:\n")
-print(model._program)
\ No newline at end of file
+print(model._program)
+
+# --- Step 5: Save the best programs to the formula library ---
+library = FormulaLibrary(path=FORMULA_LIBRARY_PATH)
+added = library.add_programs(model, FEATURES, metric="neg_sharpe", scaler=scaler,
+                             top_n=TOP_N_FORMULAS, source=os.path.basename(__file__))
+library.save()
+print(f"\n📚 {added} formulas added to {FORMULA_LIBRARY_PATH} ({len(library)} in the library)")
+
+# --- Step 6: Admit the new formulas to the alpha library (deduplicated on their 2016 PnL) ---
+if added:
+    formulas = library.formulas[-added:]
+    panel = Panel.from_frame(val, features=FEATURES, dtype=float)
+    alphas = library.graph.evaluate(panel, library.roots[-added:])
+    plan = SimulationPlan(val)
+    pnl = plan.daily_returns(np.stack([panel.to_vector(alpha) for alpha in alphas], axis=1))
+
+    alpha_library = AlphaLibrary(ALPHA_LIBRARY_DIR, max_corr=MAX_ALPHA_CORR)
+    results = alpha_library.add_many(
+        pnl, kind="formula", dates=plan.dates,
+        references=[{key: formula[key] for key in ("program", "features", "scaling")} for formula in formulas],
+        metrics=[{"neg_sharpe": formula["fitness"]} for formula in formulas],
+        source=os.path.basename(__file__),
+    )
+    admitted = sum(result[0] for result in results)
+    print(f"🧬 {admitted}/{added} new formulas admitted to {ALPHA_LIBRARY_DIR} "
+          f"({len(alpha_library)} alphas, max |corr| {MAX_ALPHA_CORR})")
@@ -1,15 +1,15 @@
 """
 Train a Multi-Layer Perceptron (MLP) to generate alpha signals.
 Use Optuna to tune hyperparameters based on validation Sharpe ratio.
+
+Trials run in N_WORKERS processes sharing a journal-file study and the scaled matrices;
+each trial reports its validation Sharpe during training so the pruner stops bad trials early.
 """
 
-import optuna
 import json
 import joblib
 import numpy as np
 import pandas as pd
-from sklearn.neural_network import MLPRegressor
-from sklearn.preprocessing import StandardScaler
 
 import matplotlib.pyplot as plt
 
@@ -17,127 +17,118 @@ import matplotlib.pyplot as plt
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
-from src.data_loader import load_mini_features
-from src.preprocessing import split_data
-from src.simulate import simulate_portfolio_fast
+from src.data_loader import load_mini_features, memory_footprint
+from src.preprocessing import split_data, scale_features
+from src.simulate import SimulationPlan
+from src.optuna_parallel import MLPObjective, train_mlp, run_parallel_study
+from src.alpha_library import AlphaLibrary, daily_pnl
 
 # --- Config ---
 CSV_PATH = "mini_features.csv"
+COMPACT = True  # categorical tickers, int32 date codes, float32 features
 FEATURES = [
     "Return_5d", "Volatility_5d", "Volatility_20d", "Volume_Relative",
     "Range", "Close_to_Low", "Close_to_High", "Close_vs_Open", "ZScore_Price_20d"
 ]
-
-# --- Step 1: Load and split dataset ---
-df = load_mini_features(path=CSV_PATH)
-df["Target"] = df.groupby("Ticker")["Return_1d"].shift(-1)
-df = df.dropna()
-
-train, val, test = split_data(df)
-
-X_train = train[FEATURES].values
-y_train = train["Target"].values
-X_val = val[FEATURES].values
-y_val = val["Target"].values
-X_test = test[FEATURES].values
-y_test = test["Target"].values
-
-# --- Step 2: Normalize ---
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_val_scaled = scaler.transform(X_val)
-X_test_scaled = scaler.transform(X_test)
-
-# --- Step 3: Define Optuna objective ---
-def objective(trial):
-    hidden_layer_sizes = (
-        trial.suggest_int("n_units_l1", 32, 256),
-        trial.suggest_int("n_units_l2", 32, 256)
+N_TRIALS = 100
+N_WORKERS = os.cpu_count()
+TIMEOUT = None                      # optional wall-clock budget per worker (seconds)
+STUDY_NAME = "mlp_alpha"
+STORAGE_PATH = "mlp_optuna.log"     # journal file, a rerun resumes the study
+REPORT_EVERY = 100                  # training iterations between two pruning checks
+ALPHA_LIBRARY_DIR = "alpha_library"  # validation PnL of every admitted alpha, see src/alpha_library.py
+MAX_ALPHA_CORR = 0.7
+
+
+def main():
+    # --- Step 1: Load and split dataset ---
+    df = load_mini_features(path=CSV_PATH, compact=COMPACT)
+    df["Target"] = df.groupby("Ticker")["Return_1d"].shift(-1)
+    df = df.dropna()
+
+    train, val, test = split_data(df, copy=False)  # views of df
+    memory_footprint({"df": df, "train": train, "val": val, "test": test})
+
+    # --- Step 2: Normalize ---
+    dtype = np.float32 if COMPACT else None
+    X_train_scaled, X_val_scaled, _, scaler = scale_features(train, val, test, FEATURES, dtype=dtype)
+
+    # --- Step 3: Optuna objective on shared arrays ---
+    objective = MLPObjective(X_train_scaled, train["Target"].values, X_val_scaled, SimulationPlan(val),
+                             chunk=REPORT_EVERY)
+
+    # --- Step 4: Run optimization ---
+    print(f"🔍 Running Optuna optimization ({N_TRIALS} trials, {N_WORKERS} workers)...")
+    study = run_parallel_study(objective, study_name=STUDY_NAME, storage_path=STORAGE_PATH,
+                               n_trials=N_TRIALS, n_workers=N_WORKERS, timeout=TIMEOUT)
+    objective.shared.close()
+
+    states = pd.Series([t.state.name for t in study.trials]).value_counts()
+    print("🧪 Trials:", states.to_dict())
+    best_params = study.best_params
+    print("✅ Best hyperparameters found:", best_params)
+
+    # --- Step 5: Retrain on train + val ---
+    trainval = df.iloc[:len(train) + len(val)]  # train and val are consecutive rows of df
+    X_trainval_scaled, X_val_scaled, X_test_scaled, scaler = scale_features(trainval, val, test, FEATURES, dtype=dtype)
+
+    # Same chunked training as the trials
+    model = train_mlp(best_params, X_trainval_scaled, trainval["Target"].values, chunk=REPORT_EVERY)
+
+    # --- Step 6: Save model and config ---
+    joblib.dump(model, "mlp_alpha_model.joblib")
+    joblib.dump(scaler, "mlp_alpha_scaler.joblib")
+    with open("mlp_alpha_features.json", "w") as f:
+        json.dump(FEATURES, f)
+    print("💾 MLP model and config saved.")
+
+    # --- Step 7: Evaluate on val and test ---
+    portfolio_val, sharpe_val = SimulationPlan(val).simulate(model.predict(X_val_scaled))
+    portfolio_test, sharpe_test = SimulationPlan(test).simulate(model.predict(X_test_scaled))
+
+    print(f"\n📊 Sharpe Ratio on validation (2016): {sharpe_val:.4f}")
+    print(f"📈 Sharpe Ratio on test (2017): {sharpe_test:.4f}")
+
+    # --- Step 8: Admit the model to the alpha library (deduplicated on its 2016 PnL) ---
+    # mlp_alpha_*.joblib are overwritten by every run, so the library keeps its own copy,
+    # named after the content hash of the model and scaler
+    alpha_library = AlphaLibrary(ALPHA_LIBRARY_DIR, max_corr=MAX_ALPHA_CORR)
+    model_dir = os.path.join(ALPHA_LIBRARY_DIR, "models")
+    os.makedirs(model_dir, exist_ok=True)
+    digest = joblib.hash((model, scaler))[:16]
+    model_path = os.path.join(model_dir, f"mlp_{digest}_model.joblib")
+    scaler_path = os.path.join(model_dir, f"mlp_{digest}_scaler.joblib")
+    joblib.dump(model, model_path)
+    joblib.dump(scaler, scaler_path)
+
+    admitted, max_corr, nearest = alpha_library.add(
+        daily_pnl(portfolio_val), kind="model",
+        reference={"model": model_path, "scaler": scaler_path, "features": FEATURES, "params": best_params},
+        metrics={"sharpe_test": float(sharpe_test)},
+        source=os.path.basename(__file__),
     )
-    activation = trial.suggest_categorical("activation", ["identity", "logistic", "tanh", "relu"])
-    solver = trial.suggest_categorical("solver", ["lbfgs", "adam"])
-    alpha = trial.suggest_float("alpha", 1e-6, 1e-1, log=True)
-    learning_rate_init = trial.suggest_float("learning_rate_init", 1e-4, 1.0, log=True)
-
-    model = MLPRegressor(
-        hidden_layer_sizes=hidden_layer_sizes,
-        activation=activation,
-        solver=solver,
-        alpha=alpha,
-        learning_rate_init=learning_rate_init,
-        max_iter=2000,
-        early_stopping=True,
-        validation_fraction=0.1,
-        random_state=42
-    )
-
-    model.fit(X_train_scaled, y_train)
-    val_copy = val.copy()
-    val_copy["Alpha"] = model.predict(X_val_scaled)
-
-    alpha_list_val = [
-        group[["Ticker", "Alpha"]] for _, group in val_copy.groupby("Date")
-    ]
-    _, sharpe_val = simulate_portfolio_fast(val_copy)
-    return -sharpe_val  # Optuna minimizes
-
-# --- Step 4: Run optimization ---
-study = optuna.create_study(direction="minimize")
-print("🔍 Running Optuna optimization...")
-study.optimize(objective, n_trials=20)
-
-best_params = study.best_params
-print("✅ Best hyperparameters found:", best_params)
-
-# --- Step 5: Retrain on train + val ---
-X_trainval = pd.concat([train, val])[FEATURES].values
-y_trainval = pd.concat([train, val])["Target"].values
-X_trainval_scaled = scaler.fit_transform(X_trainval)
-X_test_scaled = scaler.transform(X_test)
-
-model = MLPRegressor(
-    hidden_layer_sizes=(best_params["n_units_l1"], best_params["n_units_l2"]),
-    activation=best_params["activation"],
-    solver=best_params["solver"],
-    alpha=best_params["alpha"],
-    learning_rate_init=best_params["learning_rate_init"],
-    max_iter=2000,
-    early_stopping=True,
-    validation_fraction=0.1,
-    random_state=42
-)
-model.fit(X_trainval_scaled, y_trainval)
-
-# --- Step 6: Save model and config ---
-joblib.dump(model, "mlp_alpha_model.joblib")
-joblib.dump(scaler, "mlp_alpha_scaler.joblib")
-with open("mlp_alpha_features.json", "w") as f:
-    json.dump(FEATURES, f)
-print("💾 MLP model and config saved.")
-
-# --- Step 7: Evaluate on val and test ---
-val = val.copy()
-test = test.copy()
-val["Alpha"] = model.predict(X_val_scaled)
-test["Alpha"] = model.predict(X_test_scaled)
-
-alpha_list_val = [group[["Ticker", "Alpha"]] for _, group in val.groupby("Date")]
-alpha_list_test = [group[["Ticker", "Alpha"]] for _, group in test.groupby("Date")]
-
-portfolio_val, sharpe_val = simulate_portfolio_fast(val)
-portfolio_test, sharpe_test = simulate_portfolio_fast(test)
-
-print(f"\n📊 Sharpe Ratio on validation (2016): {sharpe_val:.4f}")
-print(f"📈 Sharpe Ratio on test (2017): {sharpe_test:.4f}")
-
-# --- Step 8: Plot ---
-plt.figure(figsize=(10, 5))
-portfolio_val.plot(label="Validation 2016")
-portfolio_test.plot(label="Test 2017")
-plt.title("MLP Alpha Portfolio Value (Val & Test)")
-plt.xlabel("Date")
-plt.ylabel("Portfolio Value ($)")
-plt.legend()
-plt.grid()
-plt.tight_layout()
-plt.show()
+    if admitted:
+        print(f"🧬 Model admitted to {ALPHA_LIBRARY_DIR} as {model_path} ({len(alpha_library)} alphas)")
+    else:
+        # Identical models share their files: only remove them if no stored alpha refers to them
+        if not any(meta["reference"].get("model") == model_path for meta in alpha_library.meta
+                   if isinstance(meta["reference"], dict)):
+            os.remove(model_path)
+            os.remove(scaler_path)
+        print(f"🧬 Model not admitted: |corr| {max_corr:.2f} with alpha {nearest} of {ALPHA_LIBRARY_DIR}")
+
+    # --- Step 9: Plot ---
+    plt.figure(figsize=(10, 5))
+    portfolio_val.plot(label="Validation 2016")
+    portfolio_test.plot(label="Test 2017")
+    plt.title("MLP Alpha Portfolio Value (Val & Test)")
+    plt.xlabel("Date")
+    plt.ylabel("Portfolio Value ($)")
+    plt.legend()
+    plt.grid()
+    plt.tight_layout()
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+import datetime
+import json
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def daily_pnl(portfolio, capital_start=1_000):
+    """
+    Daily returns of portfolio value curves, as returned by simulate_portfolio_fast or SimulationPlan.
+
+    Args:
+        portfolio (pd.Series, pd.DataFrame or np.ndarray): (dates,) or (dates x K) portfolio values.
+        capital_start (float): Capital before the first date.
+
+    Returns:
+        Same type as portfolio: the return of every date, including the first one.
+    """
+    values = np.asarray(portfolio, dtype=float)
+    previous = np.concatenate([np.full((1,) + values.shape[1:], float(capital_start)), values[:-1]])
+    returns = values / previous - 1
+    if isinstance(portfolio, pd.DataFrame):
+        return pd.DataFrame(returns, index=portfolio.index, columns=portfolio.columns)
+    if isinstance(portfolio, pd.Series):
+        return pd.Series(returns, index=portfolio.index, name="PnL")
+    return returns
+
+
+class AlphaLibrary:
+    """
+    On-disk store of alphas with their daily PnL, for correlation-based deduplication.
+
+    A library is a directory with:
+      - dates.json: the common date axis of the PnL vectors,
+      - meta.jsonl: one JSON line per alpha (kind, formula or model reference, metrics, source),
+      - pnl.f32: a memory-mapped (capacity x dates) float32 matrix, one row per alpha.
+    The id of an alpha is its row in the PnL matrix.
+
+    Rows hold the PnL centered and scaled to a unit norm, so the correlations of a candidate
+    with every stored alpha are a single matrix-vector product. PnL vectors are aligned on the
+    library dates (other dates are dropped). Stored rows are 0 on their missing dates, and a
+    candidate with missing dates is compared on the dates it has: two more products give the
+    stored sums and squares on those dates.
+    The library assumes a single writer.
+
+    Args:
+        directory (str): Library directory, created if needed.
+        dates (pd.DatetimeIndex): Date axis of a new library. Defaults to the dates of the first alpha added.
+        max_corr (float): Alphas whose |correlation| with a stored alpha exceeds this are rejected.
+        capacity (int): Initial number of rows of the PnL file (doubled when full).
+    """
+
+    def __init__(self, directory, dates=None, max_corr=0.7, capacity=1024):
+        self.directory = directory
+        self.max_corr = max_corr
+        self.capacity = capacity
+        self.meta = []
+        self.dates = None
+        self._pnl = None
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self._path("dates.json")):
+            self._load()
+        elif dates is not None:
+            self._create(dates)
+
+    def __len__(self):
+        return len(self.meta)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _create(self, dates):
+        self.dates = pd.DatetimeIndex(pd.to_datetime(dates), name="Date")
+        with open(self._path("dates.json"), "w") as f:
+            json.dump([date.isoformat() for date in self.dates], f)
+        open(self._path("meta.jsonl"), "w").close()
+        self._resize(self.capacity)
+
+    def _load(self):
+        with open(self._path("dates.json")) as f:
+            self.dates = pd.DatetimeIndex(pd.to_datetime(json.load(f)), name="Date")
+        with open(self._path("meta.jsonl")) as f:
+            self.meta = [json.loads(line) for line in f if line.strip()]
+        row_bytes = 4 * len(self.dates)
+        self._resize(max(os.path.getsize(self._path("pnl.f32")) // row_bytes, len(self.meta), 1))
+
+    def _resize(self, capacity):
+        # Grow the file in place, then map it again with the new shape
+        path = self._path("pnl.f32")
+        if self._pnl is not None:
+            self._pnl.flush()
+            self._pnl = None
+        with open(path, "ab") as f:
+            if f.tell() < capacity * 4 * len(self.dates):
+                f.truncate(capacity * 4 * len(self.dates))
+        self.capacity = capacity
+        self._pnl = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, len(self.dates)))
+
+    @property
+    def pnl(self):
+        """(alphas x dates) normalized PnL matrix (memory-mapped, read-only use)."""
+        if self._pnl is None:
+            return np.empty((0, 0), dtype=np.float32)
+        return self._pnl[:len(self.meta)]
+
+    def normalize(self, pnl, dates=None):
+        """
+        Align PnL vectors on the library dates, center them and scale them to a unit norm.
+
+        Args:
+            pnl (pd.Series, pd.DataFrame or np.ndarray): (dates,) or (dates x K) daily PnL.
+            dates (pd.DatetimeIndex): Dates of the rows of pnl. Defaults to its index;
+                                      plain arrays must already be on the library dates.
+
+        Returns:
+            np.ndarray: (K x library dates) float32, rows of zeros for constant PnL.
+        """
+        return self._normalize(pnl, dates)[0]
+
+    def _normalize(self, pnl, dates=None):
+        # normalize() plus the (K x library dates) mask of the dates each vector has
+        if dates is None and isinstance(pnl, (pd.Series, pd.DataFrame)):
+            dates = pnl.index
+        values = np.asarray(pnl, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        if self.dates is None:
+            if dates is None:
+                raise ValueError("The first alpha of a library needs its dates")
+            self._create(dates)
+
+        if dates is not None:
+            positions = pd.DatetimeIndex(pd.to_datetime(dates)).get_indexer(self.dates)
+            aligned = np.full((len(self.dates), values.shape[1]), np.nan)
+            aligned[positions >= 0] = values[positions[positions >= 0]]
+            values = aligned
+        elif len(values) != len(self.dates):
+            raise ValueError(f"Expected {len(self.dates)} PnL dates, got {len(values)}")
+
+        finite = np.isfinite(values)
+        values = np.where(finite, values, 0.0)
+        mean = values.sum(axis=0) / np.maximum(finite.sum(axis=0), 1)
+        centered = np.where(finite, values - mean, 0.0)
+        norms = np.linalg.norm(centered, axis=0)
+        flat = norms < 1e-12  # constant PnL, up to the rounding of the mean
+        return np.where(flat, 0.0, centered / np.where(flat, 1.0, norms)).T.astype(np.float32), finite.T
+
+    @staticmethod
+    def _overlap_correlations(candidates, observed, rows):
+        # Pearson correlation of unit candidates with rows, on the dates observed by each candidate.
+        # Candidates are centered on their dates and 0 elsewhere, so the covariance is the plain
+        # product; the rows are only re-centered and re-scaled on the candidate's dates.
+        corr = candidates @ rows.T
+        partial = ~observed.all(axis=1)
+        if partial.any() and len(rows):
+            mask = observed[partial].astype(np.float32)
+            n_dates = np.maximum(mask.sum(axis=1, keepdims=True), 1)
+            sums = mask @ rows.T
+            variance = mask @ np.square(rows).T - np.square(sums) / n_dates
+            corr[partial] /= np.sqrt(np.where(variance > 1e-12, variance, np.inf))
+        return corr
+
+    def correlations(self, pnl, dates=None):
+        """
+        Correlation of candidate PnL vectors with every stored alpha, in one matrix product.
+
+        Returns:
+            np.ndarray: (len(library),) for one vector, (K x len(library)) for a (dates x K) input.
+        """
+        single = np.ndim(pnl) == 1
+        candidates, observed = self._normalize(pnl, dates)
+        corr = self._overlap_correlations(candidates, observed, self.pnl)
+        return corr[0] if single else corr
+
+    def add(self, pnl, kind, reference, metrics=None, source=None, dates=None, force=False):
+        """
+        Admit one alpha unless it duplicates a stored one.
+
+        Args:
+            pnl (pd.Series or np.ndarray): Daily PnL (see daily_pnl).
+            kind (str): 'formula', 'model', ...
+            reference: JSON-serializable formula string or model reference.
+            metrics (dict): Metrics stored with the alpha. The annualized Sharpe ratio of pnl is added.
+            source (str): Free-form origin, e.g. the script name.
+            dates (pd.DatetimeIndex): Dates of pnl if it is not a Series.
+            force (bool): Store the alpha even if it is correlated with the library.
+
+        Returns:
+            tuple: (admitted, max |correlation|, id of the most correlated stored alpha or None)
+        """
+        if isinstance(pnl, pd.Series):
+            pnl = pnl.to_frame()
+        else:
+            pnl = np.asarray(pnl)[:, None]
+        return self.add_many(pnl, kind, [reference], None if metrics is None else [metrics],
+                             source, dates, force)[0]
+
+    def add_many(self, pnl, kind, references, metrics=None, source=None, dates=None, force=False):
+        """
+        Admit several alphas, e.g. the best programs of a GP run, in the given order.
+
+        The candidates are checked against the library with one matrix product (three when
+        they miss some of the library dates), and against the candidates admitted before them.
+
+        Args:
+            pnl (pd.DataFrame or np.ndarray): (dates x K) daily PnL, one column per alpha.
+            references (list): K formula strings or model references.
+            metrics (list): Optional K metric dicts.
+
+        Returns:
+            list: (admitted, max |correlation|, nearest id) per candidate, see add().
+        """
+        if dates is None and isinstance(pnl, pd.DataFrame):
+            dates = pnl.index
+        values = np.asarray(pnl, dtype=float)
+        candidates, observed = self._normalize(values, dates)
+        stored_corr = np.abs(self._overlap_correlations(candidates, observed, self.pnl))
+        sharpes = _sharpe(values)
+        metrics = metrics or [None] * len(candidates)
+
+        results, admitted_rows, new_meta = [], [], []
+        for k, candidate in enumerate(candidates):
+            nearest, max_corr = None, 0.0
+            if len(self.meta):
+                nearest = int(np.argmax(stored_corr[k]))
+                max_corr = float(stored_corr[k, nearest])
+            if admitted_rows and not force:
+                within = np.abs(self._overlap_correlations(candidate[None], observed[k][None],
+                                                           candidates[admitted_rows])[0])
+                position = int(np.argmax(within))
+                if within[position] > max_corr:
+                    nearest, max_corr = new_meta[position]["id"], float(within[position])
+
+            admitted = force or (np.any(candidate) and max_corr <= self.max_corr)
+            results.append((bool(admitted), max_corr, nearest))
+            if admitted:
+                admitted_rows.append(k)
+                new_meta.append({
+                    "id": len(self.meta) + len(new_meta),
+                    "kind": kind,
+                    "reference": references[k],
+                    "metrics": {"sharpe": float(sharpes[k]), **(metrics[k] or {})},
+                    "source": source,
+                    "max_corr": max_corr,
+                    "nearest": nearest,
+                })
+
+        if admitted_rows:
+            self._append(candidates[admitted_rows], new_meta)
+        return results
+
+    def _append(self, rows, metas):
+        n_stored = len(self.meta)
+        capacity = self.capacity
+        while capacity < n_stored + len(rows):
+            capacity *= 2
+        if capacity != self.capacity:
+            self._resize(capacity)
+
+        # PnL rows first: a crash before the meta lines only leaves unused rows
+        self._pnl[n_stored:n_stored + len(rows)] = rows
+        self._pnl.flush()
+
+        added = datetime.datetime.now().isoformat(timespec="seconds")
+        metas = [{**meta, "added": added} for meta in metas]
+        with open(self._path("meta.jsonl"), "a") as f:
+            f.writelines(json.dumps(meta) + "\n" for meta in metas)
+        self.meta.extend(metas)
+
+    def to_frame(self):
+        """One row per stored alpha: id, kind, source, metrics, max_corr, nearest, added."""
+        rows = [{key: value for key, value in meta.items() if key not in ("reference", "metrics")}
+                | meta["metrics"] for meta in self.meta]
+        return pd.DataFrame(rows)
+
+
+def _sharpe(pnl, periods_per_year=252):
+    # Annualized Sharpe ratio of every column of a (dates x K) daily PnL matrix, NaN days ignored
+    pnl = np.where(np.isfinite(pnl), pnl, np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+        mean = np.nanmean(pnl, axis=0)
+        std = np.nanstd(pnl, axis=0)
+    return np.where(std > 0, mean / np.where(std > 0, std, 1.0) * np.sqrt(periods_per_year), 0.0)
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import time
+
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2016-01-01", periods=252)
+    directory = tempfile.mkdtemp(prefix="alpha_library_")
+
+    # Correlations must match np.corrcoef, also after reopening the library
+    library = AlphaLibrary(directory, max_corr=0.7)
+    base = pd.DataFrame(rng.normal(0, 0.01, (252, 50)), index=dates)
+    results = library.add_many(base, kind="random", references=[f"alpha_{k}" for k in range(50)])
+    assert all(admitted for admitted, _, _ in results)
+
+    library = AlphaLibrary(directory)
+    candidate = base[3] + rng.normal(0, 0.002, 252)
+    expected = np.corrcoef(np.c_[candidate.to_numpy(), base.to_numpy()].T)[0, 1:]
+    assert np.allclose(library.correlations(candidate), expected, atol=1e-5)
+
+    admitted, max_corr, nearest = library.add(candidate, kind="random", reference="copy_of_3")
+    assert not admitted and nearest == 3, (admitted, max_corr, nearest)
+    admitted, _, _ = library.add(-candidate, kind="random", reference="negated_copy_of_3")
+    assert not admitted
+    admitted, _, _ = library.add(pd.Series(0.001, index=dates), kind="random", reference="constant")
+    assert not admitted
+
+    # Shorter PnL (e.g. an alpha simulated on part of the year) is compared on its own dates
+    short = base[7].iloc[100:200]
+    expected = np.corrcoef(np.c_[short.to_numpy(), base.iloc[100:200].to_numpy()].T)[0, 1:]
+    assert np.allclose(library.correlations(short)[:50], expected, atol=1e-5)
+    admitted, max_corr, nearest = library.add(short, kind="random", reference="partial_copy_of_7")
+    assert not admitted and nearest == 7 and max_corr > 0.99, (admitted, max_corr, nearest)
+    results = library.add_many(pd.concat([base[11].iloc[:120], base[11].iloc[:120]], axis=1),
+                               kind="random", references=["partial_11", "partial_11_again"])
+    assert not any(admitted for admitted, _, _ in results), results
+
+    # Admission time with tens of thousands of stored alphas
+    n_alphas = 50_000
+    noise = rng.normal(0, 0.01, (252, n_alphas - len(library)))
+    start = time.time()
+    library.add_many(noise, kind="random", references=[None] * noise.shape[1], dates=dates, force=True)
+    print(f"📥 Stored {len(library):,} alphas in {time.time() - start:.2f}s "
+          f"({os.path.getsize(os.path.join(directory, 'pnl.f32')) / 1e6:.0f} MB PnL file)")
+
+    library = AlphaLibrary(directory)
+    library.correlations(base[0])  # map the file
+    timings = []
+    for k in range(20):
+        start = time.perf_counter()
+        library.add(pd.Series(rng.normal(0, 0.01, 252), index=dates), kind="random", reference=f"new_{k}")
+        timings.append(time.perf_counter() - start)
+    print(f"⏱️ Admission check against {len(library):,} alphas: median {np.median(timings) * 1e3:.1f} ms")
+    print(library.to_frame().tail(3))
+
+    shutil.rmtree(directory)
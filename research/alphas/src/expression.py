@@ -0,0 +1,431 @@
+import json
+import os
+import re
+from collections import defaultdict
+
+import numpy as np
+from gplearn.functions import _function_map
+
+from src import operators
+from src.panel import Panel
+
+# gplearn's own (protected) implementations, so compiled programs match model.predict exactly
+ELEMENTWISE = {name: (function.arity, function.function) for name, function in _function_map.items()}
+COMMUTATIVE = {"add", "mul", "max", "min"}
+
+# Operators of src.operators.gp_function_set: name -> (arity, operator, window keyword)
+PANEL_OPERATORS = {
+    "rank": (1, operators.rank, None),
+    "zscore": (1, operators.zscore, None),
+    "delay": (1, lambda x: operators.delay(x, 1), None),
+    "delta": (1, operators.delta, "periods"),
+    "ts_mean": (1, operators.ts_mean, "window"),
+    "ts_std": (1, operators.ts_std, "window"),
+    "ts_rank": (1, operators.ts_rank, "window"),
+    "ts_corr": (2, operators.ts_corr, "window"),
+    "decay_linear": (1, operators.decay_linear, "window"),
+    "ts_argmax": (1, operators.ts_argmax, "window"),
+}
+
+_TOKEN = re.compile(r"\s*(?:([A-Za-z_][A-Za-z0-9_]*)|(-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)|([(),]))")
+
+
+def _tokenize(program):
+    tokens, position = [], 0
+    program = program.strip()
+    while position < len(program):
+        match = _TOKEN.match(program, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Cannot parse program at position {position}: {program[position:position + 20]!r}")
+        name, number, symbol = match.groups()
+        tokens.append(("name", name) if name else ("number", float(number)) if number else ("symbol", symbol))
+        position = match.end()
+    return tokens
+
+
+def _split_operator(name):
+    # 'ts_mean_10' -> ('ts_mean', 10); plain names -> (name, None)
+    base, _, window = name.rpartition("_")
+    if base in PANEL_OPERATORS and window.isdigit():
+        return base, int(window)
+    return name, None
+
+
+def program_string(program):
+    """
+    str(program) of a gplearn _Program with full-precision constants.
+
+    gplearn prints constants with 3 decimals; saved formulas keep the exact values instead.
+    """
+    terminals = [0]
+    output = ""
+    for i, node in enumerate(program.program):
+        if hasattr(node, "arity"):
+            terminals.append(node.arity)
+            output += node.name + "("
+        else:
+            output += f"X{node}" if isinstance(node, (int, np.integer)) else repr(float(node))
+            terminals[-1] -= 1
+            while terminals[-1] == 0:
+                terminals.pop()
+                terminals[-1] -= 1
+                output += ")"
+            if i != len(program.program) - 1:
+                output += ", "
+    return output
+
+
+class ExpressionGraph:
+    """
+    Hash-consed DAG of compiled gplearn programs.
+
+    Every distinct subexpression is stored once: parsing a program reuses the nodes of
+    identical subtrees already in the graph (commutative arguments are sorted, so add(a, b)
+    and add(b, a) share a node). evaluate() computes each needed node once for all programs,
+    batching the nodes of the same operator and depth into single NumPy calls.
+
+    Nodes are (op, children, param) tuples:
+      - ("feature", (), (name, mean, scale)): (feature - mean) / scale, the scaling the program was fitted on
+      - ("const", (), value)
+      - (gplearn function, children, None) and (panel operator, children, window)
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self.depth = []
+        self._ids = {}
+        self._plans = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, op, children=(), param=None):
+        """Id of the node, creating it if it does not exist yet."""
+        children = tuple(children)
+        if op in COMMUTATIVE:
+            children = tuple(sorted(children))
+        key = (op, children, param)
+        node_id = self._ids.get(key)
+        if node_id is None:
+            node_id = len(self.nodes)
+            self._ids[key] = node_id
+            self.nodes.append(key)
+            self.depth.append(1 + max((self.depth[c] for c in children), default=-1))
+        return node_id
+
+    def parse(self, program, features, scaling=None):
+        """
+        Compile a gplearn program string into the graph.
+
+        Args:
+            program (str): e.g. 'add(X6, div(X1, -0.234))', as printed by str(model._program).
+                           Feature names (SymbolicRegressor(feature_names=...)) are accepted too.
+            features (list): Feature name of every X{i}.
+            scaling (dict): Optional {'mean': [...], 'scale': [...]} of the StandardScaler the
+                            program was trained on, aligned with `features`.
+
+        Returns:
+            int: Id of the root node.
+        """
+        tokens = _tokenize(str(program))
+        position = 0
+
+        def leaf(name):
+            if re.fullmatch(r"X\d+", name) and name not in features:
+                index = int(name[1:])
+            elif name in features:
+                index = features.index(name)
+            else:
+                raise ValueError(f"Unknown terminal {name!r}")
+            if scaling is None:
+                return self.node("feature", param=(features[index], 0.0, 1.0))
+            return self.node("feature", param=(features[index], float(scaling["mean"][index]),
+                                               float(scaling["scale"][index])))
+
+        def expression():
+            nonlocal position
+            kind, value = tokens[position]
+            position += 1
+            if kind == "number":
+                return self.node("const", param=value)
+            if kind != "name":
+                raise ValueError(f"Unexpected {value!r} in {program!r}")
+            if position == len(tokens) or tokens[position] != ("symbol", "("):
+                return leaf(value)
+
+            op, window = _split_operator(value)
+            if op in ELEMENTWISE:
+                arity = ELEMENTWISE[op][0]
+            elif op in PANEL_OPERATORS:
+                arity = PANEL_OPERATORS[op][0]
+            else:
+                raise ValueError(f"Unknown function {value!r}")
+
+            position += 1  # '('
+            children = []
+            for i in range(arity):
+                children.append(expression())
+                expected = ("symbol", ")") if i == arity - 1 else ("symbol", ",")
+                if tokens[position] != expected:
+                    raise ValueError(f"Expected {expected[1]!r} in {program!r}")
+                position += 1
+            return self.node(op, children, window)
+
+        root = expression()
+        if position != len(tokens):
+            raise ValueError(f"Trailing tokens in {program!r}")
+        return root
+
+    def evaluate(self, data, roots, mask=None):
+        """
+        Evaluate programs on a feature panel.
+
+        Args:
+            data (Panel or dict): Panel, or mapping feature name -> array (any shape; the panel
+                                  operators need (dates x tickers) arrays).
+            roots (list): Node ids returned by parse().
+            mask (np.ndarray): Valid cells. Defaults to panel.mask, or to the cells where every
+                               used feature is finite.
+
+        Returns:
+            np.ndarray: (len(roots), *shape) float64, NaN outside the mask.
+        """
+        needed, steps, root_rows = self.compile(roots)
+
+        if isinstance(data, Panel):
+            def read(name):
+                return data.feature(name)
+            mask = data.mask if mask is None else mask
+        else:
+            def read(name):
+                return data[name]
+
+        names = {name for op, _, _, params in steps if op == "feature" for name, _, _ in params}
+        raw = {name: np.asarray(read(name), dtype=float) for name in names}
+        shape = next(iter(raw.values())).shape if raw else np.shape(mask)
+        if mask is None:
+            mask = np.ones(shape, dtype=bool)
+            for values in raw.values():
+                mask &= np.isfinite(values)
+        mask = np.asarray(mask, dtype=bool).ravel()
+
+        # One row per needed node over the flattened cells
+        values = np.empty((len(needed), mask.size))
+        for op, rows, child_rows, params in steps:
+            if op == "feature":
+                for row, (name, mean, scale) in zip(rows, params):
+                    values[row] = (raw[name].ravel() - mean) / scale
+            elif op == "const":
+                values[rows] = params
+            elif op in ELEMENTWISE:
+                values[rows] = ELEMENTWISE[op][1](*[values[children] for children in child_rows])
+            else:
+                if len(shape) != 2:
+                    raise ValueError(f"{op} needs (dates x tickers) features, got shape {shape}")
+                _, operator, keyword = PANEL_OPERATORS[op]
+                kwargs = {keyword: params} if keyword else {}
+                for i, row in enumerate(rows):
+                    args = [np.where(mask, values[children[i]], np.nan).reshape(shape) for children in child_rows]
+                    # Same closure as operators.PanelFunction: NaN results become 0 on valid cells
+                    values[row] = np.nan_to_num(operator(*args, **kwargs).ravel(), nan=0.0, posinf=0.0, neginf=0.0)
+
+        result = values[root_rows]
+        result[:, ~mask] = np.nan
+        return result.reshape((len(roots),) + tuple(shape))
+
+    def compile(self, roots):
+        """
+        Evaluation plan of a set of roots (cached): the needed nodes and their batches.
+
+        Returns:
+            tuple: (needed node ids, steps, row of every root). Each step is
+                   (op, rows, child rows per argument, params) for one (depth, op, window) batch.
+        """
+        key = tuple(roots)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        needed = self._needed(roots)
+        slot = {node_id: i for i, node_id in enumerate(needed)}
+        batches = defaultdict(list)
+        for node_id in needed:
+            op, _, param = self.nodes[node_id]
+            batches[(self.depth[node_id], op, param if op in PANEL_OPERATORS else None)].append(node_id)
+
+        steps = []
+        for depth, op, window in sorted(batches, key=lambda batch: batch[0]):
+            ids = batches[(depth, op, window)]
+            rows = np.array([slot[i] for i in ids])
+            arity = len(self.nodes[ids[0]][1])
+            child_rows = [np.array([slot[self.nodes[i][1][k]] for i in ids]) for k in range(arity)]
+            if op == "feature":
+                params = [self.nodes[i][2] for i in ids]
+            elif op == "const":
+                params = np.array([self.nodes[i][2] for i in ids])[:, None]
+            else:
+                params = window
+            steps.append((op, rows, child_rows, params))
+
+        plan = (needed, steps, np.array([slot[r] for r in roots]))
+        if len(self._plans) >= 16:
+            self._plans.clear()
+        self._plans[key] = plan
+        return plan
+
+    def _needed(self, roots):
+        # Ids of every node reachable from the roots, in creation (= topological) order
+        seen = set()
+        stack = list(roots)
+        while stack:
+            node_id = stack.pop()
+            if node_id not in seen:
+                seen.add(node_id)
+                stack.extend(self.nodes[node_id][1])
+        return sorted(seen)
+
+
+class FormulaLibrary:
+    """
+    Saved GP formulas compiled into one shared ExpressionGraph.
+
+    Formulas are stored in a JSON file (program string, feature names, scaler statistics,
+    fitness and metadata); loading the file recompiles them, so common subexpressions across
+    the whole library are evaluated once.
+
+    Args:
+        path (str): Optional JSON file. Loaded if it exists, written by save().
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.graph = ExpressionGraph()
+        self.formulas = []
+        self.roots = []
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.formulas)
+
+    def add(self, program, features, scaling=None, fitness=None, metric=None, source=None):
+        """
+        Compile and store a formula.
+
+        Returns:
+            bool: False if the same expression (with the same scaling) is already in the library.
+        """
+        root = self.graph.parse(str(program), list(features), scaling)
+        if root in self.roots:
+            return False
+        self.roots.append(root)
+        self.formulas.append({
+            "program": str(program),
+            "features": list(features),
+            "scaling": scaling,
+            "fitness": None if fitness is None else float(fitness),
+            "metric": metric,
+            "source": source,
+        })
+        return True
+
+    def add_programs(self, model, features, metric, scaler=None, top_n=10, source=None):
+        """
+        Add the best programs of the last generation of a fitted gplearn SymbolicRegressor.
+
+        Args:
+            model: Fitted SymbolicRegressor.
+            features (list): Feature names of the model's X columns.
+            metric (str): Name of the fitness metric, e.g. 'neg_sharpe'.
+            scaler: StandardScaler applied to X before fitting, if any.
+            top_n (int): Number of distinct programs to keep.
+            source (str): Free-form origin, e.g. the script name.
+
+        Returns:
+            int: Number of formulas added.
+        """
+        scaling = None if scaler is None else {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+        sign = 1 if model._metric.greater_is_better else -1
+        programs = sorted((p for p in model._programs[-1] if p is not None),
+                          key=lambda p: -sign * p.raw_fitness_)
+
+        added = 0
+        for program in programs:
+            if added == top_n:
+                break
+            added += self.add(program_string(program), features, scaling, program.raw_fitness_, metric, source)
+        return added
+
+    def evaluate(self, data, mask=None):
+        """Alpha of every formula: (n_formulas, *shape), see ExpressionGraph.evaluate."""
+        return self.graph.evaluate(data, self.roots, mask)
+
+    def save(self, path=None):
+        """Write the formulas to a JSON file (atomically)."""
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.formulas, f, indent=1)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path) as f:
+            for formula in json.load(f):
+                self.add(formula["program"], formula["features"], formula.get("scaling"),
+                         formula.get("fitness"), formula.get("metric"), formula.get("source"))
+
+
+if __name__ == "__main__":
+    import time
+    import pandas as pd
+    from gplearn.genetic import SymbolicRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    # Random long frame; compiled programs must match gplearn's own predictions
+    rng = np.random.default_rng(0)
+    features = ["Close", "Volume", "Return_1d", "Range"]
+    dates = pd.date_range("2016-01-01", periods=120, freq="B")
+    df = pd.DataFrame([(d, t) for d in dates for t in range(30)], columns=["Date", "Ticker"])
+    df = df[rng.random(len(df)) > 0.1].reset_index(drop=True)
+    for name in features:
+        df[name] = rng.normal(size=len(df))
+    df["Target"] = rng.normal(size=len(df))
+
+    scaler = StandardScaler()
+    X = scaler.fit_transform(df[features].values)
+    model = SymbolicRegressor(population_size=200, generations=3, random_state=0,
+                              function_set=list(ELEMENTWISE) + operators.gp_function_set(df, windows=(5,)))
+    model.fit(X, df["Target"].values)
+
+    library = FormulaLibrary()
+    assert library.add_programs(model, features, "mse", scaler, top_n=50) == 50
+    assert not library.add(library.formulas[0]["program"], features, library.formulas[0]["scaling"])
+
+    panel = Panel.from_frame(df, features=features, dtype=np.float64)
+    alphas = library.evaluate(panel)
+    by_program = {program_string(p): p for p in model._programs[-1] if p is not None}
+    for formula, alpha in zip(library.formulas, alphas):
+        expected = by_program[formula["program"]].execute(X)
+        assert np.allclose(panel.to_vector(alpha), expected, equal_nan=True), formula["program"]
+
+    # Printed programs (3-decimal constants), commutative sharing and gplearn feature names
+    graph = ExpressionGraph()
+    best = graph.parse(str(model._program), features, library.formulas[0]["scaling"])
+    assert np.allclose(panel.to_vector(graph.evaluate(panel, [best])[0]), model.predict(X), atol=1e-2)
+    assert graph.parse("add(X0, mul(X1, 0.5))", features) == graph.parse("add(mul(0.5, Volume), Close)", features)
+
+    # A library of thousands of elementwise formulas scored on one day's cross-section
+    small = SymbolicRegressor(population_size=3000, generations=2, random_state=1,
+                              function_set=["add", "sub", "mul", "div", "log", "abs", "neg"])
+    small.fit(X, df["Target"].values)
+    library = FormulaLibrary()
+    library.add_programs(small, features, "mse", scaler, top_n=3000)
+    tree_nodes = sum(p.length_ for p in small._programs[-1])
+
+    day = {name: rng.normal(size=500) * scaler.scale_[i] + scaler.mean_[i] for i, name in enumerate(features)}
+    library.evaluate(day)
+    start = time.perf_counter()
+    scores = library.evaluate(day)
+    elapsed = time.perf_counter() - start
+    print(f"{len(library)} formulas ({len(library.graph)} shared nodes for {tree_nodes} program nodes) "
+          f"scored on 500 tickers in {elapsed * 1000:.1f} ms, shape {scores.shape}")
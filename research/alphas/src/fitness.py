@@ -1,97 +1,460 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
 import numpy as np
-from gplearn.fitness import make_fitness
-from scipy.stats import rankdata
-from src.simulate import simulate_portfolio_fast
+from gplearn.fitness import make_fitness, _Fitness
+from src.simulate import SimulationPlan
+from src.ic import ICEngine
+from src.shared_arrays import SharedArrays
+
+
+class FitnessCache:
+    """
+    Bounded LRU cache of fitness values, keyed on a hash of the prediction vector.
+
+    Programs regenerated by crossover or mutation often produce predictions that were already
+    scored; their fitness is then returned without running the simulation again. The cache
+    can be saved to / loaded from a JSON file so repeated runs reuse earlier evaluations.
 
-def create_neg_sharpe_fitness(template_df):
+    Args:
+        max_size (int): Maximum number of entries; the least recently used are evicted first.
+        path (str): Optional JSON file. Loaded if it exists, written by save().
+    """
+
+    def __init__(self, max_size=100_000, path=None):
+        self.max_size = max_size
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def key(y_pred, namespace=""):
+        """
+        Fast hash of a prediction vector.
+
+        Args:
+            y_pred (np.ndarray): Predictions of a program.
+            namespace (str): Distinguishes metrics and datasets sharing one cache.
+
+        Returns:
+            str: Hex digest.
+        """
+        digest = hashlib.blake2b(namespace.encode(), digest_size=16)
+        digest.update(np.ascontiguousarray(y_pred, dtype=np.float64).tobytes())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Cached value, or None on a miss."""
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = float(value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def wrap(self, function, namespace=""):
+        """Wrap a gplearn metric function(y, y_pred, sample_weight) with the cache."""
+        def cached_metric(y_true, y_pred, sample_weight):
+            return _cached(self, namespace, y_pred, lambda: function(y_true, y_pred, sample_weight))
+
+        return cached_metric
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def save(self, path=None):
+        """Write the entries to a JSON file (atomically)."""
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        with open(path) as f:
+            for key, value in json.load(f).items():
+                self.put(key, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _data_namespace(name, *arrays):
+    # Fitness values depend on the evaluation data, so cache keys include a fingerprint of it
+    digest = hashlib.blake2b(name.encode(), digest_size=8)
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return f"{name}:{digest.hexdigest()}"
+
+
+def _invalid_alpha(n_rows, y_pred):
+    if len(y_pred) != n_rows:
+        print(f"❌ Length mismatch: {len(y_pred)} vs {n_rows}")
+        return True
+
+    # Sanity checks
+    if np.isnan(y_pred).any():
+        print("⚠️ Alpha contains NaNs")
+        return True
+    return np.std(y_pred) < 1e-6
+
+
+def _neg_sharpe(plan, y_pred, check=True):
+    try:
+        if check and _invalid_alpha(plan.n_rows, y_pred):
+            return 1e6
+
+        _, sharpe = plan.run(y_pred)
+        sharpe = sharpe[0]
+
+        if np.isnan(sharpe) or np.isinf(sharpe):
+            print("⚠️ Sharpe is NaN or Inf")
+            return 1e6
+
+        return -sharpe
+
+    except Exception as e:
+        print("⚠️ Portfolio simulation failed:", e)
+        print("🧪 Sample Alpha:", y_pred[:5])
+        return 1e6
+
+
+def _neg_rank_ic(engine, y_pred):
+    if len(y_pred) != engine.n_rows:
+        return 1.0
+
+    ic = engine.mean_ic(y_pred)
+    if np.isnan(ic):
+        return 1.0
+    return -float(ic)
+
+
+class SharedNegSharpeMetric:
+    """Picklable -Sharpe metric reading its SimulationPlan arrays from SharedArrays."""
+
+    def __init__(self, plan, cache=None, namespace=""):
+        self.shared = SharedArrays({name: getattr(plan, name) for name in SimulationPlan.ARRAYS})
+        self.n_rows = plan.n_rows
+        self.capital_start = plan.capital_start
+        self.cache = cache
+        self.namespace = namespace
+        self._plan = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_plan"] = None
+        return state
+
+    def __call__(self, y_true, y_pred, sample_weight):
+        if self._plan is None:
+            self._plan = SimulationPlan.from_arrays(self.shared, self.n_rows, self.capital_start)
+        return _cached(self.cache, self.namespace, y_pred, lambda: _neg_sharpe(self._plan, y_pred))
+
+
+class SharedRankICMetric:
+    """Picklable -IC metric reading its ICEngine arrays from SharedArrays."""
+
+    def __init__(self, engine, cache=None, namespace=""):
+        self.shared = SharedArrays({name: getattr(engine, name) for name in ICEngine.ARRAYS})
+        self.n_rows = engine.n_rows
+        self.min_std = engine.min_std
+        self.cache = cache
+        self.namespace = namespace
+        self._engine = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_engine"] = None
+        return state
+
+    def __call__(self, y_true, y_pred, sample_weight):
+        if self._engine is None:
+            self._engine = ICEngine.from_arrays(self.shared, self.n_rows, self.min_std)
+        return _cached(self.cache, self.namespace, y_pred, lambda: _neg_rank_ic(self._engine, y_pred))
+
+
+class MultiFidelityNegSharpeMetric:
+    """
+    Successive-halving -Sharpe metric: cheap scores on date subsets, full score for the best.
+
+    Each rung of the schedule is a (date_fraction, promote_fraction) pair. A program is first
+    scored on a precomputed subset of date_fraction of the dates; it moves on to the next rung
+    (and finally to the full plan) only if its score is in the best promote_fraction of the
+    recent scores of that rung. Rejected programs keep the score of the last rung they reached,
+    an estimate from fewer days, plus REJECTED_OFFSET for every rung they did not pass: they
+    rank behind every program scored on all dates, and still in order among themselves.
+    Only full scores are stored in the cache, low-fidelity ones depend on the thresholds of
+    the run. Every `population_size` programs (one gplearn generation when n_jobs=1) a line
+    reports the promotions and the evaluation time saved.
+
+    Args:
+        plan (SimulationPlan): Full evaluation plan.
+        schedule (tuple): (date_fraction, promote_fraction) rungs, e.g. ((0.25, 0.5),).
+        sampling (str): 'stratified' picks one date in each of equal consecutive blocks,
+                        'random' draws the dates uniformly.
+        population_size (int): Number of calls per generation, for the log. None disables it.
+        cache (FitnessCache): Optional cache of already scored predictions.
+        namespace (str): Cache namespace.
+        seed (int): Seed of the date subsets.
+    """
+
+    # Far above any -Sharpe of a real alpha, far below the 1e6 given to invalid ones
+    REJECTED_OFFSET = 1e3
+
+    def __init__(self, plan, schedule=((0.25, 0.5),), sampling="stratified", population_size=None,
+                 cache=None, namespace="", seed=0):
+        rng = np.random.default_rng(seed)
+        n_dates = len(plan.starts)
+        self.rungs = []
+        for date_fraction, promote_fraction in schedule:
+            n_pick = max(2, int(np.ceil(date_fraction * n_dates)))
+            if sampling == "stratified":
+                blocks = np.array_split(np.arange(n_dates), n_pick)
+                dates = np.array([rng.choice(block) for block in blocks if len(block)])
+            elif sampling == "random":
+                dates = np.sort(rng.choice(n_dates, size=min(n_pick, n_dates), replace=False))
+            else:
+                raise ValueError(f"Unknown sampling {sampling!r}")
+            self.rungs.append((plan.subset(dates), promote_fraction))
+
+        self.plan = plan
+        self.population_size = population_size
+        self.cache = cache
+        self.namespace = namespace
+        self.window = population_size or 200
+        self.min_scores = 20
+        self.refresh_every = max(1, self.window // 20)
+        self._scores = [[] for _ in self.rungs]
+        self._thresholds = [None for _ in self.rungs]
+        self._since_refresh = [0 for _ in self.rungs]
+        self._full_time = None
+        self._last = None
+        self.last_rung = None
+        self._reset_generation()
+        self.generation = 0
+
+    def _reset_generation(self):
+        self._calls = 0
+        self._promoted = 0
+        self._elapsed = 0.0
+        self._saved = 0.0
+
+    def _promote(self, rung, score):
+        # Best fraction of the recent scores of this rung; everything passes during warm-up.
+        # The quantile is refreshed every few scores, recomputing it on every call costs as
+        # much as a low-fidelity evaluation.
+        scores = self._scores[rung]
+        scores.append(score)
+        del scores[:-self.window]
+        if len(scores) < self.min_scores:
+            return True
+        self._since_refresh[rung] += 1
+        if self._thresholds[rung] is None or self._since_refresh[rung] >= self.refresh_every:
+            self._thresholds[rung] = np.quantile(scores, self.rungs[rung][1])
+            self._since_refresh[rung] = 0
+        return score <= self._thresholds[rung]
+
+    def score(self, y_pred):
+        # The whole-vector sanity checks run once; timings only cover the simulations
+        if _invalid_alpha(self.plan.n_rows, y_pred):
+            self.last_rung = None
+            return 1e6
+
+        start = time.perf_counter()
+        for rung, (plan, _) in enumerate(self.rungs):
+            score = _neg_sharpe(plan, y_pred, check=False)
+            if score >= 1e6 or not self._promote(rung, score):
+                if score < 1e6:
+                    score += (len(self.rungs) - rung) * self.REJECTED_OFFSET
+                self.last_rung = rung
+                break
+        else:
+            full_start = time.perf_counter()
+            score = _neg_sharpe(self.plan, y_pred, check=False)
+            full_time = time.perf_counter() - full_start
+            self._full_time = full_time if self._full_time is None else 0.9 * self._full_time + 0.1 * full_time
+            self._promoted += 1
+            self.last_rung = len(self.rungs)
+
+        elapsed = time.perf_counter() - start
+        self._elapsed += elapsed
+        if self._full_time is not None:
+            self._saved += self._full_time - elapsed
+        return score
+
+    def report(self):
+        """One-line summary of the current generation."""
+        baseline = self._elapsed + self._saved
+        saved = self._saved / baseline if baseline > 0 else 0.0
+        return (f"🪜 Generation {self.generation}: {self._promoted}/{self._calls} programs promoted to full "
+                f"evaluation, simulations took {self._elapsed:.2f}s instead of ~{baseline:.2f}s ({saved:.0%} saved)")
+
+    def __call__(self, y_true, y_pred, sample_weight):
+        # gplearn scores the same predictions again for the out-of-bag fitness (max_samples < 1),
+        # with the complementary sample weights. Only that immediate second call is skipped, so
+        # two consecutive programs with the same predictions are both counted.
+        in_bag = None if sample_weight is None else np.asarray(sample_weight) > 0
+        if (self._last is not None and in_bag is not None and self._last[2] is not None
+                and not np.any(in_bag & self._last[2]) and np.array_equal(y_pred, self._last[0])):
+            value = self._last[1]
+            self._last = None
+            return value
+        key = None if self.cache is None else self.cache.key(y_pred, namespace=self.namespace)
+        value = None if key is None else self.cache.get(key)
+        if value is None:
+            value = self.score(y_pred)
+            if key is not None and self.last_rung == len(self.rungs):
+                self.cache.put(key, value)
+        self._last = (np.array(y_pred), value, in_bag)
+        self._calls += 1
+        if self.population_size and self._calls == self.population_size:
+            print(self.report())
+            self.generation += 1
+            self._reset_generation()
+        return value
+
+
+def _cached(cache, namespace, y_pred, compute):
+    if cache is None:
+        return compute()
+    key = cache.key(y_pred, namespace=namespace)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.put(key, value)
+    return value
+
+
+def create_neg_sharpe_fitness(template_df, cache=None, shared=False, fidelity=None, sampling="stratified",
+                              population_size=None):
     """
     Returns a fitness function for gplearn that minimizes the negative Sharpe ratio.
     
     Args:
         template_df (pd.DataFrame): DataFrame with ['Date', 'Ticker', 'Return_1d'].
-                                    'Alpha' will be added dynamically during evaluation.
+                                    Predictions are aligned with its rows during evaluation.
+        cache (FitnessCache): Optional cache of already scored predictions.
+        shared (bool): Return a picklable metric backed by memory-mapped arrays, for
+                       SymbolicRegressor(n_jobs > 1). Workers keep their own copy of the cache.
+        fidelity (tuple): Optional successive-halving schedule of (date_fraction, promote_fraction)
+                          rungs, e.g. ((0.25, 0.5),); see MultiFidelityNegSharpeMetric.
+                          Needs n_jobs=1: promotion thresholds live in the evaluating process.
+        sampling (str): 'stratified' or 'random' date subsets for the fidelity rungs.
+        population_size (int): Log the promotions and time saved every population_size programs.
 
     Returns:
         gplearn-compatible fitness function (minimize -Sharpe).
     """
-    def neg_sharpe_metric(y_true, y_pred, sample_weight):
-        try:
-            if len(y_pred) != len(template_df):
-                print(f"❌ Length mismatch: {len(y_pred)} vs {len(template_df)}")
-                return 1e6
-
-            df_temp = template_df.copy()
-            df_temp["Alpha"] = y_pred
+    # Sort order, next-day returns and date boundaries are computed once for all programs
+    plan = SimulationPlan(template_df)
+    namespace = _data_namespace("neg_sharpe", plan.rows, plan.next_return, plan.starts)
 
-            # Sanity checks
-            if df_temp["Alpha"].isna().any():
-                print("⚠️ Alpha contains NaNs")
-                return 1e6
-            if np.std(y_pred) < 1e-6:
-                return 1e6
+    if fidelity:
+        if shared:
+            raise ValueError("Multi-fidelity evaluation keeps its promotion state in one process, use shared=False")
+        metric = MultiFidelityNegSharpeMetric(plan, fidelity, sampling, population_size, cache,
+                                              f"{namespace}:{sampling}{tuple(map(tuple, fidelity))}")
+        return _Fitness(function=metric, greater_is_better=False)
 
-            _, sharpe = simulate_portfolio_fast(df_temp)
+    if shared:
+        # make_fitness only accepts plain functions, so the picklable callable is wrapped directly
+        return _Fitness(function=SharedNegSharpeMetric(plan, cache, namespace), greater_is_better=False)
 
-            if np.isnan(sharpe) or np.isinf(sharpe):
-                print("⚠️ Sharpe is NaN or Inf")
-                return 1e6
+    def neg_sharpe_metric(y_true, y_pred, sample_weight):
+        return _neg_sharpe(plan, y_pred)
 
-            return -sharpe
-
-        except Exception as e:
-            print("⚠️ simulate_portfolio_fast failed:", e)
-            print("🧪 Sample Alpha:", y_pred[:5])
-            return 1e6
+    if cache is not None:
+        neg_sharpe_metric = cache.wrap(neg_sharpe_metric, namespace)
 
     return make_fitness(function=neg_sharpe_metric, greater_is_better=False, wrap=False)
 
 
-def create_spearman_rank_fitness(valid_df):
+def create_spearman_rank_fitness(valid_df, cache=None, shared=False):
     """
     Returns a fitness function that minimizes negative Spearman rank correlation
     between Alpha and Target on the validation set.
 
     Args:
         valid_df (pd.DataFrame): DataFrame with ['Date', 'Ticker', 'Target'] columns.
+        cache (FitnessCache): Optional cache of already scored predictions.
+        shared (bool): Return a picklable metric backed by memory-mapped arrays, for
+                       SymbolicRegressor(n_jobs > 1). Workers keep their own copy of the cache.
 
     Returns:
         gplearn-compatible fitness function (minimize -IC).
     """
-    grouped = valid_df.groupby("Date")
-    rank_target_by_day = {}
-    index_by_day = {}
-
-    for date, group in grouped:
-        target_vals = group["Target"].values
-        if len(group) >= 3 and np.std(target_vals) > 1e-6:
-            rank_target_by_day[date] = rankdata(target_vals)
-            index_by_day[date] = group.index
+    # Padded (dates x tickers) layout and target ranks are computed once
+    engine = ICEngine(valid_df)
+    namespace = _data_namespace("spearman_ic", engine.index, engine.mask, engine.target_ranks)
 
-    valid_index = valid_df.index
+    if shared:
+        return _Fitness(function=SharedRankICMetric(engine, cache, namespace), greater_is_better=False)
 
     def rank_correlation_fast(y_true, y_pred, sample_weight):
-        if len(y_pred) != len(valid_index):
-            return 1.0
+        return _neg_rank_ic(engine, y_pred)
 
-        y_pred_arr = np.asarray(y_pred)
-        correlations = []
+    if cache is not None:
+        rank_correlation_fast = cache.wrap(rank_correlation_fast, namespace)
 
-        for date in rank_target_by_day:
-            idx = index_by_day[date]
-            alpha = y_pred_arr[idx]
+    return make_fitness(function=rank_correlation_fast, greater_is_better=False, wrap=False)
 
-            if np.std(alpha) < 1e-6:
-                continue
 
-            alpha_ranks = rankdata(alpha)
-            target_ranks = rank_target_by_day[date]
+if __name__ == "__main__":
+    import pandas as pd
 
-            rho = np.corrcoef(alpha_ranks, target_ranks)[0, 1]
-            if not np.isnan(rho):
-                correlations.append(rho)
+    # Random long frame: 750 days x 50 tickers
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2013-01-01", periods=750)
+    df = pd.DataFrame([(d, t) for d in dates for t in range(50)], columns=["Date", "Ticker"])
+    df["Return_1d"] = rng.normal(0, 0.01, len(df))
+    plan = SimulationPlan(df)
+    n_rows = len(df)
 
-        if not correlations:
-            return 1.0
-        return -np.mean(correlations)
+    # A rejected program never outranks a promoted one, rejected ones keep their order,
+    # and only the full scores are cached
+    cache = FitnessCache()
+    metric = MultiFidelityNegSharpeMetric(plan, ((0.25, 0.3),), cache=cache)
+    promoted, rejected = [], []
+    for _ in range(600):
+        alpha = rng.normal(size=n_rows)
+        score = metric(None, alpha, None)
+        if metric.last_rung == len(metric.rungs):
+            promoted.append(score)
+        else:
+            rejected.append(score)
+            assert score == _neg_sharpe(metric.rungs[0][0], alpha) + metric.REJECTED_OFFSET
+    assert rejected and min(rejected) > max(promoted), (min(rejected), max(promoted))
+    assert len(set(rejected)) == len(rejected)
+    assert len(cache) == len(promoted), (len(cache), len(promoted))
+    print(f"🪜 {len(promoted)} promoted (cached), {len(rejected)} rejected with distinct scores; "
+          f"best rejected {min(rejected):.3f} > worst promoted {max(promoted):.3f}")
 
-    return make_fitness(function=rank_correlation_fast, greater_is_better=False, wrap=False)
+    # gplearn-like calls: in-bag then out-of-bag weights; consecutive identical programs all count
+    metric = MultiFidelityNegSharpeMetric(plan, ((0.25, 0.3),), population_size=100)
+    in_bag = rng.random(n_rows) < 0.9
+    alpha = rng.normal(size=n_rows)
+    for k in range(300):
+        if k % 7:
+            alpha = rng.normal(size=n_rows)
+        in_bag_value = metric(None, alpha, in_bag.astype(float))
+        assert metric(None, alpha, (~in_bag).astype(float)) == in_bag_value
+    assert metric.generation == 3, metric.generation
@@ -1,8 +1,10 @@
 import numpy as np
+import pandas as pd
 from scipy.stats import spearmanr
 
 def compute_sharpe(L, annualize=True, periods_per_year=252):
-    Returns = [(L.iloc[i] - L.iloc[i - 1]) / L.iloc[i - 1] for i in range(1, len(L))]
+    values = np.asarray(L, dtype=float)
+    Returns = np.diff(values) / values[:-1]
     mean_returns = np.mean(Returns)
     std_returns = np.std(Returns)
     if std_returns == 0:
@@ -13,6 +15,23 @@ def compute_sharpe(L, annualize=True, periods_per_year=252):
     return sharpe
 
 
+def compute_portfolio_metrics(portfolios, periods_per_year=252):
+    """
+    Computes annualized return/volatility, Sharpe, Sortino, drawdown, Calmar and hit rate
+    for many portfolio value curves at once, with compute_metrics from backtesting/performance.py.
+    Expects a Series or a (Date x alpha) DataFrame of portfolio values,
+    e.g. the curves returned by simulate_portfolio_fast.
+    The repository root must be importable (e.g. PYTHONPATH=<repo root>).
+    """
+    from backtesting.performance import compute_metrics
+
+    if isinstance(portfolios, pd.Series):
+        portfolios = portfolios.to_frame()
+    values = portfolios.to_numpy(dtype=float)
+    returns = pd.DataFrame(np.diff(values, axis=0) / values[:-1], columns=portfolios.columns)
+    return compute_metrics(returns, periods_per_year=periods_per_year).drop(columns="turnover")
+
+
 def compute_turnover(position_df):
     """
     Computes daily average turnover.
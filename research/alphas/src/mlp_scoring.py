@@ -0,0 +1,431 @@
+import collections
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# Only the scorer needs joblib/sklearn; clients import this module without them
+DEFAULT_ADDRESS = ("127.0.0.1", 8765)
+
+# Messages: 4-byte command, rows, columns, then a little-endian float32 (rows x columns) payload
+_HEADER = struct.Struct("!4sII")
+_ACTIVATIONS = {
+    "identity": lambda x: x,
+    "logistic": lambda x: 1.0 / (1.0 + np.exp(-x)),
+    "tanh": np.tanh,
+    "relu": lambda x: np.maximum(x, 0),
+}
+
+
+class LatencyStats:
+    """
+    Rolling latency samples with percentile summaries.
+
+    Args:
+        max_samples (int): Number of most recent samples kept.
+    """
+
+    def __init__(self, max_samples=100_000):
+        self.samples = collections.deque(maxlen=max_samples)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def summary(self):
+        """{'count', 'p50_ms', 'p99_ms', 'mean_ms', 'max_ms'} of the kept samples."""
+        if not self.samples:
+            return {"count": 0}
+        ms = np.fromiter(self.samples, dtype=float) * 1e3
+        return {
+            "count": self.count,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "mean_ms": float(ms.mean()),
+            "max_ms": float(ms.max()),
+        }
+
+
+class AlphaScorer:
+    """
+    Saved MLP alpha model (as written by alpha_train_optuna_mlp.py), loaded once and kept warm.
+
+    The StandardScaler is folded into the first layer and the forward pass runs on the
+    weight arrays directly, so a call is one chain of matrix products over all the rows
+    given (a cross-section or many days) without sklearn's per-call input validation.
+    Rows with missing features get a NaN alpha.
+
+    Args:
+        model_path (str): Fitted MLPRegressor (joblib).
+        scaler_path (str): Fitted StandardScaler (joblib).
+        features_path (str): JSON list of the feature columns, in training order.
+    """
+
+    def __init__(self, model_path="mlp_alpha_model.joblib", scaler_path="mlp_alpha_scaler.joblib",
+                 features_path="mlp_alpha_features.json"):
+        import joblib
+
+        start = time.perf_counter()
+        self.model = joblib.load(model_path)
+        self.scaler = joblib.load(scaler_path)
+        with open(features_path) as f:
+            self.features = json.load(f)
+
+        # (x - mean) / scale @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+        weights = [np.asarray(w) for w in self.model.coefs_]
+        biases = [np.asarray(b) for b in self.model.intercepts_]
+        mean = getattr(self.scaler, "mean_", None)
+        scale = getattr(self.scaler, "scale_", None)
+        mean = np.zeros(len(self.features)) if mean is None else mean
+        scale = np.ones(len(self.features)) if scale is None else scale
+        biases[0] = biases[0] - (mean / scale) @ weights[0]
+        weights[0] = weights[0] / scale[:, None]
+
+        self.dtype = weights[0].dtype
+        self.weights = [w.astype(self.dtype) for w in weights]
+        self.biases = [b.astype(self.dtype) for b in biases]
+        self.activation = _ACTIVATIONS[self.model.activation]
+        self.latency = LatencyStats()
+
+        self.score(np.zeros((1, len(self.features))))  # warm up the BLAS and allocator
+        self.latency = LatencyStats()
+        self.load_seconds = time.perf_counter() - start
+
+    def score(self, X):
+        """
+        Alpha of every row.
+
+        Args:
+            X (np.ndarray or pd.DataFrame): (rows x features) raw (unscaled) features, in the
+                                            order of self.features; DataFrames are selected by name.
+
+        Returns:
+            np.ndarray: (rows,) alphas, same values as model.predict(scaler.transform(X)).
+        """
+        start = time.perf_counter()
+        if hasattr(X, "columns"):
+            X = X[self.features]
+        hidden = np.asarray(X, dtype=self.dtype)
+        if hidden.ndim != 2 or hidden.shape[1] != len(self.features):
+            raise ValueError(f"Expected (rows x {len(self.features)}) features, got {hidden.shape}")
+
+        for weights, bias in zip(self.weights[:-1], self.biases[:-1]):
+            hidden = self.activation(hidden @ weights + bias)
+        alpha = (hidden @ self.weights[-1] + self.biases[-1])[:, 0]
+        self.latency.add(time.perf_counter() - start)
+        return alpha
+
+    def score_days(self, df, date_column="Date", ticker_column="Ticker"):
+        """
+        Score every day of a long frame in one batch.
+
+        Returns:
+            list: One ['Ticker', 'Alpha'] DataFrame per sorted unique date, the alpha_list of
+                  simulate.simulate_portfolio.
+        """
+        import pandas as pd
+
+        alpha = self.score(df)
+        dates = pd.to_datetime(df[date_column]).to_numpy()
+        order = np.argsort(dates, kind="stable")
+        bounds = np.flatnonzero(dates[order][1:] != dates[order][:-1]) + 1
+        tickers = df[ticker_column].to_numpy()
+        return [pd.DataFrame({"Ticker": tickers[rows], "Alpha": alpha[rows]})
+                for rows in np.split(order, bounds)]
+
+
+def _recv_exact(sock, n_bytes):
+    buffer = bytearray(n_bytes)
+    view = memoryview(buffer)
+    received = 0
+    while received < n_bytes:
+        n = sock.recv_into(view[received:])
+        if n == 0:
+            raise ConnectionError("Connection closed")
+        received += n
+    return buffer
+
+
+def _send_message(sock, command, payload=b"", rows=0, cols=0):
+    sock.sendall(_HEADER.pack(command, rows, cols) + payload)
+
+
+def _recv_message(sock):
+    command, rows, cols = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    size = rows * cols * 4 if command in (b"SCOR", b"OK  ") else rows
+    return command, rows, cols, _recv_exact(sock, size)
+
+
+class ScoringServer:
+    """
+    Local socket server in front of an AlphaScorer, with micro-batching.
+
+    Every connection thread queues its request; one batching thread waits up to `max_wait`
+    seconds after the first queued request (or until `max_batch_rows` rows are queued, or
+    every open connection has a request in the batch), scores all of them with a single AlphaScorer.score call and sends each client its slice.
+    Many small concurrent requests (e.g. one per strategy or per ticker group) thus share
+    one matrix product.
+
+    Args:
+        scorer (AlphaScorer): Loaded model.
+        address: (host, port) for TCP, or a path for a Unix domain socket.
+        max_batch_rows (int): Rows at which a batch is scored without waiting.
+        max_wait (float): Seconds a request may wait for others to join its batch.
+    """
+
+    def __init__(self, scorer, address=DEFAULT_ADDRESS, max_batch_rows=50_000, max_wait=0.002):
+        self.scorer = scorer
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.request_latency = LatencyStats()
+        self.n_batches = 0
+        self.n_batched_rows = 0
+        self._connections = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+
+        server = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                server._handle(self.request)
+
+        self._server = (_UnixServer if isinstance(address, str) else _TCPServer)(address, Handler)
+        self.address = self._server.server_address
+        self._batcher = threading.Thread(target=self._batch_loop, daemon=True)
+        self._batcher.start()
+
+    def _handle(self, sock):
+        if sock.family == socket.AF_INET:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self._connections += 1
+        try:
+            self._serve_connection(sock)
+        finally:
+            with self._lock:
+                self._connections -= 1
+
+    def _serve_connection(self, sock):
+        while True:
+            try:
+                command, rows, cols, payload = _recv_message(sock)
+            except ConnectionError:
+                return
+            start = time.perf_counter()
+
+            if command == b"STAT":
+                body = json.dumps(self.stats()).encode()
+                _send_message(sock, b"STAT", body, rows=len(body))
+                continue
+            if command != b"SCOR" or cols != len(self.scorer.features):
+                body = (f"Unknown command {command!r}" if command != b"SCOR"
+                        else f"Expected {len(self.scorer.features)} features, got {cols}").encode()
+                _send_message(sock, b"ERR ", body, rows=len(body))
+                continue
+
+            future = Future()
+            self._queue.put((np.frombuffer(payload, dtype="<f4").reshape(rows, cols), future))
+            try:
+                alpha = future.result()
+            except Exception as error:
+                body = str(error).encode()
+                _send_message(sock, b"ERR ", body, rows=len(body))
+                continue
+            _send_message(sock, b"OK  ", alpha.astype("<f4").tobytes(), rows=len(alpha), cols=1)
+            self.request_latency.add(time.perf_counter() - start)
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            rows = len(batch[0][0])
+            deadline = time.perf_counter() + self.max_wait
+            # No point waiting once every connected client has a request in the batch
+            while rows < self.max_batch_rows and len(batch) < self._connections:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.perf_counter(), 0)))
+                except queue.Empty:
+                    break
+                rows += len(batch[-1][0])
+
+            try:
+                alpha = self.scorer.score(np.concatenate([X for X, _ in batch]))
+            except Exception as error:
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            self.n_batches += 1
+            self.n_batched_rows += rows
+            offsets = np.cumsum([len(X) for X, _ in batch])[:-1]
+            for (_, future), part in zip(batch, np.split(alpha, offsets)):
+                future.set_result(part)
+
+    def stats(self):
+        """Request latency (queueing + batching + scoring), scoring latency and batch sizes."""
+        return {
+            "requests": self.request_latency.summary(),
+            "scoring": self.scorer.latency.summary(),
+            "batches": {"count": self.n_batches, "mean_rows": self.n_batched_rows / max(self.n_batches, 1)},
+        }
+
+    def serve_forever(self):
+        print(f"🛰️ Scoring server listening on {self.address}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def start(self):
+        """Serve from a background thread (e.g. in a notebook or a test)."""
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._server.shutdown()
+        self._server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class ScoringClient:
+    """
+    Lightweight client of a ScoringServer (numpy only, no model loading).
+
+    Args:
+        address: Same address as the server.
+        timeout (float): Socket timeout in seconds.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=30.0):
+        family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(address)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def score(self, X):
+        """Alphas of a (rows x features) raw feature matrix, in the server's feature order."""
+        X = np.ascontiguousarray(X, dtype="<f4")
+        _send_message(self.sock, b"SCOR", X.tobytes(), rows=X.shape[0], cols=X.shape[1])
+        command, rows, _, payload = _recv_message(self.sock)
+        if command != b"OK  ":
+            raise RuntimeError(f"Scoring server error: {bytes(payload).decode()}")
+        return np.frombuffer(payload, dtype="<f4").copy()
+
+    def stats(self):
+        _send_message(self.sock, b"STAT")
+        _, _, _, payload = _recv_message(self.sock)
+        return json.loads(bytes(payload))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import shutil
+    import tempfile
+    import warnings
+    import joblib
+    import pandas as pd
+    from sklearn.exceptions import ConvergenceWarning
+    from sklearn.neural_network import MLPRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    # Small model saved like alpha_train_optuna_mlp.py does
+    rng = np.random.default_rng(0)
+    features = [f"f{i}" for i in range(9)]
+    dates = pd.bdate_range("2017-01-02", periods=60)
+    df = pd.DataFrame([(d, f"T{t:03d}") for d in dates for t in range(500)], columns=["Date", "Ticker"])
+    df[features] = rng.normal(3, 2, (len(df), len(features)))
+    scaler = StandardScaler().fit(df[features].to_numpy())
+    model = MLPRegressor(hidden_layer_sizes=(128, 64), max_iter=20, random_state=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        model.fit(scaler.transform(df[features].to_numpy()), rng.normal(size=len(df)))
+
+    directory = tempfile.mkdtemp(prefix="mlp_scoring_")
+    paths = [os.path.join(directory, name) for name in ("model.joblib", "scaler.joblib", "features.json")]
+    joblib.dump(model, paths[0])
+    joblib.dump(scaler, paths[1])
+    with open(paths[2], "w") as f:
+        json.dump(features, f)
+
+    scorer = AlphaScorer(*paths)
+    print(f"📦 Model loaded in {scorer.load_seconds * 1e3:.0f} ms")
+    expected = model.predict(scaler.transform(df[features].to_numpy()))
+    assert np.allclose(scorer.score(df), expected, atol=1e-10)
+    alpha_list = scorer.score_days(df.sample(frac=1, random_state=0))
+    assert len(alpha_list) == len(dates) and all(len(day) == 500 for day in alpha_list)
+
+    # One cross-section per call vs sklearn's predict on the same rows
+    day = df[features].to_numpy()[:500]
+    start = time.perf_counter()
+    for _ in range(200):
+        model.predict(scaler.transform(day))
+    sklearn_ms = (time.perf_counter() - start) / 200 * 1e3
+    scorer.latency = LatencyStats()
+    for _ in range(200):
+        scorer.score(day)
+    summary = scorer.latency.summary()
+    print(f"⏱️ 500-ticker cross-section: p50 {summary['p50_ms']:.3f} ms, p99 {summary['p99_ms']:.3f} ms "
+          f"(scaler.transform + predict: {sklearn_ms:.3f} ms)")
+
+    # Concurrent clients on a Unix socket share batches
+    scorer.latency = LatencyStats()
+    server = ScoringServer(scorer, os.path.join(directory, "scoring.sock")).start()
+    chunks = np.array_split(df[features].to_numpy(), 120)
+    results = [None] * len(chunks)
+
+    def client_worker(worker, n_workers=8):
+        with ScoringClient(server.address) as client:
+            for k in range(worker, len(chunks), n_workers):
+                results[k] = client.score(chunks[k])
+
+    threads = [threading.Thread(target=client_worker, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert np.allclose(np.concatenate(results), expected, atol=1e-4)
+
+    with ScoringClient(server.address) as client:
+        try:
+            client.score(np.zeros((3, 4)))
+            raise AssertionError("Wrong feature count accepted")
+        except RuntimeError as error:
+            print(f"🚫 {error}")
+        stats = client.stats()
+    print(f"🛰️ {stats['requests']['count']} requests in {stats['batches']['count']} batches "
+          f"({stats['batches']['mean_rows']:.0f} rows per batch): "
+          f"p50 {stats['requests']['p50_ms']:.2f} ms, p99 {stats['requests']['p99_ms']:.2f} ms")
+    server.close()
+    shutil.rmtree(directory)
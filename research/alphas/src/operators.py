@@ -0,0 +1,349 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from gplearn.functions import _Function
+
+from src.panel import Panel, average_ranks
+
+# Alpha operators over dense (dates x tickers) float matrices, e.g. Panel.feature(...).
+# NaN marks a missing (date, ticker) cell. Cross-sectional operators work on each row and
+# ignore NaN; time-series operators work down each column over the last `window` dates of
+# the panel calendar, so a missing day counts as a NaN inside the window. A time-series
+# result is NaN when the window holds fewer than `min_periods` valid values (default: window).
+
+
+def _valid(x):
+    x = np.asarray(x, dtype=float)
+    valid = ~np.isnan(x)
+    return x, valid
+
+
+def _rolling_sum(values, window):
+    # Sum of the last `window` rows (fewer at the start) via a cumulative sum along the dates
+    total = np.cumsum(values, axis=0, dtype=float)
+    out = total.copy()
+    out[window:] -= total[:-window]
+    return out
+
+
+def _min_periods(window, min_periods):
+    return window if min_periods is None else min_periods
+
+
+def _centered(x, valid):
+    # Subtract each column's mean: rolling moments are shift-invariant and the cumulative
+    # sums lose less precision on prices far from zero
+    count = valid.sum(axis=0)
+    mean = np.where(valid, x, 0.0).sum(axis=0) / np.maximum(count, 1)
+    return np.where(valid, x - mean, 0.0)
+
+
+# --- Cross-sectional operators ---
+
+def rank(x, ascending=True):
+    """Percentile rank of each row in (0, 1], average ranks for ties (like utils_rank.rank)."""
+    x, valid = _valid(x)
+    ranks = average_ranks(x if ascending else -x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return ranks / valid.sum(axis=1, keepdims=True)
+
+
+def zscore(x):
+    """(x - row mean) / row standard deviation; NaN on rows without dispersion."""
+    x, valid = _valid(x)
+    count = valid.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, x, 0.0).sum(axis=1, keepdims=True) / count
+        std = np.sqrt((np.where(valid, x - mean, 0.0) ** 2).sum(axis=1, keepdims=True) / count)
+        return np.where(std > 0, (x - mean) / std, np.nan)
+
+
+def scale(x, a=1.0):
+    """Rescale each row so that the sum of absolute values is `a`."""
+    x, valid = _valid(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return x * a / np.abs(np.where(valid, x, 0.0)).sum(axis=1, keepdims=True)
+
+
+# --- Time-series operators ---
+
+def delay(x, periods=1):
+    """Value `periods` dates ago (negative periods look ahead)."""
+    x = np.asarray(x, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if periods >= 0:
+        out[periods:] = x[:len(x) - periods]
+    else:
+        out[:periods] = x[-periods:]
+    return out
+
+
+def delta(x, periods=1):
+    """x - delay(x, periods)."""
+    return np.asarray(x, dtype=float) - delay(x, periods)
+
+
+def ts_mean(x, window, min_periods=None):
+    """Rolling mean over the last `window` dates."""
+    x, valid = _valid(x)
+    count = _rolling_sum(valid, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = _rolling_sum(np.where(valid, x, 0.0), window) / count
+    return np.where(count >= max(_min_periods(window, min_periods), 1), mean, np.nan)
+
+
+def ts_std(x, window, min_periods=None):
+    """Rolling sample standard deviation (ddof=1, like pandas rolling().std())."""
+    x, valid = _valid(x)
+    centered = _centered(x, valid)
+    count = _rolling_sum(valid, window)
+    total = _rolling_sum(centered, window)
+    squares = _rolling_sum(centered ** 2, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        variance = np.maximum(squares - total ** 2 / count, 0.0) / (count - 1)
+    return np.where(count >= max(_min_periods(window, min_periods), 2), np.sqrt(variance), np.nan)
+
+
+def ts_corr(x, y, window, min_periods=None):
+    """Rolling Pearson correlation of x and y over the dates where both are valid."""
+    x, x_valid = _valid(x)
+    y, y_valid = _valid(y)
+    valid = x_valid & y_valid
+    x = _centered(x, valid)
+    y = _centered(y, valid)
+
+    count = _rolling_sum(valid, window)
+    sx, sy = _rolling_sum(x, window), _rolling_sum(y, window)
+    sxx, syy, sxy = _rolling_sum(x * x, window), _rolling_sum(y * y, window), _rolling_sum(x * y, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / count
+        var_x = np.maximum(sxx - sx ** 2 / count, 0.0)
+        var_y = np.maximum(syy - sy ** 2 / count, 0.0)
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    # Constant series have no correlation
+    scale_x = np.maximum(sxx, 1e-300)
+    scale_y = np.maximum(syy, 1e-300)
+    flat = (var_x <= 1e-12 * scale_x) | (var_y <= 1e-12 * scale_y)
+    return np.where((count >= max(_min_periods(window, min_periods), 2)) & ~flat, corr, np.nan)
+
+
+def decay_linear(x, window, min_periods=None):
+    """
+    Linearly weighted moving average: weight `window` today, 1 for the oldest date.
+
+    Missing values are skipped and the remaining weights renormalized.
+    """
+    x, valid = _valid(x)
+    # Weight of row i at date t is i - (t - window): cumulative sums of i * x and x suffice
+    position = np.arange(len(x), dtype=float)[:, None]
+    offset = position - window
+
+    values = np.where(valid, x, 0.0)
+    weighted = _rolling_sum(position * values, window) - offset * _rolling_sum(values, window)
+    weights = _rolling_sum(position * valid, window) - offset * _rolling_sum(valid, window)
+    count = _rolling_sum(valid, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count >= max(_min_periods(window, min_periods), 1), weighted / weights, np.nan)
+
+
+def ts_rank(x, window, min_periods=None):
+    """Percentile rank of today's value within the last `window` dates (like rolling().rank(pct=True))."""
+    x, valid = _valid(x)
+    below = np.zeros(x.shape)
+    equal = np.zeros(x.shape)
+    count = np.zeros(x.shape)
+    for lag in range(window):
+        past = delay(x, lag)
+        below += past < x
+        equal += past == x
+        count += ~np.isnan(past)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ranks = (below + (equal + 1) / 2) / count
+    return np.where(valid & (count >= max(_min_periods(window, min_periods), 1)), ranks, np.nan)
+
+
+def ts_argmax(x, window, min_periods=None):
+    """Number of dates since the maximum of the last `window` dates (0 = today, ties: most recent)."""
+    x, valid = _valid(x)
+    best = np.full(x.shape, -np.inf)
+    since = np.full(x.shape, np.nan)
+    count = np.zeros(x.shape)
+    for lag in range(window):
+        past = delay(x, lag)
+        newer_max = past > best  # False for NaN
+        best = np.where(newer_max, past, best)
+        since = np.where(newer_max, lag, since)
+        count += ~np.isnan(past)
+    return np.where(count >= max(_min_periods(window, min_periods), 1), since, np.nan)
+
+
+# --- gplearn function set ---
+
+class PanelFunction:
+    """
+    Picklable gplearn function applying an operator to row vectors of a fixed long frame.
+
+    gplearn evaluates programs on (rows,) arrays; the vectors are scattered to the frame's
+    (dates x tickers) layout, transformed, gathered back, and NaN replaced by 0.
+    """
+
+    def __init__(self, layout, operator, **kwargs):
+        self.layout = layout
+        self.operator = operator
+        self.kwargs = kwargs
+
+    def __call__(self, *args):
+        n_rows = int(self.layout.mask.sum())
+        if any(len(arg) != n_rows for arg in args):
+            raise ValueError(f"Panel functions are bound to a frame of {n_rows} rows, got {len(args[0])} "
+                             "(see with_frame)")
+        result = self.operator(*[self.layout.to_matrix(arg) for arg in args], **self.kwargs)
+        return np.nan_to_num(self.layout.to_vector(result), nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def gp_function_set(df, windows=(5, 10), date_column="Date", ticker_column="Ticker"):
+    """
+    Operator functions for gplearn's function_set, bound to the rows of `df`.
+
+    The programs must be fitted on feature matrices built from `df` in the same row order,
+    e.g. the output of scale_features. To predict on another frame, see with_frame.
+
+    Args:
+        df (pd.DataFrame): Frame with one row per (date, ticker).
+        windows (tuple): Window lengths of the time-series operators.
+        date_column (str): Name of the date column.
+        ticker_column (str): Name of the ticker column.
+
+    Returns:
+        list: gplearn functions (rank, zscore, delay, delta_d, ts_mean_d, ts_std_d, ts_rank_d,
+              ts_corr_d, decay_linear_d, ts_argmax_d for every window d).
+    """
+    layout = Panel.from_frame(df[[date_column, ticker_column]], features=[],
+                              date_column=date_column, ticker_column=ticker_column)
+
+    functions = [
+        _Function(function=PanelFunction(layout, rank), name="rank", arity=1),
+        _Function(function=PanelFunction(layout, zscore), name="zscore", arity=1),
+        _Function(function=PanelFunction(layout, delay, periods=1), name="delay", arity=1),
+    ]
+    for window in windows:
+        for name, operator, arity in [("delta", delta, 1), ("ts_mean", ts_mean, 1), ("ts_std", ts_std, 1),
+                                      ("ts_rank", ts_rank, 1), ("ts_corr", ts_corr, 2),
+                                      ("decay_linear", decay_linear, 1), ("ts_argmax", ts_argmax, 1)]:
+            kwargs = {"periods": window} if operator is delta else {"window": window}
+            functions.append(_Function(function=PanelFunction(layout, operator, **kwargs),
+                                       name=f"{name}_{window}", arity=arity))
+    return functions
+
+
+@contextmanager
+def with_frame(model, df, date_column="Date", ticker_column="Ticker"):
+    """
+    Temporarily bind the gp_function_set operators of a fitted gplearn model to another frame.
+
+    Inside the block, model.predict accepts feature matrices built from `df` in the same row
+    order (e.g. val or test); the training frame is bound again on exit. Time-series operators
+    only see the dates of `df`, so their first window of dates has no history.
+
+    Args:
+        model: Fitted SymbolicRegressor whose function_set came from gp_function_set.
+        df (pd.DataFrame): Frame with one row per (date, ticker).
+        date_column (str): Name of the date column.
+        ticker_column (str): Name of the ticker column.
+    """
+    # Programs returned by parallel workers hold their own copies of the functions
+    programs = [model._program] + [program for generation in getattr(model, "_programs", [])
+                                   for program in generation or [] if program is not None]
+    nodes = list(getattr(model, "_function_set", []))
+    nodes += [node for program in programs for node in program.program]
+    panel_functions = {id(node.function): node.function for node in nodes
+                       if isinstance(node, _Function) and isinstance(node.function, PanelFunction)}
+
+    layout = Panel.from_frame(df[[date_column, ticker_column]], features=[],
+                              date_column=date_column, ticker_column=ticker_column)
+    previous = {key: function.layout for key, function in panel_functions.items()}
+    for function in panel_functions.values():
+        function.layout = layout
+    try:
+        yield model
+    finally:
+        for key, function in panel_functions.items():
+            function.layout = previous[key]
+
+
+if __name__ == "__main__":
+    import time
+    from src.utils_rank import rank as frame_rank
+
+    # Random panel with missing cells, checked against pandas / loop references
+    rng = np.random.default_rng(0)
+    n_dates, n_tickers, window = 300, 40, 10
+    x = rng.normal(100, 1, (n_dates, n_tickers)).round(1)  # ties, far from zero
+    y = x * 0.5 + rng.normal(0, 1, x.shape)
+    x[rng.random(x.shape) < 0.1] = np.nan
+    y[rng.random(y.shape) < 0.05] = np.nan
+    x[:, 0] = 3.0  # constant ticker
+    fx, fy = pd.DataFrame(x), pd.DataFrame(y)
+
+    assert np.allclose(ts_mean(x, window), fx.rolling(window).mean(), equal_nan=True)
+    assert np.allclose(ts_mean(x, window, 3), fx.rolling(window, min_periods=3).mean(), equal_nan=True)
+    assert np.allclose(ts_std(x, window, 5), fx.rolling(window, min_periods=5).std(), equal_nan=True, atol=1e-7)
+    assert np.allclose(ts_rank(x, window, 5), fx.rolling(window, min_periods=5).rank(pct=True), equal_nan=True)
+    assert np.allclose(delta(x, 3), fx.diff(3), equal_nan=True)
+    assert np.allclose(delay(x, -2), fx.shift(-2), equal_nan=True)
+
+    expected_corr = fx.rolling(window, min_periods=5).corr(fy).to_numpy()
+    got_corr = ts_corr(x, y, window, 5)
+    usable = np.isfinite(expected_corr) & np.isfinite(got_corr)
+    assert usable.sum() > 0.8 * np.isfinite(expected_corr).sum()
+    assert np.allclose(got_corr[usable], expected_corr[usable], atol=1e-6)
+
+    weights = np.arange(1, window + 1, dtype=float)
+    expected_decay = fx.rolling(window, min_periods=1).apply(
+        lambda w: np.nansum(w * weights[-len(w):]) / np.sum(weights[-len(w):][~np.isnan(w)]), raw=True)
+    assert np.allclose(decay_linear(x, window, 1), expected_decay, equal_nan=True)
+
+    expected_argmax = fx.rolling(window, min_periods=1).apply(
+        lambda w: np.nanargmax(w[::-1]), raw=True)
+    assert np.allclose(ts_argmax(x, window, 1), expected_argmax, equal_nan=True)
+
+    long = pd.DataFrame({"Date": np.repeat(np.arange(n_dates), n_tickers),
+                         "Ticker": np.tile(np.arange(n_tickers), n_dates), "X": x.ravel()}).dropna()
+    assert np.allclose(rank(x)[~np.isnan(x)], frame_rank(long, "X"))
+    assert np.allclose(rank(x, ascending=False)[~np.isnan(x)], frame_rank(long, "X", ascending=False))
+    assert np.allclose(np.nansum(np.abs(scale(x)), axis=1), 1.0)
+    assert np.allclose(zscore(x), fx.sub(fx.mean(axis=1), axis=0).div(fx.std(axis=1, ddof=0), axis=0), equal_nan=True)
+
+    # gplearn functions on row vectors agree with the matrix operators
+    functions = {f.name: f for f in gp_function_set(long, windows=(window,))}
+    layout = Panel.from_frame(long, features=["X"], dtype=np.float64)
+    row_values = long["X"].to_numpy()
+    expected = np.nan_to_num(layout.to_vector(ts_rank(layout.feature("X"), window)))
+    assert np.allclose(functions[f"ts_rank_{window}"](row_values), expected)
+
+    # A model fitted on one frame predicts on another inside with_frame
+    from gplearn.genetic import SymbolicRegressor
+
+    train, test = long[long["Date"] < 200], long[long["Date"] >= 200]
+    model = SymbolicRegressor(function_set=["add"] + gp_function_set(train, windows=(window,)),
+                              population_size=50, generations=2, init_depth=(3, 4), random_state=0)
+    model.fit(train[["X"]].to_numpy(), rng.normal(size=len(train)))
+    assert any(isinstance(getattr(node, "function", None), PanelFunction) for node in model._program.program)
+    fitted = model.predict(train[["X"]].to_numpy())
+    with with_frame(model, test):
+        predicted = model.predict(test[["X"]].to_numpy())
+    assert predicted.shape == (len(test),) and np.isfinite(predicted).all()
+    assert np.array_equal(model.predict(train[["X"]].to_numpy()), fitted)  # training frame bound again
+
+    big = rng.normal(size=(1250, 500))
+    start = time.perf_counter()
+    for operator in (ts_mean, ts_std, decay_linear, ts_rank, ts_argmax):
+        operator(big, 20)
+    ts_corr(big, big[::-1], 20)
+    rank(big)
+    print(f"Operator checks passed, full set on 1250 x 500 in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,177 @@
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import optuna
+from optuna.storages.journal import JournalFileBackend, JournalStorage
+from optuna.study import MaxTrialsCallback
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPRegressor
+
+from src.shared_arrays import SharedArrays
+from src.simulate import SimulationPlan
+
+
+def suggest_mlp_params(trial):
+    """Hyperparameter search space of the MLP alpha model."""
+    return {
+        "n_units_l1": trial.suggest_int("n_units_l1", 32, 256),
+        "n_units_l2": trial.suggest_int("n_units_l2", 32, 256),
+        "activation": trial.suggest_categorical("activation", ["identity", "logistic", "tanh", "relu"]),
+        "solver": trial.suggest_categorical("solver", ["lbfgs", "adam"]),
+        "alpha": trial.suggest_float("alpha", 1e-6, 1e-1, log=True),
+        "learning_rate_init": trial.suggest_float("learning_rate_init", 1e-4, 1.0, log=True),
+    }
+
+
+def build_mlp(params, max_iter=2000, **kwargs):
+    """MLPRegressor from suggest_mlp_params / study.best_params."""
+    return MLPRegressor(
+        hidden_layer_sizes=(params["n_units_l1"], params["n_units_l2"]),
+        activation=params["activation"],
+        solver=params["solver"],
+        alpha=params["alpha"],
+        learning_rate_init=params["learning_rate_init"],
+        max_iter=max_iter,
+        early_stopping=True,
+        validation_fraction=0.1,
+        random_state=42,
+        **kwargs
+    )
+
+
+class MLPObjective:
+    """
+    Picklable Optuna objective: train an MLP in chunks and report the validation Sharpe.
+
+    The scaled train/val matrices and the validation SimulationPlan are read from
+    SharedArrays, so every worker maps the same data. Training runs `chunk` iterations at a
+    time with warm_start (train_mlp); after each chunk the negative validation Sharpe is reported to the
+    trial so a pruner can stop unpromising trials early.
+
+    Args:
+        X_train (np.ndarray): Scaled training features.
+        y_train (np.ndarray): Training target.
+        X_val (np.ndarray): Scaled validation features.
+        val_plan (SimulationPlan): Simulation plan of the validation frame.
+        max_iter (int): Total training iterations per trial.
+        chunk (int): Iterations between two reports.
+    """
+
+    def __init__(self, X_train, y_train, X_val, val_plan, max_iter=2000, chunk=100):
+        arrays = {"X_train": X_train, "y_train": y_train, "X_val": X_val}
+        arrays.update({f"plan_{name}": getattr(val_plan, name) for name in SimulationPlan.ARRAYS})
+        self.shared = SharedArrays(arrays)
+        self.n_val_rows = val_plan.n_rows
+        self.capital_start = val_plan.capital_start
+        self.max_iter = max_iter
+        self.chunk = chunk
+
+    def val_sharpe(self, model):
+        plan = SimulationPlan.from_arrays(
+            {name: self.shared[f"plan_{name}"] for name in SimulationPlan.ARRAYS},
+            self.n_val_rows, self.capital_start,
+        )
+        _, sharpe = plan.run(model.predict(self.shared["X_val"]))
+        return sharpe[0]
+
+    def __call__(self, trial):
+        params = suggest_mlp_params(trial)
+        scores = []
+
+        def report(model, trained):
+            score = -self.val_sharpe(model)  # Optuna minimizes
+            if not np.isfinite(score):
+                raise optuna.TrialPruned()
+            trial.report(score, step=trained)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+            scores.append(score)
+
+        train_mlp(params, self.shared["X_train"], self.shared["y_train"], self.max_iter, self.chunk, report)
+        return scores[-1]
+
+
+def train_mlp(params, X, y, max_iter=2000, chunk=100, callback=None):
+    """
+    Train an MLP `chunk` iterations at a time with warm_start.
+
+    Trials and the final retrain both go through this function, so the deployed model gets the
+    training procedure its hyperparameters were selected with (each chunk starts a new
+    optimizer state and early-stopping split).
+
+    Args:
+        params (dict): suggest_mlp_params / study.best_params.
+        X (np.ndarray): Scaled features.
+        y (np.ndarray): Target.
+        max_iter (int): Total training iterations.
+        chunk (int): Iterations per fit call.
+        callback (callable): Optional callback(model, trained_iterations) after each chunk.
+
+    Returns:
+        MLPRegressor
+    """
+    model = build_mlp(params, max_iter=chunk, warm_start=True)
+    trained = 0
+    while trained < max_iter:
+        previous = getattr(model, "n_iter_", 0)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", ConvergenceWarning)
+            model.fit(X, y)
+        # lbfgs reports the iterations of the last fit, adam/sgd a running total
+        done = model.n_iter_ if params["solver"] == "lbfgs" else model.n_iter_ - previous
+        trained += chunk
+        if callback is not None:
+            callback(model, trained)
+        if done < chunk:  # converged or early-stopped inside this chunk
+            break
+    return model
+
+
+def _optimize_worker(study_name, storage_path, objective, n_trials, timeout, pruner):
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    # The pruner is not stored with the study, every worker needs its own copy
+    study = optuna.load_study(study_name=study_name, storage=_storage(storage_path), pruner=pruner)
+    study.optimize(objective, timeout=timeout,
+                   callbacks=[MaxTrialsCallback(n_trials, states=None)])
+
+
+def _storage(storage_path):
+    return JournalStorage(JournalFileBackend(storage_path))
+
+
+def run_parallel_study(objective, study_name="mlp_alpha", storage_path="mlp_optuna.log", n_trials=100,
+                       n_workers=None, timeout=None, pruner=None):
+    """
+    Run an Optuna study with several worker processes sharing a local journal-file storage.
+
+    Args:
+        objective (callable): Picklable objective, e.g. MLPObjective.
+        study_name (str): Name of the study; an existing study in the storage is resumed.
+        storage_path (str): Journal file shared by the workers.
+        n_trials (int): Total number of trials in the study (finished, pruned and running).
+        n_workers (int): Worker processes. None uses all cores, 1 runs in-process.
+        timeout (float): Optional wall-clock budget in seconds per worker.
+        pruner (optuna.pruners.BasePruner): Defaults to a MedianPruner.
+
+    Returns:
+        optuna.Study
+    """
+    pruner = pruner or optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+    study = optuna.create_study(study_name=study_name, storage=_storage(storage_path), direction="minimize",
+                                pruner=pruner, load_if_exists=True)
+
+    n_workers = n_workers or os.cpu_count() or 1
+    if n_workers == 1:
+        _optimize_worker(study_name, storage_path, objective, n_trials, timeout, pruner)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_optimize_worker, study_name, storage_path, objective, n_trials, timeout,
+                                   pruner)
+                       for _ in range(n_workers)]
+            for future in futures:
+                future.result()
+
+    # Pruner settings are not stored, reload to see every worker's trials
+    return optuna.load_study(study_name=study_name, storage=_storage(storage_path), pruner=pruner)
@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+from src.metrics import compute_sharpe
+
+
+def average_ranks(values):
+    """
+    1-based average ranks along the last axis, ignoring NaN (like rank(method="average")).
+
+    Args:
+        values (np.ndarray): Array whose last axis is the cross-section, e.g. (dates x tickers).
+
+    Returns:
+        np.ndarray: float64 ranks, NaN where values is NaN.
+    """
+    values = np.asarray(values)
+    order = np.argsort(values, axis=-1, kind="stable")  # NaN sorted last
+    sorted_values = np.take_along_axis(values, order, axis=-1)
+
+    n = values.shape[-1]
+    position = np.broadcast_to(np.arange(n), values.shape)
+    new_group = np.ones(values.shape, dtype=bool)
+    new_group[..., 1:] = sorted_values[..., 1:] != sorted_values[..., :-1]
+    end_group = np.ones(values.shape, dtype=bool)
+    end_group[..., :-1] = new_group[..., 1:]
+
+    # Tied values share the mean of the first and last position of their group
+    first = np.maximum.accumulate(np.where(new_group, position, 0), axis=-1)
+    last = np.flip(np.minimum.accumulate(np.flip(np.where(end_group, position, n), axis=-1), axis=-1), axis=-1)
+    sorted_ranks = (first + last) / 2 + 1
+    sorted_ranks[np.isnan(sorted_values)] = np.nan
+
+    ranks = np.empty(values.shape)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=-1)
+    return ranks
+
+
+def row_corr(a, b):
+    """
+    Pearson correlation of each row of a and b (last axis), ignoring positions where either is NaN.
+
+    Returns:
+        np.ndarray: One correlation per row, NaN when a row has no variance.
+    """
+    valid = ~(np.isnan(a) | np.isnan(b))
+    count = valid.sum(axis=-1)
+    a = np.where(valid, a, 0.0)
+    b = np.where(valid, b, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = np.where(valid, a - a.sum(axis=-1, keepdims=True) / count[..., None], 0.0)
+        b = np.where(valid, b - b.sum(axis=-1, keepdims=True) / count[..., None], 0.0)
+        return (a * b).sum(axis=-1) / np.sqrt((a * a).sum(axis=-1) * (b * b).sum(axis=-1))
+
+
+class Panel:
+    """
+    Dense (dates x tickers x features) view of a long ['Date', 'Ticker', ...] DataFrame.
+
+    Missing (date, ticker) rows are NaN and False in `mask`. `rows` keeps the position of
+    every cell in the source DataFrame, so results can be written back in the original order.
+
+    Attributes:
+        values (np.ndarray): (dates x tickers x features) array, float32 by default.
+        dates (pd.DatetimeIndex): Sorted dates.
+        tickers (pd.Index): Sorted tickers.
+        features (list): Feature names, in the order of the last axis.
+        mask (np.ndarray): (dates x tickers) bool, True where the source has a row.
+        rows (np.ndarray): (dates x tickers) int64 row position in the source, -1 if missing.
+    """
+
+    def __init__(self, values, dates, tickers, features, mask, rows):
+        self.values = values
+        self.dates = dates
+        self.tickers = tickers
+        self.features = list(features)
+        self.mask = mask
+        self.rows = rows
+        self.feature_index = {name: i for i, name in enumerate(self.features)}
+
+    @classmethod
+    def from_frame(cls, df, features=None, date_column="Date", ticker_column="Ticker", dtype=np.float32):
+        """
+        Build a panel from a long DataFrame, e.g. the output of load_mini_features.
+
+        Args:
+            df (pd.DataFrame): One row per (date, ticker).
+            features (list): Numeric columns to keep. Defaults to all numeric columns.
+            date_column (str): Name of the date column.
+            ticker_column (str): Name of the ticker column.
+            dtype: Storage dtype. float32 halves memory; float64 keeps exact values.
+
+        Returns:
+            Panel
+        """
+        if features is None:
+            features = [col for col in df.select_dtypes(include="number").columns
+                        if col not in (date_column, ticker_column)]
+
+        date_codes, dates = pd.factorize(pd.to_datetime(df[date_column]), sort=True)
+        ticker_codes, tickers = pd.factorize(df[ticker_column], sort=True)
+        shape = (len(dates), len(tickers))
+
+        rows = np.full(shape, -1, dtype=np.int64)
+        rows[date_codes, ticker_codes] = np.arange(len(df))
+        if (rows >= 0).sum() != len(df):
+            raise ValueError("Duplicate (date, ticker) rows.")
+
+        values = np.full(shape + (len(features),), np.nan, dtype=dtype)
+        values[date_codes, ticker_codes] = df[features].to_numpy(dtype=dtype)
+
+        return cls(values, pd.DatetimeIndex(dates, name=date_column), pd.Index(tickers, name=ticker_column),
+                   features, rows >= 0, rows)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def feature(self, name):
+        """(dates x tickers) view of one feature (no copy)."""
+        return self.values[:, :, self.feature_index[name]]
+
+    def feature_block(self, names):
+        """
+        (dates x tickers x len(names)) block of several features.
+
+        A view when the names are contiguous in the panel, otherwise a copy.
+        """
+        idx = [self.feature_index[name] for name in names]
+        if idx == list(range(idx[0], idx[0] + len(idx))):
+            return self.values[:, :, idx[0]:idx[0] + len(idx)]
+        return self.values[:, :, idx]
+
+    def slice_dates(self, start=None, end=None):
+        """
+        Sub-panel of the dates in [start, end), sharing memory with this panel.
+
+        `rows` is renumbered to match the source DataFrame filtered on the same dates
+        (with a reset index), as returned by preprocessing.split_data.
+        """
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start))
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end))
+
+        mask = self.mask[lo:hi]
+        rows = np.full(mask.shape, -1, dtype=np.int64)
+        rows[mask] = np.argsort(np.argsort(self.rows[lo:hi][mask], kind="stable"), kind="stable")
+
+        return Panel(self.values[lo:hi], self.dates[lo:hi], self.tickers, self.features, mask, rows)
+
+    def split(self, val_start="2016-01-01", test_start="2017-01-01"):
+        """Train / validation / test sub-panels, with the same date ranges as preprocessing.split_data."""
+        return (self.slice_dates(None, val_start),
+                self.slice_dates(val_start, test_start),
+                self.slice_dates(test_start, None))
+
+    def to_matrix(self, vector):
+        """Scatter a vector aligned on the source rows (e.g. GP predictions) to (dates x tickers)."""
+        vector = np.asarray(vector)
+        matrix = np.full(self.mask.shape, np.nan, dtype=np.result_type(vector.dtype, np.float32))
+        matrix[self.mask] = vector[self.rows[self.mask]]
+        return matrix
+
+    def to_vector(self, matrix):
+        """Gather a (dates x tickers) matrix back to a vector in the source row order."""
+        vector = np.empty(int(self.mask.sum()), dtype=np.asarray(matrix).dtype)
+        vector[self.rows[self.mask]] = matrix[self.mask]
+        return vector
+
+    def to_frame(self, features=None):
+        """Long ['Date', 'Ticker', features...] DataFrame in the source row order."""
+        features = self.features if features is None else features
+        order = np.argsort(self.rows[self.mask], kind="stable")
+        date_idx, ticker_idx = np.nonzero(self.mask)
+
+        data = {self.dates.name: self.dates[date_idx[order]], self.tickers.name: self.tickers[ticker_idx[order]]}
+        for name in features:
+            data[name] = self.feature(name)[self.mask][order]
+        return pd.DataFrame(data)
+
+    def shift(self, matrix, periods=1):
+        """
+        Shift each ticker's series by `periods` of its own rows, like groupby("Ticker").shift().
+
+        Missing (date, ticker) cells are skipped, so shift(-1) is the ticker's next available value.
+        """
+        dates = np.arange(len(self.dates))[:, None]
+        result = np.asarray(matrix)
+        for _ in range(abs(periods)):
+            if periods < 0:
+                # First available row strictly after each date
+                source = np.where(self.mask, dates, len(self.dates))
+                source = np.minimum.accumulate(source[::-1], axis=0)[::-1]
+                source = np.vstack([source[1:], np.full((1, source.shape[1]), len(self.dates))])
+                found = source < len(self.dates)
+            else:
+                # Last available row strictly before each date
+                source = np.maximum.accumulate(np.where(self.mask, dates, -1), axis=0)
+                source = np.vstack([np.full((1, source.shape[1]), -1), source[:-1]])
+                found = source >= 0
+
+            shifted = np.take_along_axis(result, np.clip(source, 0, len(self.dates) - 1), axis=0)
+            result = np.where(found & self.mask, shifted, np.nan)
+        return result
+
+    def rank(self, matrix, ascending=True):
+        """Cross-sectional percentile rank per date, like utils_rank.rank."""
+        values = np.where(self.mask, matrix, np.nan)
+        ranks = average_ranks(values if ascending else -values)
+        return ranks / np.sum(~np.isnan(values), axis=1, keepdims=True)
+
+    def simulate(self, alpha, capital_start=1_000, return_column="Return_1d"):
+        """
+        Panel version of simulate.simulate_portfolio_fast.
+
+        Args:
+            alpha (np.ndarray): (dates x tickers) alpha matrix.
+            capital_start (float): Initial capital.
+            return_column (str): Feature holding the daily return.
+
+        Returns:
+            tuple: (portfolio value Series, Sharpe ratio)
+        """
+        next_return = self.shift(self.feature(return_column).astype(float), -1)
+        held = self.mask & ~np.isnan(next_return)
+        alpha = np.where(held, alpha, 0.0)
+
+        count = held.sum(axis=1)
+        days = count > 0
+        centered = alpha - alpha.sum(axis=1, keepdims=True) / np.maximum(count, 1)[:, None]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = np.where(held, centered, 0.0) / np.abs(alpha).sum(axis=1, keepdims=True)
+        daily_returns = np.where(held, weights * next_return, 0.0).sum(axis=1)[days]
+
+        portfolio = pd.Series(np.cumprod(1 + daily_returns) * capital_start,
+                              index=self.dates[days], name="PortfolioValue")
+        return portfolio, compute_sharpe(portfolio)
+
+    def information_coefficient(self, alpha, target, min_count=3, min_std=1e-6):
+        """
+        Daily Spearman rank correlation between alpha and target.
+
+        Days with fewer than `min_count` tickers, or with a target or alpha standard
+        deviation below `min_std`, are NaN (same filters as create_spearman_rank_fitness).
+
+        Returns:
+            pd.Series: IC per date.
+        """
+        alpha = np.where(self.mask, alpha, np.nan).astype(float)
+        target = np.where(self.mask, target, np.nan).astype(float)
+        valid = ~(np.isnan(alpha) | np.isnan(target))
+        alpha[~valid] = np.nan
+        target[~valid] = np.nan
+
+        keep = ((valid.sum(axis=1) >= min_count)
+                & (np.nan_to_num(np.nanstd(target, axis=1)) > min_std)
+                & (np.nan_to_num(np.nanstd(alpha, axis=1)) >= min_std))
+        ic = row_corr(average_ranks(alpha), average_ranks(target))
+        return pd.Series(np.where(keep, ic, np.nan), index=self.dates, name="IC")
+
+
+if __name__ == "__main__":
+    from src.simulate import simulate_portfolio_fast
+    from src.utils_rank import rank
+
+    # Random long panel with missing rows, checked against the groupby implementations
+    rng = np.random.default_rng(0)
+    dates = pd.date_range("2015-06-01", periods=400, freq="B")
+    df = pd.DataFrame([(d, t) for d in dates for t in ["AAA", "BBB", "CCC", "DDD", "EEE", "FFF"]],
+                      columns=["Date", "Ticker"])
+    df = df[rng.random(len(df)) > 0.15].reset_index(drop=True)
+    df["Return_1d"] = rng.normal(0, 0.02, len(df))
+    df["Return_5d"] = rng.normal(0, 0.04, len(df)).round(2)  # ties
+
+    panel = Panel.from_frame(df, dtype=np.float64)
+
+    target = df.groupby("Ticker")["Return_1d"].shift(-1).to_numpy()
+    assert np.allclose(panel.to_vector(panel.shift(panel.feature("Return_1d"), -1)), target, equal_nan=True)
+    lag = df.groupby("Ticker")["Return_1d"].shift(2).to_numpy()
+    assert np.allclose(panel.to_vector(panel.shift(panel.feature("Return_1d"), 2)), lag, equal_nan=True)
+
+    for ascending in (True, False):
+        expected = rank(df, "Return_5d", ascending=ascending).to_numpy()
+        assert np.allclose(panel.to_vector(panel.rank(panel.feature("Return_5d"), ascending)), expected)
+
+    df["Alpha"] = rank(df, "Return_5d")
+    expected_portfolio, expected_sharpe = simulate_portfolio_fast(df.copy())
+    portfolio, sharpe = panel.simulate(panel.to_matrix(df["Alpha"].to_numpy()))
+    assert portfolio.index.equals(expected_portfolio.index)
+    assert np.allclose(portfolio.to_numpy(), expected_portfolio.to_numpy()) and np.isclose(sharpe, expected_sharpe)
+
+    from src.fitness import create_spearman_rank_fitness
+    df["Target"] = target
+    valid_df = df.dropna().reset_index(drop=True)
+    valid_panel = Panel.from_frame(valid_df, dtype=np.float64)
+    ic = valid_panel.information_coefficient(valid_panel.feature("Alpha"), valid_panel.feature("Target"))
+    fitness = create_spearman_rank_fitness(valid_df)
+    assert np.isclose(-ic.mean(), fitness(None, valid_df["Alpha"].to_numpy(), None))
+
+    train, val, test = panel.split(val_start="2016-01-01", test_start="2016-06-01")
+    val_df = df[(df["Date"] >= "2016-01-01") & (df["Date"] < "2016-06-01")].reset_index(drop=True)
+    assert np.shares_memory(val.values, panel.values)
+    assert val.to_frame(["Return_1d"]).equals(val_df[["Date", "Ticker", "Return_1d"]])
+
+    print("Panel checks passed:", panel.shape)
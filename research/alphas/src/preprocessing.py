@@ -2,17 +2,33 @@ import pandas as pd
 from sklearn.preprocessing import StandardScaler
 
 
-def split_data(df, date_column="Date"):
+def split_data(df, date_column="Date", copy=True):
     """
     Split a dataframe into train, validation, and test sets based on date ranges.
 
     Args:
         df (pd.DataFrame): Input dataframe with a date column.
         date_column (str): Name of the date column.
+        copy (bool): If False, return row-range views of df instead of copies. df must be
+                     sorted by date with a datetime column (as returned by load_mini_features),
+                     and the splits must not be modified in place.
 
     Returns:
         tuple: (train_df, val_df, test_df)
     """
+    if not copy:
+        dates = df[date_column]
+        if not (pd.api.types.is_datetime64_any_dtype(dates) and dates.is_monotonic_increasing):
+            raise ValueError("split_data(copy=False) needs a frame sorted by a datetime date column")
+
+        bounds = dates.searchsorted([pd.Timestamp("2016-01-01"), pd.Timestamp("2017-01-01")])
+        splits = []
+        for lo, hi in zip([0, *bounds], [*bounds, len(df)]):
+            view = df.iloc[lo:hi]
+            view.index = pd.RangeIndex(hi - lo)  # same index as reset_index(drop=True), without a copy
+            splits.append(view)
+        return tuple(splits)
+
     df = df.copy()
     df[date_column] = pd.to_datetime(df[date_column])
 
@@ -23,7 +39,7 @@ def split_data(df, date_column="Date"):
     return train, val, test
 
 
-def scale_features(train_df, val_df, test_df, feature_cols):
+def scale_features(train_df, val_df, test_df, feature_cols, dtype=None):
     """
     Apply z-score standardization to features using statistics from the training set only.
 
@@ -32,15 +48,16 @@ def scale_features(train_df, val_df, test_df, feature_cols):
         val_df (pd.DataFrame): Validation set.
         test_df (pd.DataFrame): Test set.
         feature_cols (list): List of feature column names to standardize.
+        dtype: Optional dtype of the scaled matrices, e.g. np.float32 (kept by the scaler).
 
     Returns:
         tuple: (X_train_scaled, X_val_scaled, X_test_scaled, scaler)
     """
     scaler = StandardScaler()
 
-    X_train = train_df[feature_cols].values
-    X_val = val_df[feature_cols].values
-    X_test = test_df[feature_cols].values
+    X_train = train_df[feature_cols].to_numpy(dtype=dtype)
+    X_val = val_df[feature_cols].to_numpy(dtype=dtype)
+    X_test = test_df[feature_cols].to_numpy(dtype=dtype)
 
     X_train_scaled = scaler.fit_transform(X_train)
     X_val_scaled = scaler.transform(X_val)
@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import weakref
+
+import numpy as np
+
+
+class SharedArrays:
+    """
+    Read-only arrays stored once as memory-mapped .npy files.
+
+    The files go to /dev/shm when available (shared memory), otherwise to the temporary
+    directory. Pickling only sends the file paths, so worker processes map the same pages
+    instead of receiving a copy of the data. The files are removed when the creating
+    process drops the object or exits.
+
+    Args:
+        arrays (dict): {name: np.ndarray}
+        directory (str): Where to write the files. Defaults to a new directory in /dev/shm or /tmp.
+    """
+
+    def __init__(self, arrays, directory=None):
+        if directory is None:
+            shm = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+            directory = tempfile.mkdtemp(prefix="alpha_shared_", dir=shm)
+            self._cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._cleanup = None
+
+        self.directory = directory
+        self.paths = {}
+        for name, array in arrays.items():
+            self.paths[name] = os.path.join(directory, f"{name}.npy")
+            np.save(self.paths[name], np.ascontiguousarray(array))
+        self._arrays = {}
+
+    def __getitem__(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(self.paths[name], mmap_mode="r")
+        return self._arrays[name]
+
+    def __contains__(self, name):
+        return name in self.paths
+
+    def __getstate__(self):
+        return {"directory": self.directory, "paths": self.paths}
+
+    def __setstate__(self, state):
+        # Workers only read the files; the creating process owns their cleanup
+        self.__dict__.update(state)
+        self._arrays = {}
+        self._cleanup = None
+
+    def close(self):
+        if self._cleanup is not None:
+            self._cleanup()
@@ -14,6 +14,4 @@ def rank(df: pd.DataFrame, column: str, ascending: bool = True) -> pd.Series:
     Returns:
         pd.Series: Cross-sectional rank between 0 and 1 (normalized by number of assets per day).
     """
-    return df.groupby("Date")[column].transform(
-        lambda x: x.rank(method="average", pct=True, ascending=ascending)
-    )
+    return df.groupby("Date")[column].rank(method="average", pct=True, ascending=ascending)
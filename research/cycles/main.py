@@ -1,4 +1,5 @@
-import cryptocompare
+import os
+import sys
 import pandas as pd
 from fft_cycles import (
     compute_log_returns,
@@ -8,8 +9,11 @@ from fft_cycles import (
     plot_price_series
 )
 
-def fetch_btc_data(days=2000):
-    data = cryptocompare.get_historical_price_day("BTC", "USD", limit=days)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backtesting")))
+from ohlcv_cache import load_ohlcv
+
+def fetch_btc_data(days=2000, offline=False, cache_dir=None, provider=None):
+    data = load_ohlcv("BTC", "USD", limit=days, cache_dir=cache_dir, offline=offline, provider=provider)
     df = pd.DataFrame(data)
     df["date"] = pd.to_datetime(df["time"], unit="s")
     df.set_index("date", inplace=True)